@@ -19,6 +19,7 @@ class ApiBaseModel:
         self.detection_task = None
         self.classification_task = None
         self.change_detection_task = None
+        self.result_cache = None
         self.last_error = None
         
         # 初始化API客户端
@@ -33,6 +34,7 @@ class ApiBaseModel:
         try:
             # 导入API客户端模块
             from utils.api_client import ApiClient, ApiConfig
+            from utils.api_client.result_cache import ResultCache
             from utils.api_client.task_handlers import (
                 SegmentationTask, 
                 DetectionTask, 
@@ -53,11 +55,19 @@ class ApiBaseModel:
             # 创建API客户端
             self.api_client = ApiClient(self.config)
             
+            # 创建结果缓存（缓存目录不可用时不影响任务执行）
+            if self.config.cache_enabled:
+                try:
+                    self.result_cache = ResultCache(self.config.resolved_cache_dir,
+                                                    self.config.cache_max_bytes)
+                except OSError as e:
+                    self.logger.warning(f"创建结果缓存失败，不使用缓存: {str(e)}")
+            
             # 初始化任务处理器
-            self.segmentation_task = SegmentationTask(self.api_client)
-            self.detection_task = DetectionTask(self.api_client)
-            self.classification_task = ClassificationTask(self.api_client)
-            self.change_detection_task = ChangeDetectionTask(self.api_client)
+            self.segmentation_task = SegmentationTask(self.api_client, self.result_cache)
+            self.detection_task = DetectionTask(self.api_client, self.result_cache)
+            self.classification_task = ClassificationTask(self.api_client, self.result_cache)
+            self.change_detection_task = ChangeDetectionTask(self.api_client, self.result_cache)
             
             self.logger.info("API客户端初始化成功")
             
@@ -83,7 +93,7 @@ class ApiBaseModel:
                 self.logger.warning("API客户端未初始化")
                 return False
             
-            # 检查API连接
+            # 检查API连接（健康状态按health_ttl缓存，不会每次调用都探测）
             available = self.api_client.check_connection()
             
             if not available and auto_start:
@@ -92,8 +102,8 @@ class ApiBaseModel:
                 started = self.api_client.start_service()
                 if started:
                     self.logger.info("API服务已成功启动")
-                    # 再次检查连接
-                    available = self.api_client.check_connection()
+                    # 再次检查连接（忽略缓存的健康状态）
+                    available = self.api_client.check_connection(force=True)
                 else:
                     self.logger.error("自动启动API服务失败")
             
@@ -1,11 +1,13 @@
 """
 批量处理API模型，提供批量任务处理的API接口
 """
+import os
 import logging
 import time
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Callable
 
 from .api_base import ApiBaseModel
+from .batch_engine import BatchJobEngine, list_image_files
 
 class ApiBatchProcessingModel(ApiBaseModel):
     """批量处理API模型类"""
@@ -13,6 +15,10 @@ class ApiBatchProcessingModel(ApiBaseModel):
     def __init__(self):
         """初始化批量处理API模型"""
         super().__init__()
+        # 当前正在运行的批量任务引擎，用于取消
+        self.batch_engine = None
+        # 最近一次批量任务的执行统计
+        self.last_stats = None
     
     def create_segmentation_task(self, input_dir: str, output_dir: str, 
                              model_name: str = "default", 
@@ -111,16 +117,87 @@ class ApiBatchProcessingModel(ApiBaseModel):
         # 实际实现中需要调用API启动任务
         return True
         
+    def cancel_current_task(self):
+        """取消当前正在执行的批量任务"""
+        if self.batch_engine:
+            self.batch_engine.cancel()
+    
+    def _run_batch(self, task_label: str, task_handler, jobs: List[Dict[str, Any]],
+                   output_dir: str, model_name: str, params: Optional[Dict[str, Any]],
+                   progress_callback: Optional[Callable], max_workers: int,
+                   log_lines: List[str]) -> bool:
+        """通过批量任务引擎执行作业，并写入处理日志
+        
+        Args:
+            task_label: 任务名称（用于日志）
+            task_handler: 任务处理器
+            jobs: 作业列表
+            output_dir: 输出目录
+            model_name: 模型名称
+            params: 额外参数
+            progress_callback: 进度回调函数，参数为(作业字典, 总体进度百分比)
+            max_workers: 并发数
+            log_lines: 写入处理日志开头的说明行
+            
+        Returns:
+            是否全部成功执行
+        """
+        if task_handler is None:
+            self.last_error = self.last_error or "API客户端未初始化"
+            self.logger.error(f"执行{task_label}任务失败: {self.last_error}")
+            return False
+        
+        self.batch_engine = BatchJobEngine(
+            task_handler, output_dir,
+            max_workers=max_workers,
+            submit_kwargs={"model_name": model_name, "params": params},
+            progress_callback=progress_callback
+        )
+        try:
+            stats = self.batch_engine.run(jobs)
+        finally:
+            engine, self.batch_engine = self.batch_engine, None
+        self.last_stats = stats
+        
+        # 记录结果日志
+        with open(os.path.join(output_dir, "process_log.txt"), "w", encoding="utf-8") as f:
+            f.write(f"{task_label}任务\n")
+            for line in log_lines:
+                f.write(f"{line}\n")
+            f.write(f"输出目录: {output_dir}\n")
+            f.write(f"模型: {model_name}\n")
+            f.write(f"作业数: {len(jobs)}\n")
+            f.write(f"成功: {len(stats['completed'])}\n")
+            f.write(f"失败: {len(stats['failed'])}\n")
+            if stats["cancelled"]:
+                f.write("任务已取消\n")
+            f.write(f"耗时: {stats['elapsed']:.1f} 秒\n")
+            f.write(f"处理时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+            for job, error in stats["failed"]:
+                f.write(f"失败: {job['name']}: {error}\n")
+        
+        if stats["failed"]:
+            self.last_error = engine.last_error
+        
+        self.logger.info(f"{task_label}任务完成，成功 {len(stats['completed'])} 个，失败 {len(stats['failed'])} 个")
+        return not stats["failed"] and not stats["cancelled"]
+    
     def execute_segmentation_task(self, input_dir: str, output_dir: str, 
                              model_name: str = "default", 
-                             params: Optional[Dict[str, Any]] = None) -> bool:
+                             params: Optional[Dict[str, Any]] = None,
+                             progress_callback: Optional[Callable] = None,
+                             max_workers: int = 4) -> bool:
         """直接执行批量语义分割任务
         
+        逐个文件提交到推理服务，阻塞直到全部完成，应在后台线程中调用
+        
         Args:
             input_dir: 输入目录
             output_dir: 输出目录
             model_name: 模型名称
             params: 额外参数
+            progress_callback: 进度回调函数，参数为(作业字典, 总体进度百分比)
+            max_workers: 并发数
             
         Returns:
             是否成功执行
@@ -128,55 +205,36 @@ class ApiBatchProcessingModel(ApiBaseModel):
         self.logger.info(f"执行批量语义分割任务: 输入目录={input_dir}, 输出目录={output_dir}")
         
         try:
-            # TODO: 实现批量语义分割的实际逻辑
-            # 1. 遍历输入目录下的所有图像文件
-            # 2. 对每个文件执行分割处理
-            # 3. 将结果保存到输出目录
-            
-            import time
-            import glob
-            import os
-            from pathlib import Path
-            
-            # 模拟处理延时
-            time.sleep(2)
-            
-            # 获取输入目录中的所有图像文件
-            image_files = glob.glob(os.path.join(input_dir, "*.tif")) + \
-                          glob.glob(os.path.join(input_dir, "*.tiff")) + \
-                          glob.glob(os.path.join(input_dir, "*.jpg")) + \
-                          glob.glob(os.path.join(input_dir, "*.jpeg")) + \
-                          glob.glob(os.path.join(input_dir, "*.png"))
-            
-            # 确保输出目录存在
+            image_files = list_image_files(input_dir)
             os.makedirs(output_dir, exist_ok=True)
             
-            # 记录结果日志
-            with open(os.path.join(output_dir, "process_log.txt"), "w") as f:
-                f.write(f"批量语义分割任务\n")
-                f.write(f"输入目录: {input_dir}\n")
-                f.write(f"输出目录: {output_dir}\n")
-                f.write(f"模型: {model_name}\n")
-                f.write(f"处理文件数: {len(image_files)}\n")
-                f.write(f"处理时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                
-            self.logger.info(f"批量语义分割任务完成，处理了 {len(image_files)} 个文件")
-            return True
+            return self._run_batch(
+                "批量语义分割", self.segmentation_task, BatchJobEngine.jobs_from_files(image_files),
+                output_dir, model_name, params, progress_callback, max_workers,
+                [f"输入目录: {input_dir}"]
+            )
             
         except Exception as e:
+            self.last_error = str(e)
             self.logger.error(f"执行批量语义分割任务失败: {e}")
             return False
     
     def execute_detection_task(self, input_dir: str, output_dir: str, 
-                          model_name: str = "default", 
-                          params: Optional[Dict[str, Any]] = None) -> bool:
+                             model_name: str = "default", 
+                             params: Optional[Dict[str, Any]] = None,
+                             progress_callback: Optional[Callable] = None,
+                             max_workers: int = 4) -> bool:
         """直接执行批量目标检测任务
         
+        逐个文件提交到推理服务，阻塞直到全部完成，应在后台线程中调用
+        
         Args:
             input_dir: 输入目录
             output_dir: 输出目录
             model_name: 模型名称
             params: 额外参数
+            progress_callback: 进度回调函数，参数为(作业字典, 总体进度百分比)
+            max_workers: 并发数
             
         Returns:
             是否成功执行
@@ -184,55 +242,36 @@ class ApiBatchProcessingModel(ApiBaseModel):
         self.logger.info(f"执行批量目标检测任务: 输入目录={input_dir}, 输出目录={output_dir}")
         
         try:
-            # TODO: 实现批量目标检测的实际逻辑
-            # 1. 遍历输入目录下的所有图像文件
-            # 2. 对每个文件执行目标检测处理
-            # 3. 将结果保存到输出目录
-            
-            import time
-            import glob
-            import os
-            from pathlib import Path
-            
-            # 模拟处理延时
-            time.sleep(2)
-            
-            # 获取输入目录中的所有图像文件
-            image_files = glob.glob(os.path.join(input_dir, "*.tif")) + \
-                          glob.glob(os.path.join(input_dir, "*.tiff")) + \
-                          glob.glob(os.path.join(input_dir, "*.jpg")) + \
-                          glob.glob(os.path.join(input_dir, "*.jpeg")) + \
-                          glob.glob(os.path.join(input_dir, "*.png"))
-            
-            # 确保输出目录存在
+            image_files = list_image_files(input_dir)
             os.makedirs(output_dir, exist_ok=True)
             
-            # 记录结果日志
-            with open(os.path.join(output_dir, "process_log.txt"), "w") as f:
-                f.write(f"批量目标检测任务\n")
-                f.write(f"输入目录: {input_dir}\n")
-                f.write(f"输出目录: {output_dir}\n")
-                f.write(f"模型: {model_name}\n")
-                f.write(f"处理文件数: {len(image_files)}\n")
-                f.write(f"处理时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                
-            self.logger.info(f"批量目标检测任务完成，处理了 {len(image_files)} 个文件")
-            return True
+            return self._run_batch(
+                "批量目标检测", self.detection_task, BatchJobEngine.jobs_from_files(image_files),
+                output_dir, model_name, params, progress_callback, max_workers,
+                [f"输入目录: {input_dir}"]
+            )
             
         except Exception as e:
+            self.last_error = str(e)
             self.logger.error(f"执行批量目标检测任务失败: {e}")
             return False
     
     def execute_classification_task(self, input_dir: str, output_dir: str, 
-                              model_name: str = "default", 
-                              params: Optional[Dict[str, Any]] = None) -> bool:
+                             model_name: str = "default", 
+                             params: Optional[Dict[str, Any]] = None,
+                             progress_callback: Optional[Callable] = None,
+                             max_workers: int = 4) -> bool:
         """直接执行批量场景分类任务
         
+        逐个文件提交到推理服务，阻塞直到全部完成，应在后台线程中调用
+        
         Args:
             input_dir: 输入目录
             output_dir: 输出目录
             model_name: 模型名称
             params: 额外参数
+            progress_callback: 进度回调函数，参数为(作业字典, 总体进度百分比)
+            max_workers: 并发数
             
         Returns:
             是否成功执行
@@ -240,56 +279,37 @@ class ApiBatchProcessingModel(ApiBaseModel):
         self.logger.info(f"执行批量场景分类任务: 输入目录={input_dir}, 输出目录={output_dir}")
         
         try:
-            # TODO: 实现批量场景分类的实际逻辑
-            # 1. 遍历输入目录下的所有图像文件
-            # 2. 对每个文件执行场景分类处理
-            # 3. 将结果保存到输出目录
-            
-            import time
-            import glob
-            import os
-            from pathlib import Path
-            
-            # 模拟处理延时
-            time.sleep(2)
-            
-            # 获取输入目录中的所有图像文件
-            image_files = glob.glob(os.path.join(input_dir, "*.tif")) + \
-                          glob.glob(os.path.join(input_dir, "*.tiff")) + \
-                          glob.glob(os.path.join(input_dir, "*.jpg")) + \
-                          glob.glob(os.path.join(input_dir, "*.jpeg")) + \
-                          glob.glob(os.path.join(input_dir, "*.png"))
-            
-            # 确保输出目录存在
+            image_files = list_image_files(input_dir)
             os.makedirs(output_dir, exist_ok=True)
             
-            # 记录结果日志
-            with open(os.path.join(output_dir, "process_log.txt"), "w") as f:
-                f.write(f"批量场景分类任务\n")
-                f.write(f"输入目录: {input_dir}\n")
-                f.write(f"输出目录: {output_dir}\n")
-                f.write(f"模型: {model_name}\n")
-                f.write(f"处理文件数: {len(image_files)}\n")
-                f.write(f"处理时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                
-            self.logger.info(f"批量场景分类任务完成，处理了 {len(image_files)} 个文件")
-            return True
+            return self._run_batch(
+                "批量场景分类", self.classification_task, BatchJobEngine.jobs_from_files(image_files),
+                output_dir, model_name, params, progress_callback, max_workers,
+                [f"输入目录: {input_dir}"]
+            )
             
         except Exception as e:
+            self.last_error = str(e)
             self.logger.error(f"执行批量场景分类任务失败: {e}")
             return False
     
     def execute_change_detection_task(self, before_dir: str, after_dir: str, 
                                 output_dir: str, model_name: str = "default", 
-                                params: Optional[Dict[str, Any]] = None) -> bool:
+                                params: Optional[Dict[str, Any]] = None,
+                                progress_callback: Optional[Callable] = None,
+                                max_workers: int = 4) -> bool:
         """直接执行批量变化检测任务
         
+        前后期影像按同名文件配对后逐对提交，阻塞直到全部完成，应在后台线程中调用
+        
         Args:
             before_dir: 前期影像目录
             after_dir: 后期影像目录
             output_dir: 输出目录
             model_name: 模型名称
             params: 额外参数
+            progress_callback: 进度回调函数，参数为(作业字典, 总体进度百分比)
+            max_workers: 并发数
             
         Returns:
             是否成功执行
@@ -297,50 +317,19 @@ class ApiBatchProcessingModel(ApiBaseModel):
         self.logger.info(f"执行批量变化检测任务: 前期目录={before_dir}, 后期目录={after_dir}, 输出目录={output_dir}")
         
         try:
-            # TODO: 实现批量变化检测的实际逻辑
-            # 1. 遍历前期和后期目录下的图像文件对
-            # 2. 对每对文件执行变化检测处理
-            # 3. 将结果保存到输出目录
-            
-            import time
-            import glob
-            import os
-            from pathlib import Path
-            
-            # 模拟处理延时
-            time.sleep(2)
-            
-            # 获取输入目录中的所有图像文件
-            before_files = glob.glob(os.path.join(before_dir, "*.tif")) + \
-                           glob.glob(os.path.join(before_dir, "*.tiff")) + \
-                           glob.glob(os.path.join(before_dir, "*.jpg")) + \
-                           glob.glob(os.path.join(before_dir, "*.jpeg")) + \
-                           glob.glob(os.path.join(before_dir, "*.png"))
-                           
-            after_files = glob.glob(os.path.join(after_dir, "*.tif")) + \
-                          glob.glob(os.path.join(after_dir, "*.tiff")) + \
-                          glob.glob(os.path.join(after_dir, "*.jpg")) + \
-                          glob.glob(os.path.join(after_dir, "*.jpeg")) + \
-                          glob.glob(os.path.join(after_dir, "*.png"))
-            
-            # 确保输出目录存在
+            before_files = list_image_files(before_dir)
+            after_files = list_image_files(after_dir)
             os.makedirs(output_dir, exist_ok=True)
             
-            # 记录结果日志
-            with open(os.path.join(output_dir, "process_log.txt"), "w") as f:
-                f.write(f"批量变化检测任务\n")
-                f.write(f"前期影像目录: {before_dir}\n")
-                f.write(f"后期影像目录: {after_dir}\n")
-                f.write(f"输出目录: {output_dir}\n")
-                f.write(f"模型: {model_name}\n")
-                f.write(f"前期文件数: {len(before_files)}\n")
-                f.write(f"后期文件数: {len(after_files)}\n")
-                f.write(f"处理时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                
-            self.logger.info(f"批量变化检测任务完成，处理了 {len(before_files)} 对文件")
-            return True
+            return self._run_batch(
+                "批量变化检测", self.change_detection_task,
+                BatchJobEngine.jobs_from_pairs(before_files, after_files),
+                output_dir, model_name, params, progress_callback, max_workers,
+                [f"前期影像目录: {before_dir}", f"后期影像目录: {after_dir}",
+                 f"前期文件数: {len(before_files)}", f"后期文件数: {len(after_files)}"]
+            )
             
         except Exception as e:
+            self.last_error = str(e)
             self.logger.error(f"执行批量变化检测任务失败: {e}")
             return False
-    
@@ -7,6 +7,7 @@ import logging
 from typing import Dict, Any, List, Optional, Tuple
 
 from .api_base import ApiBaseModel
+from .tiled_inference import TiledInferenceEngine
 
 
 class ApiDetectionModel(ApiBaseModel):
@@ -59,6 +60,52 @@ class ApiDetectionModel(ApiBaseModel):
             self.logger.error(f"目标检测失败: {str(e)}")
             return False, {"error": str(e)}
     
+    def detect_objects_tiled(self, image_path: str, model_name: str = "default",
+                             confidence: float = 0.5,
+                             params: Dict[str, Any] = None,
+                             tile_size: int = 1024, overlap: int = 128,
+                             iou_threshold: float = 0.5, max_workers: int = 4,
+                             progress_callback=None) -> Tuple[bool, Dict[str, Any]]:
+        """分块检测大幅影像中的目标
+        
+        影像切分为相互重叠的窗口并发提交，检测框换算到整景坐标后做全局NMS，
+        消除窗口重叠区域内的重复目标
+        
+        Args:
+            image_path: 影像路径
+            model_name: 模型名称
+            confidence: 置信度阈值
+            params: 其他模型参数
+            tile_size: 窗口边长（像素），一般取模型的输入尺寸
+            overlap: 相邻窗口的重叠像素数，应不小于目标的典型尺寸
+            iou_threshold: NMS重叠度阈值
+            max_workers: 并发线程数
+            progress_callback: 进度回调函数，参数为(进度百分比, 阶段说明)
+            
+        Returns:
+            (成功标志, 检测结果或错误信息)
+        """
+        try:
+            if not os.path.exists(image_path):
+                self.last_error = f"影像文件不存在: {image_path}"
+                return False, {"error": self.last_error}
+            
+            if not self.check_api_availability():
+                self.last_error = "API服务不可用"
+                return False, {"error": self.last_error}
+            
+            engine = TiledInferenceEngine(
+                self.detection_task, tile_size=tile_size, overlap=overlap, max_workers=max_workers,
+                submit_kwargs={"model_name": model_name, "confidence": confidence, "params": params},
+                progress_callback=progress_callback)
+            result = engine.run_detection(image_path, iou_threshold)
+            return not result["cancelled"], result
+            
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"分块目标检测失败: {str(e)}")
+            return False, {"error": str(e)}
+    
     def get_available_models(self) -> List[Dict[str, Any]]:
         """获取可用的目标检测模型列表
         
@@ -7,6 +7,7 @@ import logging
 from typing import Dict, Any, List, Optional, Tuple
 
 from .api_base import ApiBaseModel
+from .tiled_inference import TiledInferenceEngine
 
 
 class ApiSegmentationModel(ApiBaseModel):
@@ -59,6 +60,50 @@ class ApiSegmentationModel(ApiBaseModel):
             self.logger.error(f"语义分割失败: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    def segment_large_image(self, image_path: str, output_path: str,
+                            model_name: str = "default",
+                            params: Optional[Dict[str, Any]] = None,
+                            tile_size: int = 1024, overlap: int = 128,
+                            max_workers: int = 4,
+                            progress_callback=None) -> Dict[str, Any]:
+        """分块语义分割大幅影像
+        
+        影像切分为相互重叠的窗口并发提交，结果融合拼接为带地理参考的整景掩膜
+        
+        Args:
+            image_path: 影像路径
+            output_path: 拼接结果保存路径（GeoTIFF）
+            model_name: 模型名称
+            params: 其他参数
+            tile_size: 窗口边长（像素），一般取模型的输入尺寸
+            overlap: 相邻窗口的重叠像素数
+            max_workers: 并发线程数
+            progress_callback: 进度回调函数，参数为(进度百分比, 阶段说明)
+            
+        Returns:
+            分割结果，包含 'success'、窗口数 'tiles' 和 'output_path'
+        """
+        try:
+            if not os.path.exists(image_path):
+                self.last_error = f"影像文件不存在: {image_path}"
+                return {"success": False, "error": self.last_error}
+            
+            if not self.check_api_availability():
+                self.last_error = "API服务不可用"
+                return {"success": False, "error": self.last_error}
+            
+            engine = TiledInferenceEngine(
+                self.segmentation_task, tile_size=tile_size, overlap=overlap, max_workers=max_workers,
+                submit_kwargs={"model_name": model_name, "params": params or {}},
+                progress_callback=progress_callback)
+            stats = engine.run_segmentation(image_path, output_path)
+            return dict(stats, success=not stats["cancelled"])
+            
+        except Exception as e:
+            self.last_error = str(e)
+            self.logger.error(f"分块语义分割失败: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
     def get_available_models(self) -> List[Dict[str, Any]]:
         """获取可用的语义分割模型列表
         
@@ -0,0 +1,358 @@
+"""
+批量任务执行引擎
+在有界并发窗口内将文件逐个提交到推理服务，集中并发轮询已提交任务的状态，
+按文件回调进度，并将结果和结果文件写入输出目录
+"""
+import os
+import json
+import time
+import glob
+import logging
+import shutil
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Optional, Callable
+
+from utils.api_client.client import ApiError, CircuitOpenError
+from utils.api_client.resilience import PollBackoff
+
+
+# 批量任务支持的影像扩展名
+IMAGE_EXTENSIONS = ('.tif', '.tiff', '.jpg', '.jpeg', '.png')
+
+# 单个文件任务的状态
+JOB_PENDING = "pending"
+JOB_SUBMITTING = "submitting"
+JOB_RUNNING = "running"
+JOB_DOWNLOADING = "downloading"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+def list_image_files(directory: str) -> List[str]:
+    """列出目录下的影像文件（按文件名排序）
+
+    Args:
+        directory: 目录路径
+
+    Returns:
+        影像文件路径列表
+    """
+    files = []
+    for path in glob.glob(os.path.join(directory, "*")):
+        if os.path.isfile(path) and os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS:
+            files.append(path)
+    return sorted(files)
+
+
+class BatchJobEngine:
+    """批量任务执行引擎
+
+    每个作业对应一次submit_task调用（单个文件或一对前后期影像）。
+    同时处于上传或运行中的作业数受max_in_flight限制；上传在线程池中并行进行，
+    已提交作业的状态在每个轮询周期内通过一次批量查询获取，而不是每个作业独占一个等待线程；
+    轮询间隔按指数退避从很短逐步放大到poll_interval。
+    任务结果中以 _url 结尾的文件地址在线程池中并发下载到输出目录，与其他作业的上传和轮询重叠进行。
+
+    使用示例:
+        engine = BatchJobEngine(segmentation_task, output_dir, max_workers=4,
+                                progress_callback=callback)
+        stats = engine.run(BatchJobEngine.jobs_from_files(files))
+    """
+
+    # 等待上传或下载期间检查取消的最长间隔（秒）
+    CANCEL_CHECK_INTERVAL = 0.5
+
+    def __init__(self, task_handler, output_dir: str, max_workers: int = 4,
+                 max_in_flight: Optional[int] = None, poll_interval: float = 2.0,
+                 max_wait_time: float = 3600, submit_kwargs: Optional[Dict[str, Any]] = None,
+                 progress_callback: Optional[Callable] = None):
+        """初始化批量任务执行引擎
+
+        Args:
+            task_handler: 任务处理器（SegmentationTask、DetectionTask等）
+            output_dir: 结果输出目录
+            max_workers: 上传和下载的并发线程数
+            max_in_flight: 同时处于上传或运行中的最大作业数，默认为线程数的4倍
+            poll_interval: 轮询间隔上限（秒）
+            max_wait_time: 单个作业的最大等待时间（秒）
+            submit_kwargs: 传递给submit_task的额外参数（模型名称等）
+            progress_callback: 进度回调函数，参数为(作业字典, 总体进度百分比)
+        """
+        self.task_handler = task_handler
+        self.api_client = task_handler.api_client
+        self.output_dir = output_dir
+        self.max_workers = max(1, max_workers)
+        self.max_in_flight = max_in_flight or self.max_workers * 4
+        self.poll_interval = poll_interval
+        self.max_wait_time = max_wait_time
+        self.submit_kwargs = submit_kwargs or {}
+        self.progress_callback = progress_callback
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.last_error = None
+
+        self._cancel_event = threading.Event()
+
+    @staticmethod
+    def jobs_from_files(files: List[str]) -> List[Dict[str, Any]]:
+        """由文件列表创建作业列表
+
+        Args:
+            files: 影像文件路径列表
+
+        Returns:
+            作业列表
+        """
+        return [
+            {"name": os.path.splitext(os.path.basename(path))[0], "inputs": (path,)}
+            for path in files
+        ]
+
+    @staticmethod
+    def jobs_from_pairs(before_files: List[str], after_files: List[str]) -> List[Dict[str, Any]]:
+        """由前后期影像创建变化检测作业列表
+
+        优先按同名文件配对；没有同名文件时按排序后的顺序配对
+
+        Args:
+            before_files: 前期影像路径列表
+            after_files: 后期影像路径列表
+
+        Returns:
+            作业列表
+        """
+        stem = lambda path: os.path.splitext(os.path.basename(path))[0]
+        after_by_name = {stem(path): path for path in after_files}
+
+        pairs = [(path, after_by_name[stem(path)]) for path in before_files if stem(path) in after_by_name]
+        if not pairs:
+            pairs = list(zip(sorted(before_files), sorted(after_files)))
+
+        return [{"name": stem(before), "inputs": (before, after)} for before, after in pairs]
+
+    def cancel(self):
+        """取消尚未提交的作业，已提交的作业不再等待结果"""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消"""
+        return self._cancel_event.is_set()
+
+    def _submit(self, job: Dict[str, Any]) -> Optional[str]:
+        """在工作线程中查找结果缓存，未命中时上传文件并提交任务
+
+        Returns:
+            任务ID，命中缓存时返回None（结果已写入job['result']）
+        """
+        key, result = self.task_handler.get_cached_result(*job["inputs"], **self.submit_kwargs)
+        job["cache_key"] = key
+        if result is not None:
+            job["result"] = result
+            return None
+        return self.task_handler.submit_task(*job["inputs"], **self.submit_kwargs)
+
+    def _download_results(self, job: Dict[str, Any]):
+        """在工作线程中下载结果中的文件（键名以 _url 结尾），已缓存的文件直接复制
+
+        下载完成的文件路径写入job['files']，键为去掉 _url 后缀的名称；
+        结果中同名的 _sha256 字段（如 segmentation_sha256）用于校验
+        """
+        cache = self.task_handler.result_cache
+        for key, url in job["result"].items():
+            if not key.endswith("_url") or not isinstance(url, str) or not url:
+                continue
+            name = key[:-len("_url")]
+            extension = os.path.splitext(urlparse(url).path)[1] or ".tif"
+            save_path = os.path.join(self.output_dir, f"{job['name']}_{name}{extension}")
+
+            cached_path = cache.get_file(job["cache_key"], name + extension) \
+                if cache is not None and job["cache_key"] else None
+            if cached_path:
+                shutil.copyfile(cached_path, save_path)
+            else:
+                self.api_client.download_file(url, save_path, checksum=job["result"].get(f"{name}_sha256"))
+                if cache is not None and job["cache_key"]:
+                    cache.put_file(job["cache_key"], name + extension, save_path)
+            job["files"][name] = save_path
+
+    def _save_result(self, job: Dict[str, Any]) -> str:
+        """将任务结果写入输出目录
+
+        Returns:
+            结果文件路径
+        """
+        output_path = os.path.join(self.output_dir, f"{job['name']}_result.json")
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "inputs": list(job["inputs"]),
+                "task_id": job["task_id"],
+                "cached": job["cached"],
+                "result": job["result"],
+                "files": job["files"]
+            }, f, ensure_ascii=False, indent=2)
+        return output_path
+
+    def run(self, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """执行所有作业，阻塞直到全部完成、失败或被取消
+
+        应在后台线程中调用，不要在Qt界面线程中调用
+
+        Args:
+            jobs: 作业列表，每个元素包含 'name' 和 'inputs'
+
+        Returns:
+            执行统计，包含完成作业、失败列表（作业, 错误信息）、是否取消和耗时
+        """
+        total = len(jobs)
+        stats = {"completed": [], "failed": [], "cancelled": False, "elapsed": 0.0}
+        if total == 0:
+            return stats
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        start_time = time.time()
+
+        for job in jobs:
+            job.update({"status": JOB_PENDING, "task_id": None, "progress": 0, "cache_key": None,
+                        "cached": False, "result": None, "files": {}, "error": None, "output_path": None})
+
+        queue = list(reversed(jobs))
+        submitting = {}   # Future -> 作业
+        running = []      # 已提交、等待结果的作业
+        downloading = {}  # Future -> 作业（下载结果文件）
+
+        def report(job):
+            if self.progress_callback:
+                finished = len(stats["completed"]) + len(stats["failed"])
+                self.progress_callback(job, int(finished * 100 / total))
+
+        def download(job):
+            # 结果中没有文件地址时直接完成
+            if any(key.endswith("_url") for key in job["result"]):
+                job["status"] = JOB_DOWNLOADING
+                downloading[executor.submit(self._download_results, job)] = job
+                report(job)
+            else:
+                finish(job)
+
+        def finish(job, error=None):
+            if error is None:
+                try:
+                    job["output_path"] = self._save_result(job)
+                except Exception as e:
+                    error = f"保存结果失败: {str(e)}"
+
+            if error is None:
+                job["status"], job["progress"] = JOB_COMPLETED, 100
+                stats["completed"].append(job)
+            else:
+                job["status"], job["error"] = JOB_FAILED, error
+                self.last_error = f"{job['name']}: {error}"
+                stats["failed"].append((job, error))
+            report(job)
+
+        backoff = PollBackoff(max_interval=self.poll_interval)
+        # 服务熔断期间暂停提交，到该时刻后恢复
+        resume_at = 0.0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            next_poll = time.time()
+
+            while queue or submitting or running or downloading:
+                if self.cancelled:
+                    stats["cancelled"] = True
+                    for future in list(submitting) + list(downloading):
+                        future.cancel()
+                    break
+
+                # 在并发窗口内提交新作业
+                while queue and time.time() >= resume_at and len(submitting) + len(running) < self.max_in_flight:
+                    job = queue.pop()
+                    job["status"] = JOB_SUBMITTING
+                    submitting[executor.submit(self._submit, job)] = job
+
+                # 等待上传或下载完成，最多等到下一个轮询时刻
+                timeout = max(0.0, next_poll - time.time()) if running else None
+                if submitting or downloading:
+                    # 分段等待，只有上传或下载在进行时也能及时响应取消
+                    wait_timeout = self.CANCEL_CHECK_INTERVAL if timeout is None \
+                        else min(timeout, self.CANCEL_CHECK_INTERVAL)
+                    done, _ = wait(list(submitting) + list(downloading), timeout=wait_timeout,
+                                   return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future in downloading:
+                            job = downloading.pop(future)
+                            try:
+                                future.result()
+                                finish(job)
+                            except Exception as e:
+                                finish(job, f"下载结果文件失败: {str(e)}")
+                            continue
+
+                        job = submitting.pop(future)
+                        try:
+                            job["task_id"] = future.result()
+                            if job["task_id"] is None:
+                                # 命中结果缓存，无需等待
+                                job["cached"] = True
+                                download(job)
+                                continue
+                            job["status"], job["started"] = JOB_RUNNING, time.time()
+                            if not running:
+                                # 从空闲恢复时以最短间隔开始轮询
+                                backoff.reset()
+                                next_poll = time.time() + backoff.next()
+                            running.append(job)
+                            report(job)
+                        except CircuitOpenError as e:
+                            # 服务熔断中：作业放回队列，熔断结束后再提交，而不是逐个判定失败
+                            job["status"] = JOB_PENDING
+                            queue.append(job)
+                            resume_at = max(resume_at, time.time() + max(e.retry_after, 1.0))
+                            self.logger.warning(f"API服务熔断中，{resume_at - time.time():.0f} 秒后继续提交")
+                        except Exception as e:
+                            finish(job, f"提交任务失败: {str(e)}")
+                elif running and timeout > 0:
+                    self._cancel_event.wait(timeout)
+                elif queue and not running:
+                    self._cancel_event.wait(max(0.0, resume_at - time.time()))
+
+                if not running or time.time() < next_poll:
+                    continue
+
+                # 批量查询所有运行中作业的状态
+                try:
+                    statuses = self.api_client.get_task_statuses([job["task_id"] for job in running])
+                except ApiError as e:
+                    # 单次查询失败不终止作业，超时后再判定失败
+                    statuses = {}
+                    self.logger.warning(f"查询任务状态失败: {str(e)}")
+
+                still_running = []
+                for job in running:
+                    task_info = statuses.get(job["task_id"], {"status": JOB_RUNNING})
+                    status = task_info.get("status")
+                    if status == "completed":
+                        job["result"] = task_info.get("result", {})
+                        self.task_handler.store_result(job["cache_key"], job["result"])
+                        download(job)
+                    elif status == "failed":
+                        finish(job, f"任务执行失败: {task_info.get('error', '未知错误')}")
+                    elif time.time() - job["started"] > self.max_wait_time:
+                        finish(job, f"等待任务超时: {job['task_id']}")
+                    else:
+                        progress = task_info.get("progress")
+                        if isinstance(progress, (int, float)) and int(progress) != job["progress"]:
+                            job["progress"] = int(progress)
+                            report(job)
+                        still_running.append(job)
+
+                running = still_running
+                next_poll = time.time() + backoff.next()
+
+        stats["elapsed"] = time.time() - start_time
+        if self.task_handler.result_cache is not None:
+            # 批次结束时保存命中缓存带来的最近使用时间变化
+            self.task_handler.result_cache.flush()
+        return stats
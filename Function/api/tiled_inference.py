@@ -0,0 +1,383 @@
+"""
+分块推理引擎
+将大幅影像切分为相互重叠的窗口，通过批量任务引擎并发提交到推理服务，
+分割结果按重叠区域加权融合拼接为带地理参考的整景结果，检测结果换算到整景坐标后做全局NMS
+"""
+import os
+import shutil
+import logging
+import tempfile
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+import numpy as np
+from PIL import Image
+
+from utils.geo import (TileExporter, TileFormat, GridPlanner, DatasetPool, KIND_GDAL, KIND_RASTERIO,
+                       RASTERIO_AVAILABLE, GDAL_AVAILABLE)
+from .batch_engine import BatchJobEngine
+
+if RASTERIO_AVAILABLE:
+    import rasterio
+    from rasterio.windows import Window
+
+if GDAL_AVAILABLE:
+    from osgeo import gdal, gdal_array
+
+
+class TiledInferenceEngine:
+    """分块推理引擎
+
+    窗口大小为tile_size，相邻窗口至少重叠overlap像素，窗口起点对齐源数据的内部块，
+    最后一行/列窗口贴齐影像边缘。
+    分块结果约定:
+        分割: 结果中的 segmentation_url 指向与窗口同尺寸的掩膜影像
+        检测: 结果中的 detections 列表，每个目标包含窗口内像素坐标 'bbox' [x1, y1, x2, y2]、
+              'class' 和 'confidence'
+
+    使用示例:
+        engine = TiledInferenceEngine(segmentation_task, tile_size=1024, overlap=128,
+                                      submit_kwargs={"model_name": "deeplab"})
+        stats = engine.run_segmentation(image_path, output_path)
+    """
+
+    # 拼接结果时每次写出的行数
+    WRITE_ROWS = 1024
+
+    def __init__(self, task_handler, tile_size: int = 1024, overlap: int = 128,
+                 max_workers: int = 4, work_dir: Optional[str] = None,
+                 submit_kwargs: Optional[Dict[str, Any]] = None,
+                 progress_callback: Optional[Callable[[int, str], None]] = None,
+                 align_blocks: bool = False):
+        """初始化分块推理引擎
+
+        Args:
+            task_handler: 任务处理器（SegmentationTask或DetectionTask）
+            tile_size: 窗口边长（像素），一般取模型的输入尺寸
+            overlap: 相邻窗口的重叠像素数
+            max_workers: 切分、上传和下载的并发线程数
+            work_dir: 存放分块影像和分块结果的目录，为None时使用临时目录并在结束后删除
+            submit_kwargs: 传递给submit_task的额外参数（模型名称等）
+            progress_callback: 进度回调函数，参数为(进度百分比, 阶段说明)
+            align_blocks: 是否将窗口起点对齐到源数据的内部块；对齐会缩短步长、增加推理请求数，默认不对齐
+        """
+        if tile_size <= 0 or overlap < 0 or overlap >= tile_size:
+            raise ValueError("窗口大小必须大于0，重叠像素数必须小于窗口大小")
+
+        self.task_handler = task_handler
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.max_workers = max(1, max_workers)
+        self.work_dir = work_dir
+        self.submit_kwargs = submit_kwargs or {}
+        self.progress_callback = progress_callback
+        self.align_blocks = align_blocks
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.last_error = None
+
+        self.batch_engine = None
+        self._cancelled = False
+
+    @staticmethod
+    def plan_windows(width: int, height: int, tile_size: int, overlap: int,
+                     block: Optional[Tuple[int, int]] = None) -> List[Tuple[int, int, int, int]]:
+        """规划相互重叠的推理窗口，最后一行/列窗口贴齐影像边缘
+
+        Args:
+            width: 影像宽度
+            height: 影像高度
+            tile_size: 窗口边长
+            overlap: 相邻窗口的最小重叠像素数
+            block: 源数据的内部块尺寸 (块宽, 块高)，不为None时窗口起点对齐到块边界
+
+        Returns:
+            窗口列表，每个元素为 (x, y, width, height)
+        """
+        cells = GridPlanner.size_grid(width, height, tile_size, overlap=overlap, block=block, snap_last=True)
+        return [cell["position"] for cell in cells]
+
+    @staticmethod
+    def _blend_weights(height: int, width: int, ramp: int) -> np.ndarray:
+        """生成窗口的融合权重：中心为1，在重叠宽度内向边缘线性减小"""
+        def profile(length):
+            distance = np.minimum(np.arange(length), np.arange(length)[::-1]) + 1
+            return np.clip(distance / max(ramp, 1), 1e-3, 1.0).astype(np.float32)
+        return np.outer(profile(height), profile(width))
+
+    @staticmethod
+    def non_max_suppression(detections: List[Dict[str, Any]], iou_threshold: float = 0.5) -> List[Dict[str, Any]]:
+        """按类别做非极大值抑制
+
+        Args:
+            detections: 检测结果列表，每个元素包含 'bbox'、'class' 和 'confidence'
+            iou_threshold: 重叠度阈值，超过该值的低置信度目标被抑制
+
+        Returns:
+            保留的检测结果，按置信度降序排列
+        """
+        kept = []
+        classes = {}
+        for det in detections:
+            classes.setdefault(det.get("class"), []).append(det)
+
+        for group in classes.values():
+            boxes = np.array([det["bbox"] for det in group], dtype=np.float64)
+            scores = np.array([det.get("confidence", 0) for det in group], dtype=np.float64)
+            areas = np.maximum(boxes[:, 2] - boxes[:, 0], 0) * np.maximum(boxes[:, 3] - boxes[:, 1], 0)
+            order = np.argsort(-scores)
+
+            while order.size:
+                best = order[0]
+                kept.append(group[best])
+                rest = order[1:]
+                x1 = np.maximum(boxes[best, 0], boxes[rest, 0])
+                y1 = np.maximum(boxes[best, 1], boxes[rest, 1])
+                x2 = np.minimum(boxes[best, 2], boxes[rest, 2])
+                y2 = np.minimum(boxes[best, 3], boxes[rest, 3])
+                intersection = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+                iou = intersection / np.maximum(areas[best] + areas[rest] - intersection, 1e-9)
+                order = rest[iou <= iou_threshold]
+
+        return sorted(kept, key=lambda det: det.get("confidence", 0), reverse=True)
+
+    def cancel(self):
+        """取消分块推理"""
+        self._cancelled = True
+        if self.batch_engine is not None:
+            self.batch_engine.cancel()
+
+    def _report(self, percent: int, message: str):
+        if self.progress_callback:
+            self.progress_callback(percent, message)
+
+    def _source_info(self, image_path: str) -> Dict[str, Any]:
+        """读取影像尺寸和地理参考（GDAL风格的geo_transform和投影）"""
+        # 句柄留在句柄池中，随后切分窗口时直接复用
+        if GDAL_AVAILABLE:
+            with DatasetPool.open(image_path, KIND_GDAL) as dataset:
+                return {
+                    "width": dataset.RasterXSize,
+                    "height": dataset.RasterYSize,
+                    "geo_transform": dataset.GetGeoTransform(),
+                    "projection": dataset.GetProjection(),
+                    "crs": None,
+                    "block": GridPlanner.block_shape(dataset)
+                }
+
+        if RASTERIO_AVAILABLE:
+            with DatasetPool.open(image_path, KIND_RASTERIO) as dataset:
+                return {
+                    "width": dataset.width,
+                    "height": dataset.height,
+                    "geo_transform": dataset.transform.to_gdal(),
+                    "projection": dataset.crs.to_wkt() if dataset.crs else "",
+                    "crs": dataset.crs,
+                    "block": GridPlanner.block_shape(dataset)
+                }
+
+        raise RuntimeError("缺少GDAL或rasterio库，无法进行分块推理")
+
+    def _infer_tiles(self, image_path: str, work_dir: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """切分影像并提交所有窗口，阻塞直到全部完成
+
+        Returns:
+            (已完成的作业列表（含 'window'）, 影像信息)
+        """
+        info = self._source_info(image_path)
+        windows = self.plan_windows(info["width"], info["height"], self.tile_size, self.overlap,
+                                    info["block"] if self.align_blocks else None)
+        self.logger.info(f"分块推理: {image_path}, {len(windows)} 个窗口")
+
+        # 切分窗口，分块影像保留地理参考，便于服务端和缓存使用
+        tile_dir = os.path.join(work_dir, "tiles")
+        os.makedirs(tile_dir, exist_ok=True)
+        tiles = [{"position": window, "output_path": os.path.join(tile_dir, f"tile_{window[1]}_{window[0]}.tif")}
+                 for window in windows]
+        exporter = TileExporter(image_path, max_workers=self.max_workers,
+                                progress_callback=lambda done, total, stats: self._report(
+                                    int(done * 10 / total), "切分窗口"))
+        export_stats = exporter.export(tiles)
+        if export_stats["failed"]:
+            raise IOError(f"切分窗口失败: {export_stats['failed'][0][1]}")
+
+        if self._cancelled:
+            return [], info
+
+        # 通过批量任务引擎并发提交，相同窗口的结果可命中结果缓存
+        jobs = BatchJobEngine.jobs_from_files([tile["output_path"] for tile in tiles])
+        for job, window in zip(jobs, windows):
+            job["window"] = window
+
+        self.batch_engine = BatchJobEngine(
+            self.task_handler, os.path.join(work_dir, "results"),
+            max_workers=self.max_workers, submit_kwargs=self.submit_kwargs,
+            progress_callback=lambda job, percent: self._report(10 + int(percent * 0.8), "推理窗口"))
+        stats = self.batch_engine.run(jobs)
+        self.batch_engine = None
+
+        if stats["failed"]:
+            job, error = stats["failed"][0]
+            raise RuntimeError(f"{len(stats['failed'])} 个窗口推理失败，例如 {job['name']}: {error}")
+        return stats["completed"], info
+
+    @staticmethod
+    def _read_mask(path: str) -> np.ndarray:
+        """读取掩膜影像为 (波段, 行, 列) 数组，保留原始数据类型"""
+        if RASTERIO_AVAILABLE:
+            with rasterio.open(path) as dataset:
+                return dataset.read()
+        if GDAL_AVAILABLE:
+            dataset = gdal.Open(path, gdal.GA_ReadOnly)
+            if dataset is not None:
+                data = dataset.ReadAsArray()
+                return data[np.newaxis, :, :] if data.ndim == 2 else data
+        data = np.asarray(Image.open(path))
+        return data[np.newaxis, :, :] if data.ndim == 2 else np.transpose(data, (2, 0, 1))
+
+    def _write_mosaic(self, output_path: str, mosaic: np.ndarray, info: Dict[str, Any]):
+        """按行分段将拼接结果写出为带地理参考的GeoTIFF"""
+        bands, height, width = mosaic.shape
+
+        if GDAL_AVAILABLE:
+            data_type = gdal_array.NumericTypeCodeToGDALTypeCode(mosaic.dtype)
+            dataset = gdal.GetDriverByName("GTiff").Create(
+                output_path, width, height, bands, data_type,
+                options=TileFormat().gdal_options(mosaic.dtype))
+            if dataset is None:
+                raise IOError(f"无法创建输出文件: {output_path}")
+            dataset.SetGeoTransform(info["geo_transform"])
+            if info["projection"]:
+                dataset.SetProjection(info["projection"])
+            for row in range(0, height, self.WRITE_ROWS):
+                rows = mosaic[:, row:row + self.WRITE_ROWS]
+                for band in range(bands):
+                    dataset.GetRasterBand(band + 1).WriteArray(np.asarray(rows[band]), 0, row)
+            dataset = None
+            return
+
+        profile = {
+            "width": width, "height": height, "count": bands,
+            "dtype": mosaic.dtype.name, "crs": info["crs"],
+            "transform": rasterio.transform.Affine.from_gdal(*info["geo_transform"])
+        }
+        profile.update(TileFormat().rasterio_profile(mosaic.dtype))
+        with rasterio.open(output_path, "w", **profile) as dataset:
+            for row in range(0, height, self.WRITE_ROWS):
+                rows = np.asarray(mosaic[:, row:row + self.WRITE_ROWS])
+                dataset.write(rows, window=Window(0, row, width, rows.shape[1]))
+
+    def run_segmentation(self, image_path: str, output_path: str) -> Dict[str, Any]:
+        """分块语义分割并拼接为整景结果
+
+        整数类型的掩膜（类别图）在重叠区域取融合权重最大的窗口的结果，
+        浮点类型的掩膜（概率图）按融合权重加权平均；拼接缓冲区为磁盘映射文件，内存占用与影像大小无关
+
+        Args:
+            image_path: 影像路径
+            output_path: 拼接结果保存路径（GeoTIFF）
+
+        Returns:
+            执行统计，包含窗口数和输出路径；取消时 'cancelled' 为True
+        """
+        work_dir = self.work_dir or tempfile.mkdtemp(prefix="rsiis_tiles_")
+        try:
+            jobs, info = self._infer_tiles(image_path, work_dir)
+            if self._cancelled:
+                return {"tiles": len(jobs), "output_path": None, "cancelled": True}
+
+            height, width = info["height"], info["width"]
+            mosaic = weights = None
+
+            for index, job in enumerate(jobs):
+                mask_path = job["files"].get("segmentation")
+                if not mask_path:
+                    raise RuntimeError(f"窗口结果中没有分割掩膜: {job['name']}")
+                x, y, w, h = job["window"]
+                mask = self._read_mask(mask_path)
+                if mask.shape[1:] != (h, w):
+                    # 服务端返回尺寸与窗口不一致时按最近邻缩放到窗口大小
+                    rows = np.arange(h) * mask.shape[1] // h
+                    cols = np.arange(w) * mask.shape[2] // w
+                    mask = mask[:, rows][:, :, cols]
+
+                if mosaic is None:
+                    categorical = not np.issubdtype(mask.dtype, np.floating)
+                    mosaic = np.lib.format.open_memmap(
+                        os.path.join(work_dir, "mosaic.npy"), mode="w+",
+                        dtype=mask.dtype if categorical else np.float32,
+                        shape=(mask.shape[0], height, width))
+                    weights = np.lib.format.open_memmap(
+                        os.path.join(work_dir, "weights.npy"), mode="w+", dtype=np.float32, shape=(height, width))
+
+                weight = self._blend_weights(h, w, self.overlap)
+                region = weights[y:y + h, x:x + w]
+                if categorical:
+                    better = weight > region
+                    mosaic[:, y:y + h, x:x + w][:, better] = mask[:, better]
+                    region[better] = weight[better]
+                else:
+                    mosaic[:, y:y + h, x:x + w] += mask * weight
+                    region += weight
+
+                self._report(90 + int((index + 1) * 8 / len(jobs)), "拼接结果")
+
+            if mosaic is None:
+                raise RuntimeError("没有可拼接的窗口结果")
+            if not categorical:
+                for row in range(0, height, self.WRITE_ROWS):
+                    mosaic[:, row:row + self.WRITE_ROWS] /= np.maximum(weights[row:row + self.WRITE_ROWS], 1e-6)
+
+            self._write_mosaic(output_path, mosaic, info)
+            del mosaic, weights
+            self._report(100, "完成")
+            return {"tiles": len(jobs), "output_path": output_path, "cancelled": False}
+        except Exception as e:
+            self.last_error = f"分块分割失败: {str(e)}"
+            raise
+        finally:
+            if not self.work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    def run_detection(self, image_path: str, iou_threshold: float = 0.5) -> Dict[str, Any]:
+        """分块目标检测并合并结果
+
+        各窗口的检测框平移到整景像素坐标后，按类别做全局NMS消除重叠区域的重复目标；
+        影像带地理参考时为每个目标附加地理坐标 'geo_bbox' [minx, miny, maxx, maxy]
+
+        Args:
+            image_path: 影像路径
+            iou_threshold: NMS重叠度阈值
+
+        Returns:
+            与单张检测结果相同格式的字典，包含 'detections' 和 'tiles'
+        """
+        work_dir = self.work_dir or tempfile.mkdtemp(prefix="rsiis_tiles_")
+        try:
+            jobs, info = self._infer_tiles(image_path, work_dir)
+
+            detections = []
+            for job in jobs:
+                x, y = job["window"][:2]
+                for det in job["result"].get("detections", []):
+                    if not det.get("bbox"):
+                        continue
+                    x1, y1, x2, y2 = det["bbox"]
+                    detections.append(dict(det, bbox=[x1 + x, y1 + y, x2 + x, y2 + y]))
+
+            detections = self.non_max_suppression(detections, iou_threshold)
+
+            gt = info["geo_transform"]
+            if gt and tuple(gt) != (0.0, 1.0, 0.0, 0.0, 0.0, 1.0):
+                for det in detections:
+                    x1, y1, x2, y2 = det["bbox"]
+                    xs = [gt[0] + px * gt[1] + py * gt[2] for px, py in ((x1, y1), (x2, y2))]
+                    ys = [gt[3] + px * gt[4] + py * gt[5] for px, py in ((x1, y1), (x2, y2))]
+                    det["geo_bbox"] = [min(xs), min(ys), max(xs), max(ys)]
+
+            self._report(100, "完成")
+            return {"detections": detections, "tiles": len(jobs), "cancelled": self._cancelled}
+        except Exception as e:
+            self.last_error = f"分块检测失败: {str(e)}"
+            raise
+        finally:
+            if not self.work_dir:
+                shutil.rmtree(work_dir, ignore_errors=True)
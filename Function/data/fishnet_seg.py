@@ -18,8 +18,14 @@ except ImportError:
     GDAL_AVAILABLE = False
 
 # 导入封装好的栅格和矢量处理工具
-from utils.geo import RasterLoader, RasterData, VectorUtils
+from utils.geo import RasterLoader, RasterData, VectorUtils, TileExporter
 from utils.geo import RASTERIO_AVAILABLE, GDAL_AVAILABLE, VECTOR_LIBS_AVAILABLE
+from utils.geo.stretch import StretchEngine, STRETCH_CUMULATIVE
+from utils.geo.grid_planner import GridPlanner, PLAN_COUNT, PLAN_SIZE
+from utils.geo.tile_format import TileFormat
+from utils.geo.virtual_export import VirtualTileExporter, VIRTUAL_VRT, VIRTUAL_INDEX
+from utils.geo.process_export import ProcessTileExporter
+from utils.geo.dataset_pool import DatasetPool, KIND_GDAL
 
 class FishnetSegmentation:
     """
@@ -28,14 +34,32 @@ class FishnetSegmentation:
     支持常规图像和GeoTIFF格式
     """
     
+    # 影像像素数超过该阈值时，自动使用按窗口延迟读取的网格模式
+    LAZY_PIXEL_THRESHOLD = 8192 * 8192
+    
+    # 导入时显示用预览图的最长边像素数，全分辨率数据只在导出瓦片时读取
+    PREVIEW_SIZE = 4096
+    
+    # 瓦片数达到该值且CPU核数足够时，GeoTIFF瓦片使用多进程导出
+    PROCESS_EXPORT_MIN_TILES = 256
+    PROCESS_EXPORT_MIN_CPUS = 4
+    
     def __init__(self):
         self.image_path = None
         self.image = None
         self.grid_params = {
-            "grid_count": (4, 4)  # 默认4x4网格
+            "grid_count": (4, 4),  # 默认4x4网格
+            "mode": PLAN_COUNT,    # 规划方式：按数量(PLAN_COUNT)或按固定尺寸(PLAN_SIZE)
+            "tile_size": (512, 512),  # 按尺寸规划时的网格宽高
+            "overlap": 0,          # 按尺寸规划时相邻网格的重叠像素数
+            "align_blocks": False, # 是否将网格边界对齐到GeoTIFF的内部块/条带
+            "lazy": None           # 延迟读取模式，None表示根据影像大小自动选择
         }
         self.grid_result = []
         
+        # 当前网格是否为延迟读取模式
+        self.lazy_grid = False
+        
         # 使用 RasterData 存储栅格数据
         self.raster_data = None
         
@@ -56,9 +80,12 @@ class FishnetSegmentation:
         self.last_error = None
         self.image_path = image_path
         
+        # 重新加载时归还上一景的数据集句柄
+        self.close()
+        
         try:
             # 使用封装的 RasterLoader 加载栅格数据
-            raster_data, success = RasterLoader.load(image_path)
+            raster_data, success = RasterLoader.load(image_path, preview_size=self.PREVIEW_SIZE)
             
             if not success:
                 self.last_error = raster_data.error_message
@@ -96,44 +123,250 @@ class FishnetSegmentation:
             self.last_error = error_msg
             return False, {"error": str(e), "detailed_error": error_details}
     
-    def set_grid_parameters(self, grid_count):
+    def set_band_combination(self, red, green, blue):
+        """
+        切换显示用的RGB波段组合，已读取过的波段直接从内存取用，不重新加载影像
+
+        Args:
+            red, green, blue: 波段序号（从1开始）
+
+        Returns:
+            bool: 是否成功
+            dict: 新的波段组合或错误信息
+        """
+        success, message = RasterLoader.set_rgb_bands(self.raster_data, red, green, blue)
+        if not success:
+            self.last_error = message
+            return False, {"error": message}
+
+        self.image = self.raster_data.image
+        # 已裁剪的网格图像基于旧的波段组合，清除后按需从新的显示数据读取
+        for grid in self.grid_result or []:
+            grid['image_data'] = None
+        return True, {"band_combination": self.raster_data.metadata["band_combination"]}
+
+    def set_grid_parameters(self, grid_count, mode=None, tile_size=None, overlap=None, align_blocks=None):
         """
         设置网格参数
         
         Args:
             grid_count: 元组 (rows, cols) 表示网格的行数和列数
+            mode: 规划方式，PLAN_COUNT按数量，PLAN_SIZE按固定尺寸，None表示不改变
+            tile_size: 按尺寸规划时的网格尺寸，整数或 (宽, 高)
+            overlap: 按尺寸规划时相邻网格的重叠像素数
+            align_blocks: 是否将网格边界对齐到GeoTIFF的内部块/条带
             
         Returns:
             bool: 设置是否成功
-            dict: 计算出的网格信息
+            dict: 计算出的网格信息，包含按该规划读取的I/O开销估算 'cost'
         """
         try:
             rows, cols = grid_count
             if rows <= 0 or cols <= 0:
                 return False, {"error": "网格行数和列数必须大于0"}
             
-            self.grid_params["grid_count"] = (rows, cols)
+            params = dict(self.grid_params, grid_count=(rows, cols))
+            if mode is not None:
+                params["mode"] = mode
+            if tile_size is not None:
+                params["tile_size"] = tile_size if isinstance(tile_size, tuple) else (tile_size, tile_size)
+            if overlap is not None:
+                params["overlap"] = overlap
+            if align_blocks is not None:
+                params["align_blocks"] = align_blocks
             
-            if self.image:
-                width, height = self.image.size
-                grid_width = width // cols
-                grid_height = height // rows
-                
-                return True, {
-                    "grid_count": (rows, cols),
-                    "grid_size": (grid_width, grid_height),
-                    "image_size": (width, height)
-                }
-            else:
+            if not self.image:
                 return False, {"error": "未加载图像"}
+            
+            width, height = self.get_image_size()
+            cells = self._plan_grid(params)
+            self.grid_params = params
+            
+            return True, {
+                "grid_count": (max(c['row'] for c in cells), max(c['col'] for c in cells)),
+                "grid_size": cells[0]['position'][2:],
+                "image_size": (width, height),
+                "cost": self.estimate_grid_cost(cells)
+            }
         except Exception as e:
             self.last_error = f"设置网格参数出错: {str(e)}"
             return False, {"error": str(e)}
     
-    def generate_grid(self):
+    def _block_shape(self):
+        """获取数据源的内部块尺寸 (块宽, 块高)，无法按窗口读取的数据源返回None"""
+        if not self.raster_data:
+            return None
+        return GridPlanner.block_shape(self.raster_data.rasterio_dataset or self.raster_data.gdal_dataset)
+    
+    def _plan_grid(self, params=None):
+        """
+        按网格参数规划网格窗口
+        
+        Args:
+            params: 网格参数，None表示使用当前参数
+            
+        Returns:
+            list: 网格列表，每个元素包含 'position'、'row' 和 'col'
+        """
+        params = params or self.grid_params
+        width, height = self.get_image_size()
+        block = self._block_shape() if params.get("align_blocks") else None
+        
+        if params.get("mode") == PLAN_SIZE:
+            tile_width, tile_height = params["tile_size"]
+            return GridPlanner.size_grid(width, height, tile_width, tile_height,
+                                         overlap=params.get("overlap", 0), block=block)
+        
+        rows, cols = params["grid_count"]
+        return GridPlanner.count_grid(width, height, rows, cols, block=block)
+    
+    def estimate_grid_cost(self, cells=None):
+        """
+        估算按网格读取数据源的I/O开销
+        
+        Args:
+            cells: 网格列表，None表示按当前参数规划
+            
+        Returns:
+            dict: GridPlanner.estimate_cost 的返回值
+        """
+        if cells is None:
+            cells = self._plan_grid()
+        width, height = self.get_image_size()
+        
+        bytes_per_pixel = 3
+        if self.raster_data and self.raster_data.bands_count:
+            try:
+                bytes_per_pixel = self.raster_data.bands_count * np.dtype(self.raster_data.data_type).itemsize
+            except TypeError:
+                bytes_per_pixel = self.raster_data.bands_count
+        
+        return GridPlanner.estimate_cost(cells, width, height, self._block_shape(), bytes_per_pixel)
+    
+    def get_image_size(self):
+        """
+        获取原始影像的全分辨率尺寸
+        
+        Returns:
+            tuple: (宽度, 高度)
+        """
+        if self.raster_data and self.raster_data.width and self.raster_data.height:
+            return self.raster_data.width, self.raster_data.height
+        return self.image.size
+    
+    def _use_lazy_grid(self, lazy=None):
+        """
+        判断是否使用延迟读取的网格模式
+        
+        Args:
+            lazy: 显式指定的模式，None表示根据影像大小自动选择
+            
+        Returns:
+            bool: 是否使用延迟读取模式
+        """
+        # 只有能够按窗口读取的数据源才支持延迟模式
+        if not self.raster_data or (self.raster_data.rasterio_dataset is None
+                                    and self.raster_data.gdal_dataset is None):
+            return False
+        
+        # 预览图不是全分辨率数据，只能从数据源按窗口读取
+        if self.raster_data.is_preview:
+            return True
+        
+        if lazy is None:
+            lazy = self.grid_params.get("lazy")
+        if lazy is None:
+            width, height = self.get_image_size()
+            return width * height > self.LAZY_PIXEL_THRESHOLD
+        return bool(lazy)
+    
+    def _to_display_position(self, position):
+        """
+        将全分辨率像素位置换算到显示图像（可能为预览图）上的位置
+        
+        Args:
+            position: 全分辨率下的 (x, y, width, height)
+            
+        Returns:
+            tuple: 显示图像上的 (x, y, width, height)
+        """
+        if not self.raster_data or not self.raster_data.is_preview:
+            return position
+        
+        scale_x, scale_y = self.raster_data.preview_scale
+        x, y, width, height = position
+        return (int(x * scale_x), int(y * scale_y),
+                max(1, int(round(width * scale_x))), max(1, int(round(height * scale_y))))
+    
+    def _has_scene_buffer(self):
+        """判断是否持有全分辨率的整景RGB显示缓冲区，可直接在其上切片得到网格"""
+        array = self.raster_data.array if self.raster_data else None
+        return (array is not None and not self.raster_data.is_preview
+                and array.ndim == 3 and array.shape[2] == 3 and array.dtype == np.uint8)
+    
+    def get_grid_array(self, grid):
+        """
+        获取网格的RGB像素数组
+        
+        非延迟模式下直接返回整景显示缓冲区上的视图（不复制数据），
+        延迟模式下从数据源按窗口读取
+        
+        Args:
+            grid: 网格结果字典
+            
+        Returns:
+            numpy.ndarray: 形状为(height, width, 3)的uint8数组
+        """
+        x, y, width, height = grid['position']
+        
+        if self._has_scene_buffer():
+            return self.raster_data.array[y:y + height, x:x + width]
+        
+        if grid.get('image_data') is not None:
+            return np.asarray(grid['image_data'].convert('RGB'))
+        
+        return RasterLoader.read_window_rgb(self.raster_data, x, y, width, height)
+    
+    def get_grid_image(self, grid):
+        """
+        获取网格的图像数据，延迟模式下从数据源按窗口读取
+        
+        Args:
+            grid: 网格结果字典
+            
+        Returns:
+            PIL.Image: 网格图像
+        """
+        if grid.get('image_data') is not None:
+            return grid['image_data']
+        
+        return Image.fromarray(self.get_grid_array(grid))
+    
+    def _prepare_raw_cache(self, cancel_event=None):
+        """
+        开启原始栅格缓存时生成（或复用）整景缓存，之后网格窗口由波段访问器在内存映射上切片，
+        同一景影像重复分割和浏览不再读取和解压源文件
+        
+        Returns:
+            bool: 生成缓存期间被取消时返回False
+        """
+        if not RasterLoader.USE_RAW_CACHE or not self.raster_data or not self.raster_data.is_geotiff:
+            return True
+        cube = RasterLoader.raw_bands(self.raster_data, cancel_event=cancel_event)
+        return cube is not None or cancel_event is None or not cancel_event.is_set()
+    
+    def generate_grid(self, lazy=None, progress_callback=None, cancel_event=None):
         """
         生成网格分割
         
+        延迟模式下每个网格只记录窗口位置，像素数据在需要时才从数据源读取，
+        峰值内存只与单个网格大小相关，而与整景影像大小无关
+        
+        Args:
+            lazy: 是否使用延迟读取模式，None表示根据影像大小自动选择
+            progress_callback: 进度回调函数，参数为(已完成数, 总数)
+            cancel_event: threading.Event，被设置时停止分割并清空结果
+        
         Returns:
             bool: 分割是否成功
             list: 分割结果列表，每个元素为一个字典，包含位置、行列信息和图像数据
@@ -142,64 +375,62 @@ class FishnetSegmentation:
             return False, {"error": "未加载图像"}
         
         try:
-            # 获取图像尺寸
-            width, height = self.image.size
-            
-            # 获取网格参数
-            rows, cols = self.grid_params["grid_count"]
-            
-            # 计算每个网格的标准尺寸
-            std_width = width // cols
-            std_height = height // rows
+            use_lazy = self._use_lazy_grid(lazy)
+            # 持有整景缓冲区时网格直接取其视图，无需再裁剪出独立的PIL图像
+            use_view = not use_lazy and self._has_scene_buffer()
+            if not use_view and not self._prepare_raw_cache(cancel_event):
+                return False, {"error": "渔网分割已取消", "cancelled": True}
             
             # 生成网格结果
             self.grid_result = []
+            self.lazy_grid = use_lazy
             
             # 直接使用原始图像进行裁剪，不再使用增强的图像
             original_image = self.image
             
-            for row in range(rows):
-                for col in range(cols):
-                    # 计算当前网格的位置
-                    x = col * std_width
-                    y = row * std_height
-                    
-                    # 计算实际宽高（处理不能整除的情况）
-                    actual_width = std_width if col < cols - 1 else (width - x)
-                    actual_height = std_height if row < rows - 1 else (height - y)
-                    
-                    # 跳过无效的裁剪区域
-                    if actual_width <= 0 or actual_height <= 0:
-                        continue
-                    
-                    # 确保不超出图像边界
-                    actual_width = min(actual_width, width - x)
-                    actual_height = min(actual_height, height - y)
-                    
-                    # 裁剪原始图像
-                    try:
+            # 按数量或固定尺寸规划网格窗口，按参数对齐到内部块边界
+            cells = self._plan_grid()
+            total = len(cells)
+            report_every = max(1, total // 100)
+            
+            for index, cell in enumerate(cells, start=1):
+                if cancel_event is not None and cancel_event.is_set():
+                    self.grid_result = []
+                    return False, {"error": "渔网分割已取消", "cancelled": True}
+                if progress_callback and (index % report_every == 0 or index == total):
+                    progress_callback(index, total)
+                
+                x, y, actual_width, actual_height = cell['position']
+                row, col = cell['row'], cell['col']
+                
+                # 裁剪原始图像
+                try:
+                    if use_lazy or use_view:
+                        # 延迟模式只记录窗口，不读取像素数据；视图模式按需在整景缓冲区上切片
+                        grid_img = None
+                    else:
                         crop_box = (x, y, x + actual_width, y + actual_height)
                         grid_img = original_image.crop(crop_box)
                         
                         # 检查裁剪结果是否为空
                         if grid_img.size[0] <= 0 or grid_img.size[1] <= 0:
                             continue
-                        
-                        grid_data = {
-                            'position': (x, y, actual_width, actual_height),
-                            'image_data': grid_img,  # 这里存储PIL图像对象
-                            'row': row + 1,
-                            'col': col + 1
-                        }
-                        
-                        # 如果是GeoTIFF，添加地理参考信息
-                        if self.raster_data and self.raster_data.is_geotiff and self.raster_data.geo_transform:
-                            self._add_geo_info_to_grid(grid_data, x, y, actual_width, actual_height)
-                        
-                        # 添加到结果列表
-                        self.grid_result.append(grid_data)
-                    except Exception as e:
-                        self.last_error = f"裁剪网格出错: 位置({row+1},{col+1}), 错误: {str(e)}"
+                    
+                    grid_data = {
+                        'position': (x, y, actual_width, actual_height),
+                        'image_data': grid_img,  # 这里存储PIL图像对象，延迟/视图模式下为None
+                        'row': row,
+                        'col': col
+                    }
+                    
+                    # 如果是GeoTIFF，添加地理参考信息
+                    if self.raster_data and self.raster_data.is_geotiff and self.raster_data.geo_transform:
+                        self._add_geo_info_to_grid(grid_data, x, y, actual_width, actual_height)
+                    
+                    # 添加到结果列表
+                    self.grid_result.append(grid_data)
+                except Exception as e:
+                    self.last_error = f"裁剪网格出错: 位置({row},{col}), 错误: {str(e)}"
             
             return True, self.grid_result
         except Exception as e:
@@ -237,7 +468,7 @@ class FishnetSegmentation:
         """
         return self.grid_result
     
-    def _clip_geotiff_with_gdal(self, input_path, output_path, x_off, y_off, width, height):
+    def _clip_geotiff_with_gdal(self, input_path, output_path, x_off, y_off, width, height, tile_format=None):
         """
         使用GDAL库裁剪GeoTIFF并保存地理信息
         
@@ -246,6 +477,7 @@ class FishnetSegmentation:
             output_path: 输出文件路径
             x_off, y_off: 裁剪起始位置的像素坐标
             width, height: 裁剪区域的宽度和高度
+            tile_format: 输出格式（压缩、分块、COG等），None表示DEFLATE压缩的分块GeoTIFF
             
         Returns:
             bool: 裁剪是否成功
@@ -254,63 +486,51 @@ class FishnetSegmentation:
             return False
             
         try:
-            # 打开源文件
-            from osgeo import gdal
-            src_ds = gdal.Open(input_path)
-            if not src_ds:
-                self.last_error = f"无法打开输入文件: {input_path}"
-                return False
-            
-            # 获取地理变换和投影信息
-            src_geotransform = src_ds.GetGeoTransform()
-            src_proj = src_ds.GetProjection()
-            bands_count = src_ds.RasterCount
-            
-            # 计算新的地理变换参数
-            new_geotransform = list(src_geotransform)
-            new_geotransform[0] = src_geotransform[0] + x_off * src_geotransform[1]
-            new_geotransform[3] = src_geotransform[3] + y_off * src_geotransform[5]
-            
-            # 创建目标文件
-            driver = gdal.GetDriverByName('GTiff')
-            dst_ds = driver.Create(output_path, width, height, bands_count, 
-                                  src_ds.GetRasterBand(1).DataType)
-            
-            # 设置目标文件的地理信息
-            dst_ds.SetGeoTransform(new_geotransform)
-            dst_ds.SetProjection(src_proj)
-            
-            # 对每个波段进行裁剪
-            for i in range(1, bands_count + 1):
-                src_band = src_ds.GetRasterBand(i)
-                dst_band = dst_ds.GetRasterBand(i)
+            # 从句柄池获取源数据集，逐个裁剪时不重复解析文件头
+            with DatasetPool.open(input_path, KIND_GDAL) as src_ds:
+                # 获取地理变换和投影信息
+                src_geotransform = src_ds.GetGeoTransform()
+                src_proj = src_ds.GetProjection()
+                bands_count = src_ds.RasterCount
                 
-                data = src_band.ReadAsArray(x_off, y_off, width, height)
-                dst_band.WriteArray(data)
+                # 计算新的地理变换参数
+                new_geotransform = list(src_geotransform)
+                new_geotransform[0] = src_geotransform[0] + x_off * src_geotransform[1]
+                new_geotransform[3] = src_geotransform[3] + y_off * src_geotransform[5]
                 
-                # 复制NoData值
-                nodata_value = src_band.GetNoDataValue()
-                if nodata_value is not None:
-                    dst_band.SetNoDataValue(nodata_value)
-            
-            # 关闭数据集
-            src_ds = None
-            dst_ds = None
+                # 读取所有波段，按输出格式的创建选项写出
+                data = src_ds.ReadAsArray(x_off, y_off, width, height)
+                if data.ndim == 2:
+                    data = data[np.newaxis, :, :]
+                nodata_values = [src_ds.GetRasterBand(i).GetNoDataValue() for i in range(1, bands_count + 1)]
+                
+                (tile_format or TileFormat()).write_gdal(output_path, data, new_geotransform, src_proj,
+                                                         nodata_values, src_ds.GetRasterBand(1).DataType)
             
             return True
         except Exception as e:
             self.last_error = f"GDAL裁剪出错: {str(e)}"
             return False
             
-    def export_result(self, export_dir, create_subfolders=True, export_shp=False, export_as_image=False):
+    def export_result(self, export_dir, create_subfolders=True, export_shp=False, export_as_image=False,
+                      max_workers=None, progress_callback=None, tile_format=None, virtual=None,
+                      vector_format=".shp", cancel_event=None, use_processes=None):
         """
         导出分割结果
         
         Args:
             export_dir: 导出目录
             create_subfolders: 是否创建子文件夹
-            export_shp: 是否导出Shapefile矢量格式
+            export_shp: 是否导出网格矢量文件
             export_as_image: 是否导出为普通图像格式（PNG）而不是GeoTIFF
+            max_workers: GeoTIFF瓦片并行写出的线程数，None表示按CPU核数自动选择
+            progress_callback: 进度回调函数，参数为(已完成数, 总数, 统计信息字典)
+            tile_format: GeoTIFF瓦片的输出格式（COG、压缩方式、金字塔等），None表示DEFLATE压缩的分块GeoTIFF
+            virtual: 虚拟导出方式，VIRTUAL_VRT为每个瓦片一个VRT，VIRTUAL_INDEX为整幅影像VRT加瓦片索引
+                     GeoPackage；None表示写出实体瓦片
+            vector_format: 网格矢量文件的格式（扩展名），".shp"、".gpkg"或".fgb"
+            cancel_event: threading.Event，被设置时停止写出剩余瓦片，已写出的文件保留
+            use_processes: 是否使用多进程导出GeoTIFF瓦片，None表示按瓦片数和CPU核数自动选择
             
         Returns:
             bool: 导出是否成功
@@ -340,63 +560,74 @@ class FishnetSegmentation:
             
             # 保存结果
             saved_files = []
+            export_stats = None
+            png_grids = list(self.grid_result)
             
             # 1. 保存每个网格图像
-            for grid in self.grid_result:
-                row, col = grid['row'], grid['col']
-                grid_img = grid['image_data']
-                x, y, width, height = grid['position']
+            # 根据是否有地理参考信息以及用户选择的格式，选择不同的保存方式
+            is_geotiff_source = (self.raster_data and self.raster_data.is_geotiff and not export_as_image
+                                 and (GDAL_AVAILABLE or RASTERIO_AVAILABLE)
+                                 and self.image_path.lower().endswith(('.tif', '.tiff')))
+            if is_geotiff_source and virtual:
+                # 虚拟导出：只写出引用源影像窗口的VRT，不复制像素数据
+                exporter = VirtualTileExporter(self.image_path, progress_callback=progress_callback,
+                                               cancel_event=cancel_event)
+                if virtual == VIRTUAL_INDEX:
+                    export_stats = exporter.export_index(
+                        self.grid_result,
+                        os.path.join(save_dir, f"{base_name}_瓦片.vrt"),
+                        os.path.join(save_dir, f"{base_name}_瓦片索引.gpkg"))
+                else:
+                    tiles = [{
+                        'position': grid['position'],
+                        'output_path': os.path.join(grids_dir, f"{base_name}_{grid['row']}_{grid['col']}.vrt")
+                    } for grid in self.grid_result]
+                    export_stats = exporter.export_vrts(tiles)
+                    if export_stats['failed']:
+                        self.last_error = exporter.last_error
+                saved_files.extend(export_stats['saved'])
+                png_grids = []
+            elif is_geotiff_source:
+                # 保存为GeoTIFF：使用流式导出引擎并行写出（保留完整地理信息）
+                tiles = []
+                for grid in self.grid_result:
+                    save_name = f"{base_name}_{grid['row']}_{grid['col']}.tif"
+                    tiles.append({
+                        'position': grid['position'],
+                        'output_path': os.path.join(grids_dir, save_name),
+                        'grid': grid
+                    })
                 
-                # 根据是否有地理参考信息以及用户选择的格式，选择不同的保存方式
-                if self.raster_data and self.raster_data.is_geotiff and not export_as_image:
-                    # 保存为GeoTIFF
-                    save_name = f"{base_name}_{row}_{col}.tif"
-                    save_path = os.path.join(grids_dir, save_name)
-                    
-                    # 首先尝试使用GDAL进行裁剪和保存（保留完整地理信息）
-                    if GDAL_AVAILABLE and self.image_path.lower().endswith(('.tif', '.tiff')):
-                        gdal_success = self._clip_geotiff_with_gdal(
-                            self.image_path, save_path, x, y, width, height
-                        )
-                        if gdal_success:
-                            saved_files.append(save_path)
-                            continue
-                    
-                    # 如果GDAL失败或不可用，尝试使用rasterio
-                    if RASTERIO_AVAILABLE and 'geo_window' in grid and self.raster_data.rasterio_dataset:
-                        try:
-                            import rasterio
-                            window = grid['geo_window']
-                            
-                            # 读取原始数据（保留所有波段）
-                            data = self.raster_data.rasterio_dataset.read(window=window)
-                            
-                            # 写入GeoTIFF
-                            profile = self.raster_data.rasterio_dataset.profile.copy()
-                            profile.update({
-                                'height': window.height,
-                                'width': window.width,
-                                'transform': grid['geo_transform']
-                            })
-                            
-                            with rasterio.open(save_path, 'w', **profile) as dst:
-                                dst.write(data)
-                                
-                            saved_files.append(save_path)
-                            continue
-                        except Exception as e:
-                            # 如果rasterio也失败，记录错误但继续以普通图像格式保存
-                            self.last_error = f"使用rasterio保存分割图像失败: {str(e)}"
-                    
-                    # 如果所有地理信息保存方法都失败，退回到保存为常规图像
-                    self.last_error = "无法保存为GeoTIFF，将保存为常规图像"
+                if use_processes is None:
+                    use_processes = (len(tiles) >= self.PROCESS_EXPORT_MIN_TILES
+                                     and (os.cpu_count() or 1) >= self.PROCESS_EXPORT_MIN_CPUS)
                 
+                # 大量瓦片时每个进程独立读取和编码一段瓦片，不受GIL限制
+                exporter_class = ProcessTileExporter if use_processes else TileExporter
+                exporter = exporter_class(self.image_path, max_workers=max_workers,
+                                          progress_callback=progress_callback, tile_format=tile_format,
+                                          cancel_event=cancel_event)
+                export_stats = exporter.export(tiles)
+                saved_files.extend(export_stats['saved'])
+                
+                # 如果GeoTIFF保存失败，退回到保存为常规图像
+                png_grids = [tile['grid'] for tile, _ in export_stats['failed']]
+                if png_grids:
+                    self.last_error = f"{exporter.last_error}，将保存为常规图像"
+            
+            for grid in png_grids:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
                 # 保存为常规图像格式（PNG）
-                save_name = f"{base_name}_{row}_{col}.png"
+                save_name = f"{base_name}_{grid['row']}_{grid['col']}.png"
                 save_path = os.path.join(grids_dir, save_name)
-                grid_img.save(save_path)
+                self.get_grid_image(grid).save(save_path)
                 saved_files.append(save_path)
             
+            if cancel_event is not None and cancel_event.is_set():
+                return False, {"error": "导出已取消", "cancelled": True, "save_dir": save_dir,
+                               "files": saved_files}
+            
             # 2. 保存分割示意图
             overview_path = os.path.join(save_dir, f"{base_name}_网格分割示意图.png")
             self._create_overview_image(overview_path)
@@ -410,17 +641,27 @@ class FishnetSegmentation:
                         os.makedirs(shp_folder)
                     
                     # 导出矢量文件
-                    shp_path = os.path.join(shp_folder, f"{base_name}_grids.shp")
-                    self._export_grid_shapefile(shp_path)
-                    saved_files.append(shp_path)
+                    shp_path = os.path.join(shp_folder, f"{base_name}_grids{vector_format}")
+                    if self._export_grid_shapefile(shp_path):
+                        saved_files.append(shp_path)
                 except Exception as e:
                     self.last_error = f"导出矢量文件失败: {str(e)}"
             
-            return True, {
+            result = {
                 "save_dir": save_dir,
                 "files_count": len(saved_files),
                 "files": saved_files
             }
+            
+            # 附带导出吞吐量统计
+            if export_stats:
+                result["throughput"] = {
+                    "elapsed": export_stats['elapsed'],
+                    "tiles_per_sec": export_stats['tiles_per_sec'],
+                    "mb_per_sec": export_stats.get('mb_per_sec', 0.0)
+                }
+            
+            return True, result
         
         except Exception as e:
             self.last_error = f"导出结果出错: {str(e)}"
@@ -467,7 +708,7 @@ class FishnetSegmentation:
             
             # 绘制网格线和编号
             for i, grid in enumerate(self.grid_result):
-                x, y, grid_width, grid_height = grid['position']
+                x, y, grid_width, grid_height = self._to_display_position(grid['position'])
                 
                 # 绘制网格边框，使用红色
                 # 线宽也随图像尺寸变化
@@ -493,75 +734,57 @@ class FishnetSegmentation:
             self.last_error = f"创建示意图出错: {str(e)}"
             return False
             
-    def create_overview_image_for_ui(self):
+    def create_overview_pyramid_for_ui(self, min_size=256):
         """
-        创建分割示意图，用于UI显示
+        创建分割示意图的多分辨率金字塔，用于UI分块显示
         
+        金字塔只包含影像本身，网格线和编号由UI层以矢量叠加层绘制，
+        重新生成网格时无需重建金字塔
+        
+        Args:
+            min_size: 金字塔最顶层的最长边不小于该像素数
+            
         Returns:
-            dict: 包含示意图图像数据和元数据的字典，可用于UI层创建预览图像
-                 或None（如果创建失败）
+            list: 各层的UI兼容图像数据（第0层为显示图像原始分辨率，逐层缩小一半），
+                  失败时返回None
         """
         try:
-            if not self.image or not self.grid_result:
+            if not self.image:
                 return None
             
-            # 使用原始图像，不再应用任何增强
-            overview_img = self.image.copy()
-            
-            # 在PIL图像上绘制网格线和编号
-            from PIL import ImageDraw, ImageFont
-            draw = ImageDraw.Draw(overview_img)
-            
-            # 获取图像尺寸，计算适当的字体大小
-            img_width, img_height = overview_img.size
-            # 字体大小基于图像宽度，确保在小图像上字体不会太小，在大图像上不会太大
-            font_size = max(16, min(96, int(img_width / 40)))
-            
-            # 尝试加载字体，如果失败则使用默认字体
-            try:
-                # 尝试使用系统字体
-                font = ImageFont.truetype("arial.ttf", font_size)
-            except:
-                # 如果无法加载TrueType字体，使用默认字体
-                font = ImageFont.load_default()
-            
-            # 红色网格线和编号 - 使用纯红色RGB值(R, G, B)
-            # 注意：在convert_pil_to_qimage_format方法中会将RGB转换为BGR
-            # 因此，真正的红色应该是(255, 0, 0)
-            grid_color = (255, 0, 0)  # 纯红色
-            text_color = (255, 0, 0)  # 纯红色文字
-            text_bg_color = (255, 255, 255, 180)  # 白色半透明背景
-            
-            # 绘制网格线和编号
-            for i, grid in enumerate(self.grid_result):
-                x, y, grid_width, grid_height = grid['position']
-                
-                # 线宽也随图像尺寸变化
-                line_width = max(2, int(img_width / 800))
-                
-                # 绘制网格边框，使用红色
-                # 注意：指定宽度为line_width像素确保线条清晰可见
-                draw.rectangle([x, y, x + grid_width, y + grid_height], outline=grid_color, width=line_width)
-                
-                # 绘制编号背景
-                text = f"{i+1}"
-                
-                # 绘制背景矩形
-                text_width, text_height = font.getsize(text) if hasattr(font, 'getsize') else (font_size*len(text), font_size)
-                # 确保背景矩形足够大
-                padding = max(4, int(font_size / 3))
-                draw.rectangle([x+padding, y+padding, x+padding+text_width+padding*2, y+padding+text_height+padding*2], fill=text_bg_color)
-                
-                # 绘制文本
-                draw.text((x+padding*2, y+padding*2), text, fill=text_color, font=font)
-            
-            # 将PIL图像转换为UI兼容格式
-            return self.convert_pil_to_qimage_format(overview_img, already_enhanced=False)
+            # 第0层：优先直接使用整景缓冲区，避免从PIL图像复制
+            if self._has_scene_buffer():
+                base_array = self.raster_data.array
+            else:
+                base_array = np.asarray(self.image.convert('RGB'))
+            levels = [self.convert_array_to_qimage_format(base_array)]
             
+            level_image = None
+            width, height = self.image.size
+            while max(width, height) // 2 >= min_size:
+                if level_image is None:
+                    level_image = Image.fromarray(base_array)
+                level_image = level_image.reduce(2)
+                width, height = level_image.size
+                levels.append(self.convert_array_to_qimage_format(np.asarray(level_image)))
+            
+            return levels
         except Exception as e:
-            self.last_error = f"创建预览示意图出错: {str(e)}"
+            self.last_error = f"创建示意图金字塔出错: {str(e)}"
             return None
     
+    def get_grid_overlay_for_ui(self):
+        """
+        获取网格叠加层数据，坐标为显示图像（金字塔第0层）上的像素坐标
+        
+        Returns:
+            list: 每个元素为 {'rect': (x, y, width, height), 'label': 编号文本}
+        """
+        return [
+            {'rect': self._to_display_position(grid['position']), 'label': f"{i+1}"}
+            for i, grid in enumerate(self.grid_result)
+        ]
+    
     def convert_pil_to_qimage_format(self, pil_image, already_enhanced=False):
         """
         将PIL图像转换为QImage兼容的格式（不直接返回QImage对象，保持模型层与UI层的分离）
@@ -578,34 +801,64 @@ class FishnetSegmentation:
             if pil_image.mode != 'RGB':
                 pil_image = pil_image.convert('RGB')
             
-            # 不再应用任何增强处理
+            return self.convert_array_to_qimage_format(np.asarray(pil_image))
+        except Exception as e:
+            self.last_error = f"图像格式转换出错: {str(e)}"
+            return None
+    
+    def convert_array_to_qimage_format(self, array):
+        """
+        将RGB数组转换为QImage兼容的格式，不复制像素数据
+        
+        对于整景缓冲区上的子区域视图，返回覆盖该区域所有行的一维连续缓冲区，
+        UI层按bytes_per_line作为行跨度直接在这块内存上构造QImage
+        
+        Args:
+            array: 形状为(height, width, 3)的uint8数组，可以是带行跨度的视图
+            
+        Returns:
+            dict: 包含图像数据和元数据的字典。QImage不拥有这块内存，
+                  UI层需要在QImage使用期间保持对该字典（或'data'）的引用
+        """
+        try:
+            height, width = array.shape[:2]
+            
+            if array.dtype != np.uint8 or array.ndim != 3 or array.shape[2] != 3 \
+                    or array.strides[1:] != (3, 1):
+                # 像素内部不连续时只能整理为连续数组
+                array = np.ascontiguousarray(array, dtype=np.uint8)
+            
+            bytes_per_line = array.strides[0]
+            length = (height - 1) * bytes_per_line + width * 3
             
-            # 获取图像数据
-            width, height = pil_image.size
-            data = pil_image.tobytes("raw", "RGB")
+            # 以一维连续视图覆盖全部行（包括行间属于整景其他区域的字节）
+            data = np.lib.stride_tricks.as_strided(array, shape=(length,), strides=(1,))
             
-            # 返回图像数据和元数据，使用RGB格式
             return {
                 "data": data,
+                "array": array,
                 "width": width,
                 "height": height,
-                "bytes_per_line": width * 3,
+                "bytes_per_line": bytes_per_line,
                 "format": "RGB888"  # 对应于QImage.Format_RGB888
             }
         except Exception as e:
             self.last_error = f"图像格式转换出错: {str(e)}"
             return None
             
-    def get_ui_compatible_results(self):
+    def get_ui_compatible_results(self, grids=None):
         """
         获取用于UI显示的兼容结果
         
+        Args:
+            grids: 要转换的网格列表，None表示全部分割结果
+        
         Returns:
             list: 转换后的分割结果列表，适用于UI层
         """
         ui_result = []
         
-        for grid in self.grid_result:
+        for grid in (self.grid_result if grids is None else grids):
             # 复制基本信息
             ui_grid = {
                 'position': grid['position'],
@@ -613,20 +866,21 @@ class FishnetSegmentation:
                 'col': grid['col']
             }
             
-            # 将PIL图像转换为UI兼容格式
-            pil_image = grid['image_data']
-            ui_grid['image_data'] = self.convert_pil_to_qimage_format(pil_image, already_enhanced=False)
+            # 直接使用像素数组，不经过PIL和字节串复制
+            ui_grid['image_data'] = self.convert_array_to_qimage_format(self.get_grid_array(grid))
             
             ui_result.append(ui_grid)
         
         return ui_result
 
+    def close(self):
+        """归还数据集句柄，句柄由句柄池按LRU关闭"""
+        if getattr(self, 'raster_data', None) is not None:
+            RasterLoader.close(self.raster_data)
+    
     def __del__(self):
         """析构函数，确保释放资源"""
-        # 关闭资源
-        if hasattr(self, 'raster_data') and self.raster_data:
-            if self.raster_data.rasterio_dataset:
-                self.raster_data.rasterio_dataset.close()
+        self.close()
 
     def _enhance_grid_image(self, pil_image):
         """
@@ -657,30 +911,14 @@ class FishnetSegmentation:
             if array is None or array.size == 0:
                 return np.zeros((10, 10, 3), dtype=np.uint8)
             
-            # 替换无效值（负值或异常大值）
-            array = np.nan_to_num(array, nan=0, posinf=0, neginf=0)
-            
-            # 判断数据类型和范围
-            if array.dtype != np.uint8:
-                # 使用Cumulative count cut方法 (2%-98%)
-                p2 = np.percentile(array, 2)    # 2%的数据小于此值
-                p98 = np.percentile(array, 98)  # 98%的数据小于此值
-                
-                # 避免除零错误
-                if p98 - p2 < 0.0001:
-                    # 退回到简单的最大最小值归一化
-                    min_val = np.min(array)
-                    max_val = np.max(array)
-                    if max_val - min_val < 0.0001:
-                        min_val, max_val = 0, 1
-                    normalized = np.clip((array - min_val) / (max_val - min_val) * 255, 0, 255).astype(np.uint8)
-                else:
-                    # 线性拉伸到0-255范围，使用累积截断值
-                    normalized = np.clip((array - p2) / (p98 - p2) * 255, 0, 255).astype(np.uint8)
-                
-                return normalized
+            if array.dtype == np.uint8:
+                return array
             
-            return array
+            # 使用Cumulative count cut方法 (2%-98%)，基于抽样统计；
+            # 范围过小时StretchEngine会自动退回到安全范围
+            lows, highs = StretchEngine.compute_stats(array, mode=STRETCH_CUMULATIVE,
+                                                      per_band=False, cut=(2.0, 98.0))
+            return StretchEngine.apply(array, lows, highs)
             
         except Exception as e:
             # 如果处理失败，尝试返回原始数组
@@ -692,29 +930,24 @@ class FishnetSegmentation:
 
     def _export_grid_shapefile(self, output_path):
         """
-        导出网格为Shapefile格式
+        导出网格外框为矢量文件
         
         Args:
-            output_path: 输出文件路径
+            output_path: 输出文件路径，格式由扩展名决定（.shp、.gpkg或.fgb）
             
         Returns:
             bool: 导出是否成功
         """
         if not VECTOR_LIBS_AVAILABLE:
-            self.last_error = "无法导出Shapefile，缺少fiona库"
+            self.last_error = "无法导出矢量文件，缺少fiona库"
             return False
             
         if not self.raster_data or not self.raster_data.is_geotiff:
-            self.last_error = "只有带有地理坐标信息的图像才能导出为Shapefile"
+            self.last_error = "只有带有地理坐标信息的图像才能导出为矢量文件"
             return False
             
-        try:
-            # 利用VectorUtils导出网格为Shapefile
-            return VectorUtils.export_grid_to_shapefile(
-                output_path, 
-                self.grid_result, 
-                self.raster_data
-            )
-        except Exception as e:
-            self.last_error = f"导出Shapefile失败: {str(e)}"
-            return False
+        # 利用VectorUtils批量计算网格外框并写出
+        success, message = VectorUtils.export_grid(self.raster_data, self.grid_result, output_path)
+        if not success:
+            self.last_error = message
+        return success
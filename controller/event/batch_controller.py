@@ -9,6 +9,7 @@ import json
 import csv
 import random
 import shutil
+import threading
 from datetime import datetime
 from typing import Dict, Any, List, Tuple, Optional
 from PySide6.QtWidgets import QFileDialog, QMessageBox, QApplication
@@ -30,8 +31,8 @@ class BatchController(QObject):
     task_started = Signal(str)                # 任务开始
     task_finished = Signal(str)               # 任务完成
     task_failed = Signal(str, str)            # 任务失败（任务ID，错误信息）
-    task_status_changed = Signal(str, str)    # 任务状态改变（任务ID，新状态）
-    task_progress_changed = Signal(str, int)  # 任务进度改变（任务ID，进度百分比）
+    task_status_changed = Signal(str, str)    # 任务状态改变（任务ID或"任务ID/文件名"，新状态）
+    task_progress_changed = Signal(str, int)  # 任务进度改变（任务ID或"任务ID/文件名"，进度百分比）
     task_list_changed = Signal(list)          # 任务列表改变
     
     def __init__(self, api_client=None):
@@ -68,6 +69,14 @@ class BatchController(QObject):
         # 任务缓存
         self.task_cache = []
         
+        # 当前在后台线程中运行的批量任务（任务ID，线程）
+        self.current_task_id = None
+        self.worker_thread = None
+        
+        # 后台线程发出的完成/失败信号以排队方式回到界面线程处理
+        self.task_finished.connect(self._on_task_finished)
+        self.task_failed.connect(self._on_task_failed)
+        
         # 初始化API模型
         try:
             self.api_model = ApiBatchProcessingModel()
@@ -289,63 +298,107 @@ class BatchController(QObject):
                 QMessageBox.warning(None, "目录错误", "请先选择有效的输出目录")
                 return False
         
+        if not self.api_model:
+            # API不可用
+            self.logger.error("API服务不可用，无法执行任务")
+            QMessageBox.warning(None, "执行失败", "API服务不可用，无法执行任务")
+            return False
+        
+        if self.is_task_running():
+            QMessageBox.warning(None, "执行失败", "已有批量处理任务正在运行，请等待其完成")
+            return False
+        
+        task_id = f"{task_type}_{int(time.time())}"
+        self.current_task_id = task_id
+        self.worker_thread = threading.Thread(
+            target=self._run_batch_task,
+            args=(task_id, task_type),
+            name=f"BatchTask-{task_id}",
+            daemon=True
+        )
+        self.worker_thread.start()
+        
+        self.task_created.emit(task_id)
+        self.task_started.emit(task_id)
+        self.task_status_changed.emit(task_id, "running")
+        
+        # 提示用户任务已开始（任务在后台执行，不阻塞界面）
+        QMessageBox.information(
+            None, 
+            "任务开始", 
+            f"正在开始{self.task_types[task_type]}批量处理任务..."
+        )
+        return True
+    
+    def _run_batch_task(self, task_id, task_type):
+        """在后台线程中执行批量任务，通过信号报告进度和结果
+        
+        Args:
+            task_id: 任务ID
+            task_type: 任务类型
+        """
+        def on_progress(job, overall):
+            # 单个文件的进度和状态（ID为"批次任务ID/文件名"，避免与批次任务ID冲突），以及整个批次的进度
+            file_id = f"{task_id}/{job['name']}"
+            self.task_status_changed.emit(file_id, job["status"])
+            self.task_progress_changed.emit(file_id, job["progress"])
+            self.task_progress_changed.emit(task_id, overall)
+        
         try:
-            # 显示进度提示
-            QApplication.setOverrideCursor(Qt.WaitCursor)
-            
-            # 提示用户任务已开始
-            QMessageBox.information(
-                None, 
-                "任务开始", 
-                f"正在开始{self.task_types[task_type]}批量处理任务..."
-            )
-            
-            # 直接执行任务
-            success = False
-            if self.api_model:
-                # 根据任务类型调用不同的API执行方法
-                if task_type == "segmentation":
-                    success = self.api_model.execute_segmentation_task(self.input_dir, self.output_dir)
-                elif task_type == "detection":
-                    success = self.api_model.execute_detection_task(self.input_dir, self.output_dir)
-                elif task_type == "classification":
-                    success = self.api_model.execute_classification_task(self.input_dir, self.output_dir)
-                elif task_type == "change_detection":
-                    success = self.api_model.execute_change_detection_task(
-                        self.before_dir, self.after_dir, self.output_dir
-                    )
-            else:
-                # API不可用
-                self.logger.error("API服务不可用，无法执行任务")
-                QMessageBox.warning(None, "执行失败", "API服务不可用，无法执行任务")
-                QApplication.restoreOverrideCursor()
-                return False
-            
-            # 恢复鼠标指针
-            QApplication.restoreOverrideCursor()
-            
-            if success:
-                self.logger.info(f"成功执行{self.task_types[task_type]}任务")
-                
-                # 显示成功消息
-                QMessageBox.information(
-                    None, 
-                    "任务执行成功", 
-                    f"{self.task_types[task_type]}任务执行成功！\n结果已保存到: {self.output_dir}"
+            if task_type == "change_detection":
+                success = self.api_model.execute_change_detection_task(
+                    self.before_dir, self.after_dir, self.output_dir,
+                    progress_callback=on_progress
                 )
-                return True
             else:
-                self.logger.error(f"执行{self.task_types[task_type]}任务失败")
-                QMessageBox.warning(None, "执行失败", f"执行{self.task_types[task_type]}任务失败")
-                return False
-                
+                execute = getattr(self.api_model, f"execute_{task_type}_task")
+                success = execute(self.input_dir, self.output_dir, progress_callback=on_progress)
         except Exception as e:
-            # 恢复鼠标指针
-            QApplication.restoreOverrideCursor()
-            
             self.logger.error(f"执行任务时发生错误: {e}")
-            QMessageBox.warning(None, "执行失败", f"执行任务时发生错误: {str(e)}")
-            return False
+            self.task_status_changed.emit(task_id, "failed")
+            self.task_failed.emit(task_id, str(e))
+            return
+        
+        if success:
+            self.task_progress_changed.emit(task_id, 100)
+            self.task_status_changed.emit(task_id, "completed")
+            self.task_finished.emit(task_id)
+        else:
+            self.task_status_changed.emit(task_id, "failed")
+            self.task_failed.emit(task_id, self.api_model.last_error or "未知错误")
+    
+    def _task_label(self, task_id):
+        """由任务ID获取任务类型名称"""
+        task_type = task_id.rsplit("_", 1)[0]
+        return self.task_types.get(task_type, task_type)
+    
+    @Slot(str)
+    def _on_task_finished(self, task_id):
+        """批量任务成功完成（界面线程）"""
+        self.current_task_id = None
+        self.logger.info(f"成功执行{self._task_label(task_id)}任务")
+        QMessageBox.information(
+            None, 
+            "任务执行成功", 
+            f"{self._task_label(task_id)}任务执行成功！\n结果已保存到: {self.output_dir}"
+        )
+    
+    @Slot(str, str)
+    def _on_task_failed(self, task_id, error):
+        """批量任务失败（界面线程）"""
+        self.current_task_id = None
+        self.logger.error(f"执行{self._task_label(task_id)}任务失败: {error}")
+        QMessageBox.warning(None, "执行失败", f"执行{self._task_label(task_id)}任务失败: {error}")
+    
+    def is_task_running(self):
+        """是否有批量任务正在后台运行"""
+        return self.worker_thread is not None and self.worker_thread.is_alive()
+    
+    def cancel_batch_task(self):
+        """取消当前批量任务，尚未提交的文件不再处理"""
+        if self.is_task_running() and self.api_model:
+            self.logger.info(f"取消批量任务: {self.current_task_id}")
+            self.api_model.cancel_current_task()
     
     def start_batch_task(self, task_id):
         """启动批量处理任务
@@ -363,7 +416,12 @@ class BatchController(QObject):
     # 创建方法别名，以便以后修改UI绑定为直接使用start_batch_task
     create_batch_task = create_batch_task
     
+    # 退出时等待批量任务线程结束的最长时间（秒）
+    SHUTDOWN_TIMEOUT = 10
+    
     def cleanup(self):
-        """清理资源"""
-        pass
+        """清理资源：取消当前批量任务并等待后台线程结束"""
+        self.cancel_batch_task()
+        if self.is_task_running():
+            self.worker_thread.join(timeout=self.SHUTDOWN_TIMEOUT)
     
\ No newline at end of file
@@ -1,6 +1,7 @@
-from PySide6.QtWidgets import QFileDialog, QMessageBox, QApplication, QDialog, QVBoxLayout, QGroupBox, QRadioButton, QLabel, QDialogButtonBox
+from PySide6.QtWidgets import (QFileDialog, QMessageBox, QApplication, QDialog, QVBoxLayout, QHBoxLayout, QGroupBox,
+                               QRadioButton, QLabel, QDialogButtonBox, QComboBox, QCheckBox, QProgressDialog)
 from PySide6.QtCore import QObject, Qt
-from PySide6.QtGui import QImage, QColor, qRed, qGreen, qBlue, qRgb
+from PySide6.QtGui import QImage
 
 import os
 import sys
@@ -10,15 +11,21 @@ import time
 # 导入Function层的渔网分割模型
 from Function.data.fishnet_seg import FishnetSegmentation
 from utils.geo import GDAL_AVAILABLE, RASTERIO_AVAILABLE  # 导入GDAL可用性标志
+from utils.geo import TileFormat, FORMAT_GTIFF, FORMAT_COG, VIRTUAL_VRT, VIRTUAL_INDEX, DatasetPool
+from controller.process.background_jobs import BackgroundJobRunner, JobCancelled
 
 # 导入UI组件
 from ui.widgets.grid_dialogs import (GridParamsDialog, ImageViewer, 
                                    GridOverviewWindow, GridPreviewWindow, 
                                    GridImagesViewer)
+from ui.widgets.qimage_utils import brighten_qimage, is_image_too_dark, image_data_to_qimage
 
 class FishnetController(QObject):
     """渔网分割页面的控制器类，处理UI与功能逻辑之间的交互"""
     
+    # 分割结果每批发送给界面的网格数
+    UI_BATCH_SIZE = 256
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         # 功能层引用
@@ -47,14 +54,134 @@ class FishnetController(QObject):
         
         # 页面引用
         self.page = None
+        
+        # 导入、分割和导出在后台线程中按提交顺序执行，界面保持可操作
+        self.jobs = BackgroundJobRunner(max_threads=1, parent=self)
+        self.jobs.job_started.connect(self._on_job_started)
+        self.jobs.job_progress.connect(self._on_job_progress)
+        self.jobs.job_partial.connect(self._on_job_partial)
+        self.jobs.job_finished.connect(self._on_job_finished)
+        self.jobs.job_failed.connect(self._on_job_failed)
+        self.jobs.job_cancelled.connect(self._on_job_cancelled)
+        # 任务ID -> 标题、进度对话框和回调
+        self._jobs = {}
+        # 已被新场景替换、等待关闭的旧模型
+        self._retired_models = []
+        # 当前渔网分割任务的ID，只接受该任务的部分结果
+        self._tiling_job = None
     
     def setup(self, grid_generator=None, page=None):
         """设置功能层引用和页面引用"""
         self.grid_generator = grid_generator
         self.page = page
     
+    def _run_job(self, title, func, on_finished, on_partial=None, on_cancelled=None):
+        """
+        提交后台任务并显示可取消的非模态进度对话框
+        
+        Args:
+            title: 任务标题
+            func: 任务函数，参数为JobContext，在工作线程中执行
+            on_finished: 任务完成后在GUI线程中调用，参数为任务函数的返回值
+            on_partial: 收到部分结果时在GUI线程中调用，可选
+            on_cancelled: 任务取消后在GUI线程中调用，可选
+            
+        Returns:
+            str: 任务ID
+        """
+        dialog = QProgressDialog(f"{title}：排队中...", "取消", 0, 100)
+        dialog.setWindowTitle(title)
+        dialog.setWindowModality(Qt.NonModal)
+        dialog.setMinimumDuration(0)
+        dialog.setAutoClose(False)
+        dialog.setAutoReset(False)
+        dialog.setValue(0)
+        
+        job_id = self.jobs.submit(func)
+        self._jobs[job_id] = {
+            "title": title,
+            "dialog": dialog,
+            "on_finished": on_finished,
+            "on_partial": on_partial,
+            "on_cancelled": on_cancelled
+        }
+        dialog.canceled.connect(lambda: self.jobs.cancel(job_id))
+        dialog.show()
+        return job_id
+    
+    def _close_job(self, job_id):
+        """移除任务记录并关闭其进度对话框"""
+        job = self._jobs.pop(job_id, None)
+        if job is not None:
+            job["dialog"].canceled.disconnect()
+            job["dialog"].close()
+        return job
+    
+    def _on_job_started(self, job_id):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job["dialog"].setLabelText(f"{job['title']}...")
+    
+    def _on_job_progress(self, job_id, percent, message):
+        job = self._jobs.get(job_id)
+        if job is not None:
+            job["dialog"].setValue(percent)
+            if message:
+                job["dialog"].setLabelText(f"{job['title']}：{message}")
+    
+    def _on_job_partial(self, job_id, data):
+        job = self._jobs.get(job_id)
+        if job is not None and job["on_partial"] is not None:
+            job["on_partial"](data)
+    
+    def _on_job_finished(self, job_id, result):
+        job = self._close_job(job_id)
+        if job is not None:
+            job["on_finished"](result)
+    
+    def _on_job_failed(self, job_id, error):
+        job = self._close_job(job_id)
+        if job is not None:
+            QMessageBox.critical(None, f"{job['title']}失败", f"{job['title']}过程中发生错误: {error}")
+    
+    def _on_job_cancelled(self, job_id):
+        job = self._close_job(job_id)
+        if job is not None and job["on_cancelled"] is not None:
+            job["on_cancelled"]()
+    
+    def cancel_jobs(self):
+        """取消所有排队和运行中的后台任务"""
+        self.jobs.cancel_all()
+    
+    def shutdown(self):
+        """程序退出前取消后台任务，等待工作线程结束后关闭句柄池中的数据集"""
+        self.jobs.cancel_all()
+        self.jobs.wait()
+        self._close_retired_models()
+        self.fishnet_model.close()
+        DatasetPool.invalidate()
+    
+    def _close_retired_models(self):
+        """关闭已被替换的旧模型，归还其数据集句柄并释放波段缓存"""
+        while self._retired_models:
+            self._retired_models.pop().close()
+    
+    def _retire_model(self, model):
+        """
+        在任务线程中关闭旧模型
+        
+        任务按提交顺序执行，关闭任务运行时之前排队的、仍引用旧模型的任务都已结束；
+        关闭任务被取消时旧模型留在列表中，由下一次关闭或程序退出时处理
+        """
+        self._retired_models.append(model)
+        self.jobs.submit(lambda job: self._close_retired_models())
+    
     def import_image(self):
-        """导入图像/影像"""
+        """导入图像/影像
+        
+        影像在后台线程中加载到新的模型实例，加载成功后才替换当前场景；
+        加载期间可以继续操作当前场景，或选择下一景排队导入
+        """
         file_path, _ = QFileDialog.getOpenFileName(
             None, 
             "选择图像/影像", 
@@ -62,91 +189,99 @@ class FishnetController(QObject):
             "图像文件 (*.tif *.tiff *.img *.jpg *.png);;GeoTIFF文件 (*.tif *.tiff);;所有文件 (*.*)"
         )
         
-        if file_path:
-            # 显示加载中提示，避免用户误认为程序无响应
-            QApplication.setOverrideCursor(Qt.WaitCursor)
-            
+        if not file_path:
+            return False
+        
+        # 沿用当前的网格参数
+        grid_params = dict(self.fishnet_model.grid_params)
+        
+        def load(job):
+            model = FishnetSegmentation()
+            model.grid_params = grid_params
+            job.progress(0, os.path.basename(file_path))
             try:
-                self.current_image_path = file_path
-                
-                # 使用模型层加载图像
-                success, image_info = self.fishnet_model.load_image(file_path)
+                success, image_info = model.load_image(file_path)
+                job.check()
+            except Exception:
+                # 取消或出错时新模型不会被使用，立即归还句柄
+                model.close()
+                raise
+            if not success:
+                model.close()
+            return model, success, image_info
+        
+        self._run_job("导入图像", load,
+                      lambda result: self._on_image_loaded(file_path, *result))
+        return True
+    
+    def _on_image_loaded(self, file_path, model, success, image_info):
+        """影像加载完成，在GUI线程中切换到新场景并显示结果"""
+        if success:
+            # 切换到新场景，旧场景上未完成的分割结果不再使用
+            self._retire_model(self.fishnet_model)
+            self.fishnet_model = model
+            self.current_image_path = file_path
+            self.grid_result = None
+            
+            # 更新GeoTIFF标志
+            self.is_geotiff = image_info.get("is_geotiff", False)
+            self.is_sentinel = image_info.get("is_sentinel", False)
+            
+            # 准备图像信息消息
+            image_format = image_info.get("format", "未知")
+            width = image_info.get("width", "未知")
+            height = image_info.get("height", "未知")
+            
+            msg = f"成功导入图像：{file_path}\n尺寸：{width}×{height}像素"
+            
+            # 如果是GeoTIFF，添加地理信息
+            if self.is_geotiff:
+                bands = image_info.get("bands", "未知")
+                crs = image_info.get("crs", "未知")
                 
-                # 恢复正常光标
-                QApplication.restoreOverrideCursor()
+                # 简化坐标系显示
+                simplified_crs = self._simplify_crs_display(crs)
                 
-                if success:
-                    # 更新GeoTIFF标志
-                    self.is_geotiff = image_info.get("is_geotiff", False)
-                    self.is_sentinel = image_info.get("is_sentinel", False)
-                    
-                    # 准备图像信息消息
-                    image_format = image_info.get("format", "未知")
-                    width = image_info.get("width", "未知")
-                    height = image_info.get("height", "未知")
-                    
-                    msg = f"成功导入图像：{file_path}\n尺寸：{width}×{height}像素"
-                    
-                    # 如果是GeoTIFF，添加地理信息
-                    if self.is_geotiff:
-                        bands = image_info.get("bands", "未知")
-                        crs = image_info.get("crs", "未知")
-                        
-                        # 简化坐标系显示
-                        simplified_crs = self._simplify_crs_display(crs)
-                        
-                        msg += f"\n波段数：{bands}\n坐标系：{simplified_crs}"
-                    
-                    QMessageBox.information(None, "导入成功", msg)
-                    return True
-                else:
-                    # 获取详细错误信息
-                    error_msg = image_info.get('error', '未知错误')
-                    detailed_error = image_info.get('detailed_error', '')
-                    
-                    # 创建错误消息框
-                    error_box = QMessageBox(None)
-                    error_box.setWindowTitle("导入失败")
-                    error_box.setIcon(QMessageBox.Critical)
-                    error_box.setText(f"无法加载图像：{error_msg}")
-                    
-                    # 如果有详细错误，添加到详细信息中
-                    if detailed_error:
-                        error_box.setDetailedText(detailed_error)
-                    
-                    # 添加可能的解决方案提示
-                    error_box.setInformativeText(
-                        "可能的解决方案：\n"
-                        "1. 确认文件格式是否支持\n"
-                        "2. 检查文件是否损坏\n"
-                        "3. 尝试使用其他格式保存文件后再导入\n"
-                        "4. 确保GDAL和rasterio库正确安装"
-                    )
-                    
-                    # 添加诊断按钮，用于显示系统诊断信息
-                    error_box.addButton("诊断信息", QMessageBox.HelpRole)
-                    error_box.addButton(QMessageBox.Close)
-                    
-                    # 显示错误消息框
-                    result = error_box.exec_()
-                    
-                    # 如果用户点击了诊断信息按钮
-                    if result == 0:  # HelpRole按钮
-                        self._show_diagnostic_info()
-                    
-                    return False
-            except Exception as e:
-                # 恢复正常光标
-                QApplication.restoreOverrideCursor()
-                QMessageBox.critical(None, "导入异常", f"发生未预期的错误：{str(e)}")
-                return False
-            finally:
-                # 确保光标被恢复
-                QApplication.restoreOverrideCursor()
+                msg += f"\n波段数：{bands}\n坐标系：{simplified_crs}"
+            
+            QMessageBox.information(None, "导入成功", msg)
+            return
         
-        return False
+        # 获取详细错误信息
+        error_msg = image_info.get('error', '未知错误')
+        detailed_error = image_info.get('detailed_error', '')
+        
+        # 创建错误消息框
+        error_box = QMessageBox(None)
+        error_box.setWindowTitle("导入失败")
+        error_box.setIcon(QMessageBox.Critical)
+        error_box.setText(f"无法加载图像：{error_msg}")
+        
+        # 如果有详细错误，添加到详细信息中
+        if detailed_error:
+            error_box.setDetailedText(detailed_error)
+        
+        # 添加可能的解决方案提示
+        error_box.setInformativeText(
+            "可能的解决方案：\n"
+            "1. 确认文件格式是否支持\n"
+            "2. 检查文件是否损坏\n"
+            "3. 尝试使用其他格式保存文件后再导入\n"
+            "4. 确保GDAL和rasterio库正确安装"
+        )
+        
+        # 添加诊断按钮，用于显示系统诊断信息
+        error_box.addButton("诊断信息", QMessageBox.HelpRole)
+        error_box.addButton(QMessageBox.Close)
+        
+        # 显示错误消息框
+        result = error_box.exec_()
+        
+        # 如果用户点击了诊断信息按钮
+        if result == 0:  # HelpRole按钮
+            self._show_diagnostic_info(model.last_error)
     
-    def _show_diagnostic_info(self):
+    def _show_diagnostic_info(self, last_error=None):
         """显示系统诊断信息，帮助用户排查问题"""
         try:
             # 收集系统信息
@@ -191,7 +326,7 @@ GDAL_DATA = {env_vars['GDAL_DATA']}
 PROJ_LIB = {env_vars['PROJ_LIB']}
 
 最后一次错误信息:
-{self.fishnet_model.last_error if hasattr(self.fishnet_model, 'last_error') else '无错误记录'}
+{last_error or getattr(self.fishnet_model, 'last_error', None) or '无错误记录'}
 """
             
             # 显示诊断信息
@@ -214,7 +349,7 @@ PROJ_LIB = {env_vars['PROJ_LIB']}
         # 获取当前图像尺寸
         image_size = (0, 0)
         if hasattr(self.fishnet_model, 'image') and self.fishnet_model.image:
-            image_size = self.fishnet_model.image.size
+            image_size = self.fishnet_model.get_image_size()
         else:
             QMessageBox.warning(None, "警告", "无法获取图像尺寸，将使用默认参数")
         
@@ -227,7 +362,11 @@ PROJ_LIB = {env_vars['PROJ_LIB']}
             None,
             image_size=image_size,
             current_rows=rows,
-            current_cols=cols
+            current_cols=cols,
+            current_mode=current_params.get("mode"),
+            current_tile_size=current_params.get("tile_size", (512, 512))[0],
+            current_overlap=current_params.get("overlap", 0),
+            align_blocks=current_params.get("align_blocks", False)
         )
         
         # 如果用户点击确定
@@ -237,21 +376,33 @@ PROJ_LIB = {env_vars['PROJ_LIB']}
             grid_count = params["grid_count"]
             
             # 使用模型层设置参数
-            success, grid_info = self.fishnet_model.set_grid_parameters(grid_count)
+            success, grid_info = self.fishnet_model.set_grid_parameters(
+                grid_count,
+                mode=params["mode"],
+                tile_size=params["tile_size"],
+                overlap=params["overlap"],
+                align_blocks=params["align_blocks"]
+            )
             
             if success:
                 # 更新控制器中的参数
                 self.grid_params = params
                 
                 # 显示确认信息
+                rows, cols = grid_info.get("grid_count", grid_count)
                 grid_width = grid_info.get("grid_size", (0, 0))[0]
                 grid_height = grid_info.get("grid_size", (0, 0))[1]
                 
-                msg = f"网格数量: {grid_count[0]}×{grid_count[1]}, 每格尺寸约: {grid_width}×{grid_height}像素"
+                msg = f"网格数量: {rows}×{cols}, 每格尺寸约: {grid_width}×{grid_height}像素"
                 
-                # 如果是GeoTIFF，添加提示
-                if self.is_geotiff:
-                    pass
+                # 如果是GeoTIFF，显示按该划分读取的I/O开销估算
+                cost = grid_info.get("cost")
+                if self.is_geotiff and cost:
+                    block_w, block_h = cost["block_shape"]
+                    msg += (f"\n\n内部块尺寸: {block_w}×{block_h}"
+                            f"\n需解码块数: {cost['blocks_read']} (重复解码 {cost['redundant_reads']})"
+                            f"\n预计读取: {cost['bytes_read'] / 1024 / 1024:.1f} MB，"
+                            f"读放大 {cost['read_amplification']:.2f} 倍")
                 
                 QMessageBox.information(None, "参数设置", msg)
                 return True
@@ -261,132 +412,121 @@ PROJ_LIB = {env_vars['PROJ_LIB']}
         return False
     
     def start_fishnet(self):
-        """开始渔网分割"""
+        """开始渔网分割
+        
+        分割在后台线程中进行，网格按批通过部分结果信号追加到self.grid_result，
+        可在进度对话框中取消
+        """
         # 严格检查图像是否已加载
         if not self.current_image_path or not hasattr(self.fishnet_model, 'image') or self.fishnet_model.image is None:
             QMessageBox.warning(None, "错误", "请先导入图像/影像")
             return False
         
-        # 显示加载中提示
-        QApplication.setOverrideCursor(Qt.WaitCursor)
+        model = self.fishnet_model
+        # 新的分割替换之前排队或运行中的分割，旧任务剩余的结果不再使用
+        if self._tiling_job is not None:
+            self.jobs.cancel(self._tiling_job)
+        self.grid_result = []
         
-        try:
-            # 使用模型层生成网格
-            success, result = self.fishnet_model.generate_grid()
+        def tile(job):
+            lazy = model._use_lazy_grid()
+            # 预先生成网格图像时，规划与图像转换各占一半进度
+            scale = 100 if lazy else 50
             
-            # 恢复光标
-            QApplication.restoreOverrideCursor()
+            success, result = model.generate_grid(
+                progress_callback=lambda done, total: job.progress(
+                    done * scale // total, f"已生成 {done}/{total} 个网格"),
+                cancel_event=job.cancel_event)
+            job.check()
+            if not success:
+                return False, result
             
+            total = len(result)
+            for start in range(0, total, self.UI_BATCH_SIZE):
+                job.check()
+                batch = result[start:start + self.UI_BATCH_SIZE]
+                job.partial((job.job_id, self._to_ui_grids(model, batch)))
+                if not lazy:
+                    done = start + len(batch)
+                    job.progress(50 + done * 50 // total, f"已转换 {done}/{total} 个网格图像")
+            return True, total
+        
+        def is_current():
+            """本任务仍是最新的分割且场景未切换"""
+            return self._tiling_job == job_id and model is self.fishnet_model
+        
+        def on_partial(data):
+            batch_job_id, ui_grids = data
+            if batch_job_id == job_id and is_current() and self.grid_result is not None:
+                self.grid_result.extend(ui_grids)
+        
+        def on_finished(result):
+            # 分割期间已切换到其他场景或重新开始分割时丢弃结果
+            if not is_current():
+                return
+            self._tiling_job = None
+            success, info = result
             if success:
-                # 将模型层的结果转换为UI层可用的格式
-                self.grid_result = []
-                ui_compatible_results = self.fishnet_model.get_ui_compatible_results()
-                
-                # 检查是否有有效图像
-                has_valid_image = False
-                
-                for grid in ui_compatible_results:
-                    # 复制基本信息
-                    ui_grid = {
-                        'position': grid['position'],
-                        'row': grid['row'],
-                        'col': grid['col']
-                    }
-                    
-                    # 将图像数据转换为QImage
-                    image_data = grid['image_data']
-                    if image_data:
-                        # 创建QImage时使用直接的RGB888格式，避免颜色转换错误
-                        qimg = QImage(
-                            image_data['data'],
-                            image_data['width'],
-                            image_data['height'],
-                            image_data['bytes_per_line'],
-                            QImage.Format_RGB888  # 使用RGB格式，不是BGR
-                        )
-                        
-                
-                
-                # 获取网格数量
-                total_grids = len(self.fishnet_model.grid_result)
-                
                 # 显示一个简单的成功消息
                 QMessageBox.information(None, "渔网分割", 
-                    f"分割成功，共生成 {total_grids} 个网格图像\n\n"
+                    f"分割成功，共生成 {info} 个网格图像\n\n"
                     f"请点击\"导出分割结果\"按钮保存结果和详细信息")
-                
-                return True
             else:
-                if isinstance(result, dict) and 'error' in result:
-                    error_msg = result['error']
-                else:
-                    error_msg = "未知错误"
+                self.grid_result = None
+                error_msg = info['error'] if isinstance(info, dict) and 'error' in info else "未知错误"
                 QMessageBox.critical(None, "错误", f"渔网分割失败: {error_msg}")
-                return False
-        except Exception as e:
-            # 确保光标被恢复
-            QApplication.restoreOverrideCursor()
-            QMessageBox.critical(None, "分割异常", f"渔网分割过程中发生错误: {str(e)}")
-            return False
-        finally:
-            # 确保光标被恢复
-            QApplication.restoreOverrideCursor()
+        
+        def on_cancelled():
+            if is_current():
+                self._tiling_job = None
+                model.grid_result = []
+                self.grid_result = None
+        
+        job_id = self._run_job("渔网分割", tile, on_finished, on_partial=on_partial, on_cancelled=on_cancelled)
+        self._tiling_job = job_id
+        return True
     
-    def _is_image_too_dark(self, qimage, threshold=10):
+    def _to_ui_grids(self, model, grids):
+        """
+        将一批网格转换为UI层使用的格式（在工作线程中执行）
         
-        try:
-            width = qimage.width()
-            height = qimage.height()
-            
-            if width <= 0 or height <= 0:
-                return True
-                
-            # 使用间隔采样，提高性能
-            dark_count = 0
-            sample_count = 0
-            
-            # 每10个像素采样一次，最多采样1000个点
-            step = max(1, int(width * height / 1000))
+        延迟读取模式下不预先读取网格，图像由查看器按需加载
+        """
+        if model.lazy_grid:
+            return [
+                {'position': grid['position'], 'row': grid['row'], 'col': grid['col'], 'image_data': None}
+                for grid in grids
+            ]
+        
+        ui_grids = []
+        for grid in model.get_ui_compatible_results(grids):
+            # 复制基本信息，保留image_data以维持QImage共享缓冲区的生命周期
+            ui_grid = {
+                'position': grid['position'],
+                'row': grid['row'],
+                'col': grid['col'],
+                'image_data': grid['image_data']
+            }
             
-            for y in range(0, height, step):
-                for x in range(0, width, step):
-                    color = qimage.pixelColor(x, y)
-                    brightness = (color.red() + color.green() + color.blue()) / 3
-                    if brightness < threshold:
-                        dark_count += 1
-                    sample_count += 1
+            # 直接在模型层缓冲区上构造QImage，不复制像素
+            if grid['image_data']:
+                ui_grid['image'] = image_data_to_qimage(grid['image_data'])
             
-            dark_ratio = dark_count / max(1, sample_count)
-            return dark_ratio > 0.9  # 如果90%以上的像素是暗的，认为图像太暗
+            ui_grids.append(ui_grid)
+        return ui_grids
+    
+    def _is_image_too_dark(self, qimage, threshold=10):
+        """判断QImage是否过暗，基于抽样亮度直方图"""
+        try:
+            return is_image_too_dark(qimage, threshold=threshold)
         except Exception:
             return False
             
     def _enhance_qimage(self, qimage):
-        """尝试增强过暗的QImage，使用更高效的处理方式"""
+        """尝试增强过暗的QImage，在像素缓冲区上使用查找表批量处理"""
         try:
-            # 转换为QImage.Format_RGB32以便像素操作
-            if qimage.format() != QImage.Format_RGB32:
-                qimage = qimage.convertToFormat(QImage.Format_RGB32)
-                
-            width = qimage.width()
-            height = qimage.height()
-            
-            # 创建一个新图像
-            result = QImage(width, height, QImage.Format_RGB32)
-            
-            # 固定亮度因子，避免每个像素都计算
-            brightness_factor = 2.5  # 适度增强亮度
-            
-            # 使用更高效的方式增强亮度
-            for y in range(height):
-                for x in range(width):
-                    pixel = qimage.pixel(x, y)
-                    r = min(255, int(qRed(pixel) * brightness_factor))
-                    g = min(255, int(qGreen(pixel) * brightness_factor))
-                    b = min(255, int(qBlue(pixel) * brightness_factor))
-                    result.setPixel(x, y, qRgb(r, g, b))
-            
-            return result
+            # 固定亮度因子，适度增强亮度
+            return brighten_qimage(qimage, factor=2.5)
         except Exception:
             return qimage  # 返回原始图像
     
@@ -401,7 +541,7 @@ PROJ_LIB = {env_vars['PROJ_LIB']}
         # 创建导出格式选择对话框
         format_dialog = QDialog(None)
         format_dialog.setWindowTitle("选择导出格式")
-        format_dialog.resize(400, 200)
+        format_dialog.resize(400, 320)
         
         layout = QVBoxLayout(format_dialog)
         
@@ -433,6 +573,51 @@ PROJ_LIB = {env_vars['PROJ_LIB']}
         info_label = QLabel(info_text)
         info_label.setWordWrap(True)
         
+        # GeoTIFF输出选项：格式、压缩方式和金字塔
+        options_group = QGroupBox("GeoTIFF输出选项:")
+        options_layout = QVBoxLayout(options_group)
+        
+        mode_layout = QHBoxLayout()
+        mode_layout.addWidget(QLabel("输出方式:"))
+        mode_combo = QComboBox()
+        mode_combo.addItem("实体瓦片", None)
+        mode_combo.addItem("虚拟瓦片 (每个瓦片一个VRT)", VIRTUAL_VRT)
+        mode_combo.addItem("整幅VRT + 瓦片索引 (GeoPackage)", VIRTUAL_INDEX)
+        mode_layout.addWidget(mode_combo)
+        options_layout.addLayout(mode_layout)
+        
+        driver_layout = QHBoxLayout()
+        driver_layout.addWidget(QLabel("文件格式:"))
+        driver_combo = QComboBox()
+        driver_combo.addItem("分块GeoTIFF", FORMAT_GTIFF)
+        driver_combo.addItem("Cloud-Optimized GeoTIFF (COG)", FORMAT_COG)
+        driver_layout.addWidget(driver_combo)
+        options_layout.addLayout(driver_layout)
+        
+        compress_layout = QHBoxLayout()
+        compress_layout.addWidget(QLabel("压缩方式:"))
+        compress_combo = QComboBox()
+        compress_combo.addItem("DEFLATE (兼容性最好)", "DEFLATE")
+        compress_combo.addItem("ZSTD (更快)", "ZSTD")
+        compress_combo.addItem("LZW", "LZW")
+        compress_combo.addItem("不压缩", "NONE")
+        compress_layout.addWidget(compress_combo)
+        options_layout.addLayout(compress_layout)
+        
+        overview_check = QCheckBox("生成内部金字塔")
+        options_layout.addWidget(overview_check)
+        
+        # 虚拟瓦片只引用源影像窗口，格式和压缩选项不适用
+        def update_format_options():
+            physical = mode_combo.currentData() is None
+            driver_combo.setEnabled(physical)
+            compress_combo.setEnabled(physical)
+            overview_check.setEnabled(physical)
+        mode_combo.currentIndexChanged.connect(update_format_options)
+        
+        options_group.setEnabled(self.tiff_radio.isChecked())
+        self.tiff_radio.toggled.connect(options_group.setEnabled)
+        
         # 添加按钮
         button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         button_box.accepted.connect(format_dialog.accept)
@@ -441,6 +626,7 @@ PROJ_LIB = {env_vars['PROJ_LIB']}
         # 组装布局
         layout.addWidget(format_group)
         layout.addWidget(info_label)
+        layout.addWidget(options_group)
         layout.addWidget(button_box)
         
         # 显示对话框
@@ -449,6 +635,9 @@ PROJ_LIB = {env_vars['PROJ_LIB']}
         
         # 获取选择的格式
         export_as_geotiff = self.tiff_radio.isChecked() and self.is_geotiff
+        tile_format = TileFormat(driver_combo.currentData(), compress=compress_combo.currentData(),
+                                 overviews=overview_check.isChecked())
+        virtual = mode_combo.currentData()
         
         # 告知用户将会生成详细信息文件
         QMessageBox.information(None, "导出信息", 
@@ -461,67 +650,91 @@ PROJ_LIB = {env_vars['PROJ_LIB']}
             ""
         )
         
-        if base_dir:
+        if not base_dir:
+            return False
+        
+        model = self.fishnet_model
+        
+        def export(job):
+            def progress(finished, total, stats):
+                job.progress(finished * 100 // total if total else 100,
+                             f"{finished}/{total} 个瓦片，{stats.get('tiles_per_sec', 0.0):.1f} 瓦片/秒")
+            
             try:
                 # 根据选择的格式导出
                 if export_as_geotiff:
                     # 使用模型层导出结果，不导出SHP文件
-                    success, export_info = self.fishnet_model.export_result(
+                    success, export_info = model.export_result(
                         base_dir, 
                         create_subfolders=True, 
                         export_shp=False,
-                        export_as_image=False
+                        export_as_image=False,
+                        progress_callback=progress,
+                        tile_format=tile_format,
+                        virtual=virtual,
+                        cancel_event=job.cancel_event
                     )
                 else:
                     # 导出为普通图像格式
-                    success, export_info = self.fishnet_model.export_result(
+                    success, export_info = model.export_result(
                         base_dir, 
                         create_subfolders=True, 
                         export_shp=False,
-                        export_as_image=True
+                        export_as_image=True,
+                        cancel_event=job.cancel_event
                     )
+                job.check()
                 
                 if success:
-                    # 获取保存目录路径
-                    save_dir = export_info.get('save_dir', base_dir)
-                    
                     # 保存分割信息到TXT文件
-                    info_file_path = os.path.join(save_dir, "分割信息.txt")
-                    self._save_grid_info_to_file(info_file_path)
-                    
-                    # 显示统一的导出成功提示
-                    QMessageBox.information(None, "导出信息", 
-                        "导出成功")
-                    
-                    return True
-                else:
-                    error_msg = export_info.get('error', '未知错误') if isinstance(export_info, dict) else "未知错误"
-                    QMessageBox.critical(
-                        None, 
-                        "导出失败", 
-                        f"导出分割结果失败: {error_msg}"
-                    )
+                    save_dir = export_info.get('save_dir', base_dir)
+                    self._save_grid_info_to_file(os.path.join(save_dir, "分割信息.txt"), model)
+            except JobCancelled:
+                # 交给任务执行器发出取消信号，不作为导出错误提示
+                raise
             except Exception as e:
-                QMessageBox.critical(
-                    None,
-                    "导出错误",
-                    f"导出过程中发生错误:\n{str(e)}\n\n可能原因：\n"
-                    "1. 图像没有有效的地理坐标信息\n"
-                    "2. GDAL或rasterio库工作异常\n"
-                    "3. 权限不足或磁盘空间不足"
-                )
+                return False, {"error": str(e), "exception": True}
+            return success, export_info
         
-        return False
+        self._run_job("导出分割结果", export, self._on_export_finished)
+        return True
     
-    def _save_grid_info_to_file(self, file_path):
+    def _on_export_finished(self, result):
+        """导出完成，在GUI线程中显示结果"""
+        success, export_info = result
+        if success:
+            # 显示统一的导出成功提示
+            QMessageBox.information(None, "导出信息", 
+                "导出成功")
+        elif isinstance(export_info, dict) and export_info.get("exception"):
+            QMessageBox.critical(
+                None,
+                "导出错误",
+                f"导出过程中发生错误:\n{export_info['error']}\n\n可能原因：\n"
+                "1. 图像没有有效的地理坐标信息\n"
+                "2. GDAL或rasterio库工作异常\n"
+                "3. 权限不足或磁盘空间不足"
+            )
+        else:
+            error_msg = export_info.get('error', '未知错误') if isinstance(export_info, dict) else "未知错误"
+            QMessageBox.critical(
+                None, 
+                "导出失败", 
+                f"导出分割结果失败: {error_msg}"
+            )
+    
+    def _save_grid_info_to_file(self, file_path, model=None):
         """
-        保存网格分割信息到TXT文件
+        保存网格分割信息到TXT文件（可在工作线程中调用）
         
         Args:
             file_path: TXT文件保存路径
+            model: 渔网分割模型，None表示当前模型
         """
-        if not self.fishnet_model or not self.fishnet_model.grid_result:
+        model = model or self.fishnet_model
+        if not model or not model.grid_result:
             return
+        raster_data = model.raster_data
         
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
@@ -530,23 +743,23 @@ PROJ_LIB = {env_vars['PROJ_LIB']}
                 f.write("渔网分割结果信息\n")
                 f.write("=" * 50 + "\n\n")
                 
-                f.write(f"原始图像: {self.current_image_path}\n")
+                f.write(f"原始图像: {model.image_path}\n")
                 f.write(f"分割时间: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"网格数量: {len(self.fishnet_model.grid_result)}\n")
+                f.write(f"网格数量: {len(model.grid_result)}\n")
                 
-                if self.is_geotiff:
+                if raster_data and raster_data.is_geotiff:
                     f.write(f"GeoTIFF: 是\n")
-                if self.is_sentinel:
+                if raster_data and raster_data.is_sentinel:
                     f.write(f"Sentinel: 是\n")
                 
                 f.write("\n" + "-" * 50 + "\n\n")
                 
                 # 写入每个网格的详细信息
-                for i, grid in enumerate(self.fishnet_model.grid_result):
+                for i, grid in enumerate(model.grid_result):
                     # 获取基本信息
                     pos = grid['position']
                     row, col = grid['row'], grid['col']
-                    width, height = grid['image_data'].size
+                    width, height = pos[2], pos[3]
                     
                     # 写入基本信息
                     f.write(f"网格 {i+1} (行:{row+1}, 列:{col+1}):\n")
@@ -633,8 +846,13 @@ PROJ_LIB = {env_vars['PROJ_LIB']}
         QApplication.setOverrideCursor(Qt.WaitCursor)
         
         try:
-            # 彻底重置所有状态
+            # 取消排队和运行中的后台任务，其结果不再使用
+            self.cancel_jobs()
+            
+            # 彻底重置所有状态，旧模型在排队的任务结束后关闭
+            self._retire_model(self.fishnet_model)
             self.fishnet_model = FishnetSegmentation()  # 重置模型层
+            self._tiling_job = None
             self.grid_result = None                     # 清空分割结果
             self.grid_params = {"grid_count": (4, 4)}   # 重置网格参数
             self.current_image_path = None              # 清空当前图像路径
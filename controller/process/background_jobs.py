@@ -0,0 +1,173 @@
+"""
+后台任务执行
+在QThreadPool中运行耗时任务，任务通过上下文对象报告进度、发送部分结果并响应取消；
+所有通知以排队连接投递回GUI线程，界面在任务运行期间保持可操作
+"""
+import uuid
+import threading
+import traceback
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal, Qt
+
+
+class JobCancelled(Exception):
+    """任务被取消时由JobContext.check()抛出"""
+
+
+class JobContext:
+    """
+    传给任务函数的上下文
+
+    任务函数在适当位置调用check()响应取消，或把cancel_event传给支持取消的模型层方法
+    """
+
+    def __init__(self, job_id, signals):
+        self.job_id = job_id
+        self.cancel_event = threading.Event()
+        self._signals = signals
+        self._last_percent = -1
+
+    @property
+    def cancelled(self):
+        """任务是否已被取消"""
+        return self.cancel_event.is_set()
+
+    def check(self):
+        """已取消时抛出JobCancelled"""
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def progress(self, percent, message=""):
+        """报告进度，百分比不变且没有说明文字时不重复发送"""
+        percent = max(0, min(100, int(percent)))
+        if percent == self._last_percent and not message:
+            return
+        self._last_percent = percent
+        self._signals.progress.emit(self.job_id, percent, message)
+
+    def partial(self, data):
+        """发送部分结果"""
+        self._signals.partial.emit(self.job_id, data)
+
+
+class _JobSignals(QObject):
+    """后台任务的信号载体（QRunnable本身不能发射信号）"""
+    started = Signal(str)
+    progress = Signal(str, int, str)   # 任务ID, 进度百分比, 说明
+    partial = Signal(str, object)      # 任务ID, 部分结果
+    finished = Signal(str, object)     # 任务ID, 结果
+    failed = Signal(str, str)          # 任务ID, 错误信息
+    cancelled = Signal(str)            # 任务ID
+
+
+class _JobTask(QRunnable):
+    """在线程池中运行单个任务"""
+
+    def __init__(self, func, context, signals):
+        super().__init__()
+        self.func = func
+        self.context = context
+        self.signals = signals
+
+    def run(self):
+        job_id = self.context.job_id
+        try:
+            # 排队期间被取消的任务不再执行
+            self.context.check()
+            self.signals.started.emit(job_id)
+            result = self.func(self.context)
+            self.context.check()
+        except JobCancelled:
+            self.signals.cancelled.emit(job_id)
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(job_id, str(e))
+        else:
+            self.signals.finished.emit(job_id, result)
+
+
+class BackgroundJobRunner(QObject):
+    """
+    后台任务执行器
+
+    max_threads为1时任务按提交顺序排队执行，适合操作同一份数据的任务；
+    信号均在GUI线程中发出
+
+    使用示例:
+        runner = BackgroundJobRunner(parent=self)
+        runner.job_finished.connect(self._on_job_finished)
+        job_id = runner.submit(lambda job: model.generate_grid(cancel_event=job.cancel_event))
+        runner.cancel(job_id)
+    """
+
+    job_started = Signal(str)
+    job_progress = Signal(str, int, str)
+    job_partial = Signal(str, object)
+    job_finished = Signal(str, object)
+    job_failed = Signal(str, str)
+    job_cancelled = Signal(str)
+
+    def __init__(self, max_threads=1, parent=None):
+        """
+        Args:
+            max_threads: 同时运行的任务数
+        """
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max(1, max_threads))
+        self._contexts = {}
+
+        self._signals = _JobSignals()
+        self._signals.started.connect(self.job_started, Qt.QueuedConnection)
+        self._signals.progress.connect(self.job_progress, Qt.QueuedConnection)
+        self._signals.partial.connect(self.job_partial, Qt.QueuedConnection)
+        self._signals.finished.connect(self._on_finished, Qt.QueuedConnection)
+        self._signals.failed.connect(self._on_failed, Qt.QueuedConnection)
+        self._signals.cancelled.connect(self._on_cancelled, Qt.QueuedConnection)
+
+    def submit(self, func):
+        """
+        提交任务
+
+        Args:
+            func: 任务函数，参数为JobContext，返回值通过job_finished信号发出
+
+        Returns:
+            str: 任务ID
+        """
+        job_id = uuid.uuid4().hex
+        context = JobContext(job_id, self._signals)
+        self._contexts[job_id] = context
+        self._pool.start(_JobTask(func, context, self._signals))
+        return job_id
+
+    def cancel(self, job_id):
+        """取消任务：排队中的任务不再执行，运行中的任务在下一个检查点停止"""
+        context = self._contexts.get(job_id)
+        if context is not None:
+            context.cancel_event.set()
+
+    def cancel_all(self):
+        """取消所有未结束的任务"""
+        for context in self._contexts.values():
+            context.cancel_event.set()
+
+    def active_jobs(self):
+        """未结束的任务ID列表"""
+        return list(self._contexts)
+
+    def wait(self, msecs=-1):
+        """等待所有任务结束，用于程序退出前"""
+        return self._pool.waitForDone(msecs)
+
+    def _on_finished(self, job_id, result):
+        self._contexts.pop(job_id, None)
+        self.job_finished.emit(job_id, result)
+
+    def _on_failed(self, job_id, error):
+        self._contexts.pop(job_id, None)
+        self.job_failed.emit(job_id, error)
+
+    def _on_cancelled(self, job_id):
+        self._contexts.pop(job_id, None)
+        self.job_cancelled.emit(job_id)
@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 import warnings
 
 # 忽略所有警告
@@ -11,6 +12,9 @@ from PySide6.QtCore import QCoreApplication, Qt
 # 导入主窗口
 from ui.main_window_new import MainWindow
 
+# 栅格处理配置
+from utils.geo import GeoConfig
+
 # 导入控制器
 from controller.event.fishnet_controller import FishnetController
 from controller.event.scene_controller import SceneController
@@ -43,6 +47,9 @@ def main():
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     
+    # 配置GDAL块缓存和数据集句柄池，须在打开任何影像之前
+    GeoConfig.load_default().apply()
+    
     # 应用程序工作目录
     app_dir = os.path.dirname(os.path.abspath(__file__))
     os.chdir(app_dir)
@@ -77,6 +84,10 @@ def main():
     main_window.change_detection_page.connect_signals(change_detection_controller)
     main_window.batch_page.connect_signals(batch_controller)
     
+    # 退出前停止渔网分割和批量处理的后台任务
+    app.aboutToQuit.connect(fishnet_controller.shutdown)
+    app.aboutToQuit.connect(batch_controller.cleanup)
+    
     # 显示主窗口
     main_window.show()
     
@@ -85,4 +96,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 打包为可执行文件后，多进程瓦片导出的工作进程需要从这里返回
+    multiprocessing.freeze_support()
     sys.exit(main()) 
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+本地替身API服务
+用aiohttp实现与FastAPI服务相同的几个接口，供API客户端测试使用，不需要启动真实的推理服务
+"""
+import hashlib
+
+from aiohttp import web
+
+
+class StubApiServer:
+    """替身API服务
+
+    接口:
+        GET  /ping              健康检查
+        GET  /echo              返回查询参数
+        POST /echo              返回JSON请求体
+        POST /upload            流式读取multipart表单，返回文件大小和SHA-256
+        GET  /files/{name}      下载files中的文件
+        GET  /tasks/{task_id}   按tasks中预设的状态序列依次返回任务状态
+
+    使用示例:
+        server = StubApiServer(files={"result.tif": data}, tasks={"t1": ["running", "completed"]})
+        port = await server.start()
+        ...
+        await server.stop()
+    """
+
+    def __init__(self, files=None, tasks=None):
+        """
+        Args:
+            files: {文件名: 字节内容}
+            tasks: {任务ID: [状态, ...]}，每次查询取出一个状态，最后一个状态保持不变
+        """
+        self.files = dict(files or {})
+        self.tasks = {task_id: list(states) for task_id, states in (tasks or {}).items()}
+        self.requests = []          # 收到的请求 (方法, 路径)
+        self.peers = set()          # 客户端连接的本地端口，用于确认连接复用
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.middlewares.append(self._record)
+        self.app.router.add_get("/ping", self.ping)
+        self.app.router.add_get("/echo", self.echo_query)
+        self.app.router.add_post("/echo", self.echo_json)
+        self.app.router.add_post("/upload", self.upload)
+        self.app.router.add_get("/files/{name}", self.download)
+        self.app.router.add_get("/tasks/{task_id}", self.task_status)
+
+    async def start(self, host="127.0.0.1"):
+        """在随机端口上启动服务
+
+        Returns:
+            int: 监听端口
+        """
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, 0)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _record(self, request, handler):
+        self.requests.append((request.method, request.path))
+        if request.transport is not None:
+            self.peers.add(request.transport.get_extra_info("peername"))
+        return await handler(request)
+
+    async def ping(self, request):
+        return web.json_response({"status": "ok"})
+
+    async def echo_query(self, request):
+        return web.json_response({"params": dict(request.query)})
+
+    async def echo_json(self, request):
+        return web.json_response({"json": await request.json()})
+
+    async def upload(self, request):
+        reader = await request.multipart()
+        fields = {}
+        result = {}
+        async for part in reader:
+            if part.filename:
+                sha256 = hashlib.sha256()
+                size = 0
+                while True:
+                    chunk = await part.read_chunk(64 * 1024)
+                    if not chunk:
+                        break
+                    sha256.update(chunk)
+                    size += len(chunk)
+                result = {"field": part.name, "filename": part.filename, "size": size,
+                          "sha256": sha256.hexdigest()}
+            else:
+                fields[part.name] = await part.text()
+        result["fields"] = fields
+        return web.json_response(result)
+
+    async def download(self, request):
+        name = request.match_info["name"]
+        if name not in self.files:
+            return web.json_response({"detail": f"文件不存在: {name}"}, status=404)
+        return web.Response(body=self.files[name], content_type="application/octet-stream")
+
+    async def task_status(self, request):
+        task_id = request.match_info["task_id"]
+        states = self.tasks.get(task_id)
+        if not states:
+            return web.json_response({"detail": f"任务不存在: {task_id}"}, status=404)
+
+        status = states.pop(0) if len(states) > 1 else states[0]
+        info = {"task_id": task_id, "status": status}
+        if status == "completed":
+            info["result"] = {"output": f"/files/{task_id}.tif"}
+        elif status == "failed":
+            info["error"] = "推理服务出错"
+        return web.json_response(info)
@@ -0,0 +1,111 @@
+"""
+AsyncApiClient针对本地替身服务的测试
+"""
+import os
+import asyncio
+import hashlib
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from utils.api_client import AsyncApiClient, ApiConfig
+from utils.api_client.client import ApiError
+from tests.api_client.stub_server import StubApiServer
+
+
+def run_with_server(scenario, **server_kwargs):
+    """启动替身服务，用指向它的客户端运行scenario(client, server)"""
+    async def main():
+        server = StubApiServer(**server_kwargs)
+        port = await server.start()
+        try:
+            config = ApiConfig(host="127.0.0.1", port=port, timeout=10, pool_size=4, pool_per_host=2)
+            async with AsyncApiClient(config) as client:
+                return await scenario(client, server)
+        finally:
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+def test_get_and_post():
+    async def scenario(client, server):
+        assert await client.get("/ping") == {"status": "ok"}
+        assert await client.get("/echo", params={"page": "2"}) == {"params": {"page": "2"}}
+        assert await client.post("/echo", data={"model_name": "deeplab"}) == {"json": {"model_name": "deeplab"}}
+
+        with pytest.raises(ApiError) as error:
+            await client.get("/tasks/missing")
+        assert error.value.status_code == 404
+        assert "missing" in error.value.message
+
+    run_with_server(scenario)
+
+
+def test_concurrent_requests_reuse_pooled_connections():
+    async def scenario(client, server):
+        results = await asyncio.gather(*[client.get("/echo", params={"i": str(i)}) for i in range(40)])
+        assert [r["params"]["i"] for r in results] == [str(i) for i in range(40)]
+        # 单主机连接数上限为2，40个请求复用少量持久连接
+        assert len(server.peers) <= 2
+
+    run_with_server(scenario)
+
+
+def test_streamed_upload(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    path = tmp_path / "scene.tif"
+    path.write_bytes(data)
+
+    async def scenario(client, server):
+        return await client.upload_file("/upload", str(path), additional_data={"model_name": "unet"})
+
+    result = run_with_server(scenario)
+    assert result["filename"] == "scene.tif"
+    assert result["size"] == len(data)
+    assert result["sha256"] == hashlib.sha256(data).hexdigest()
+    assert result["fields"] == {"model_name": "unet"}
+
+
+def test_download(tmp_path):
+    data = os.urandom(2 * 1024 * 1024 + 5)
+    save_path = tmp_path / "result.tif"
+
+    async def scenario(client, server):
+        assert await client.download_file("/files/result.tif", str(save_path), chunk_size=64 * 1024) == str(save_path)
+        with pytest.raises(ApiError) as error:
+            await client.download_file("/files/missing.tif", str(tmp_path / "missing.tif"))
+        assert error.value.status_code == 404
+
+    run_with_server(scenario, files={"result.tif": data})
+    assert save_path.read_bytes() == data
+
+
+def test_wait_for_task():
+    async def scenario(client, server):
+        result = await client.wait_for_task("t1", check_interval=0.05, max_wait_time=5)
+        assert result == {"output": "/files/t1.tif"}
+        assert server.requests.count(("GET", "/tasks/t1")) == 3
+
+        with pytest.raises(ApiError) as error:
+            await client.wait_for_task("t2", check_interval=0.05, max_wait_time=5)
+        assert "推理服务出错" in error.value.message
+
+        with pytest.raises(ApiError):
+            await client.wait_for_task("t3", check_interval=0.05, max_wait_time=0.2)
+
+    run_with_server(scenario, tasks={"t1": ["pending", "running", "completed"],
+                                     "t2": ["running", "failed"],
+                                     "t3": ["running"]})
+
+
+def test_task_statuses_fall_back_to_single_queries():
+    async def scenario(client, server):
+        statuses = await client.get_task_statuses(["t1", "t2", "missing"])
+        assert set(statuses) == {"t1", "t2"}
+        assert statuses["t1"]["status"] == "running"
+        # 替身服务没有批量接口，之后直接逐个查询
+        assert client._bulk_supported is False
+
+    run_with_server(scenario, tasks={"t1": ["running"], "t2": ["completed"]})
@@ -0,0 +1,53 @@
+"""
+ResultCache索引保存策略的测试
+"""
+from utils.api_client.result_cache import ResultCache
+
+
+def make_files(directory, count):
+    paths = []
+    for i in range(count):
+        path = directory / f"scene_{i}.tif"
+        path.write_bytes(f"scene {i}".encode())
+        paths.append(str(path))
+    return paths
+
+
+def test_digests_and_hits_do_not_rewrite_index(tmp_path, monkeypatch):
+    cache = ResultCache(str(tmp_path / "cache"))
+    saves = []
+    original = cache._save_index
+    monkeypatch.setattr(cache, "_save_index", lambda: (saves.append(1), original()))
+
+    paths = make_files(tmp_path, 200)
+    digests = [cache.file_digest(path) for path in paths]
+    key = ResultCache.task_key("segmentation", digests[:1], "unet")
+    cache.put_result(key, {"ok": True})
+    saves.clear()
+
+    for path in paths:
+        cache.file_digest(path)
+        assert cache.get_result(key) == {"ok": True}
+    assert saves == []
+
+    cache.flush()
+    assert len(saves) == 1
+    # 重新打开后哈希记忆和缓存项仍然有效
+    reopened = ResultCache(str(tmp_path / "cache"))
+    assert reopened._index["digests"][paths[0]][2] == digests[0]
+    assert reopened.get_result(key) == {"ok": True}
+
+
+def test_digest_memo_is_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(ResultCache, "MAX_DIGESTS", 50)
+    cache = ResultCache(str(tmp_path / "cache"))
+    paths = make_files(tmp_path, 120)
+    for path in paths:
+        cache.file_digest(path)
+    # 最近使用的记录保留
+    cache.file_digest(paths[0])
+    cache.put_result("k", {"ok": True})
+
+    digests = cache._index["digests"]
+    assert len(digests) == 50
+    assert paths[0] in digests and paths[-1] in digests and paths[1] not in digests
@@ -0,0 +1,23 @@
+"""
+网格规划的测试：块对齐不改变按数量均分的结果
+"""
+import pytest
+
+pytest.importorskip("osgeo")
+
+from utils.geo.grid_planner import GridPlanner
+
+
+def widths(cells):
+    return [cell['position'][2] for cell in cells if cell['row'] == 1]
+
+
+def test_count_grid_keeps_even_split_when_blocks_are_large():
+    cells = GridPlanner.count_grid(1000, 1000, 3, 3, block=(256, 256))
+    assert widths(cells) == widths(GridPlanner.count_grid(1000, 1000, 3, 3)) == [333, 333, 334]
+
+
+def test_count_grid_snaps_nearby_edges():
+    # 均分边界2000距块边界2048不超过网格尺寸的十分之一，吸附到块边界
+    cells = GridPlanner.count_grid(4000, 512, 1, 2, block=(256, 256))
+    assert widths(cells) == [2048, 1952]
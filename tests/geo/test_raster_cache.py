@@ -0,0 +1,69 @@
+"""
+原始栅格磁盘缓存的测试：渔网分割开启缓存后，网格窗口直接从内存映射读取
+"""
+import numpy as np
+import pytest
+
+rasterio = pytest.importorskip("rasterio")
+pytest.importorskip("osgeo")
+
+from utils.geo import RasterLoader, RasterCache, DatasetPool
+from utils.geo import raster_loader
+from Function.data.fishnet_seg import FishnetSegmentation
+
+
+@pytest.fixture
+def scene(tmp_path):
+    """4波段uint16分块GeoTIFF"""
+    data = (np.arange(4 * 300 * 500, dtype=np.uint32) * 7 % 4000).astype(np.uint16).reshape(4, 300, 500)
+    path = tmp_path / "scene.tif"
+    with rasterio.open(path, "w", driver="GTiff", width=500, height=300, count=4, dtype="uint16",
+                       tiled=True, blockxsize=128, blockysize=128) as dataset:
+        dataset.write(data)
+    return str(path), data
+
+
+@pytest.fixture
+def raw_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(RasterCache, "CACHE_DIR", str(tmp_path / "raster_cache"))
+    monkeypatch.setattr(RasterLoader, "USE_RAW_CACHE", True)
+    yield
+    RasterCache.release()
+
+
+def test_raw_bands_match_source(scene, raw_cache):
+    path, data = scene
+    raster, success = RasterLoader.load(path)
+    assert success
+
+    cube = RasterLoader.raw_bands(raster)
+    assert cube.dtype == np.uint16 and cube.shape == data.shape
+    assert np.array_equal(cube, data)
+    assert RasterCache.contains(path)
+    RasterLoader.close(raster)
+
+
+def test_lazy_grid_reads_from_memory_map(scene, raw_cache, monkeypatch):
+    path, _ = scene
+    # 不使用缓存时的网格像素作为对照
+    monkeypatch.setattr(RasterLoader, "USE_RAW_CACHE", False)
+    model = FishnetSegmentation()
+    assert model.load_image(path)[0]
+    model.set_grid_parameters((3, 4), align_blocks=False)
+    success, grids = model.generate_grid(lazy=True)
+    assert success
+    expected = [np.array(model.get_grid_array(grid)) for grid in grids]
+    assert not RasterCache.contains(path)
+
+    monkeypatch.setattr(RasterLoader, "USE_RAW_CACHE", True)
+    success, grids = model.generate_grid(lazy=True)
+    assert success and RasterCache.contains(path)
+
+    # 之后的窗口读取不再打开源文件
+    def no_source(*args, **kwargs):
+        raise AssertionError("网格窗口不应从源文件读取")
+    monkeypatch.setattr(DatasetPool, "open", no_source)
+    model.raster_data.bands.clear()
+    for grid, reference in zip(grids, expected):
+        assert np.array_equal(model.get_grid_array(grid), reference)
+    model.close()
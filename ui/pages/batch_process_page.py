@@ -32,6 +32,9 @@ class BatchProcessPage(QWidget):
         # 变化检测专用任务创建区域
         self.create_change_detection_section(layout)
         
+        # 运行中任务的操作区域
+        self.create_task_control_section(layout)
+        
         # 添加弹性空间
         layout.addStretch()
     
@@ -159,6 +162,29 @@ class BatchProcessPage(QWidget):
         # 添加内容框架到父布局
         parent_layout.addWidget(content_frame)
     
+    def create_task_control_section(self, parent_layout):
+        """创建运行中任务的操作区域"""
+        # 按钮容器
+        button_container = QFrame()
+        button_container.setObjectName("operation_container")
+        button_layout = QHBoxLayout(button_container)
+        button_layout.setContentsMargins(0, 10, 0, 10)
+        button_layout.setSpacing(15)
+        
+        # 取消当前批量任务按钮
+        self.cancel_task_btn = QPushButton("取消当前任务")
+        self.cancel_task_btn.setObjectName("operation_btn")
+        self.cancel_task_btn.setFixedWidth(180)
+        self.cancel_task_btn.setFixedHeight(40)
+        self.cancel_task_btn.setCursor(QCursor(Qt.PointingHandCursor))
+        button_layout.addWidget(self.cancel_task_btn)
+        
+        # 添加弹性空间
+        button_layout.addStretch()
+        
+        # 添加按钮容器到父布局
+        parent_layout.addWidget(button_container)
+    
     def connect_signals(self, controller):
         """连接信号到控制器"""
         # 连接常规任务目录选择按钮
@@ -176,4 +202,7 @@ class BatchProcessPage(QWidget):
         self.create_detection_btn.clicked.connect(lambda: controller.create_batch_task("detection"))
         
         # 连接变化检测任务创建按钮
-        self.create_change_detection_btn.clicked.connect(lambda: controller.create_batch_task("change_detection")) 
\ No newline at end of file
+        self.create_change_detection_btn.clicked.connect(lambda: controller.create_batch_task("change_detection"))
+        
+        # 连接取消任务按钮
+        self.cancel_task_btn.clicked.connect(controller.cancel_batch_task) 
\ No newline at end of file
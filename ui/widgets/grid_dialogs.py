@@ -1,14 +1,23 @@
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QSpinBox, 
-                             QPushButton, QMainWindow, QWidget, QScrollArea, QToolBar, QSplitter)
-from PySide6.QtCore import Qt, QSize, QPoint
+                             QComboBox, QCheckBox, QPushButton, QMainWindow, QWidget, QScrollArea, QToolBar, QSplitter,
+                             QListView, QAbstractItemView)
+from PySide6.QtCore import Qt, QSize, QPoint, QPointF, QRect, QRectF
 from PySide6.QtGui import QPixmap, QImage, QIcon, QColor, QPainter, QPen, QFont, QAction
 
+from ui.widgets.qimage_utils import image_data_to_qimage
+from ui.widgets.tile_cache import TileImageProvider, GridThumbnailModel
+from utils.geo.grid_planner import PLAN_COUNT, PLAN_SIZE
+
+# 导航时预取的前后瓦片数量
+PREFETCH_RADIUS = 2
+
 class GridParamsDialog(QDialog):
     """网格参数设置对话框"""
-    def __init__(self, parent=None, image_size=(0, 0), current_rows=4, current_cols=4):
+    def __init__(self, parent=None, image_size=(0, 0), current_rows=4, current_cols=4,
+                 current_mode=PLAN_COUNT, current_tile_size=512, current_overlap=0, align_blocks=False):
         super().__init__(parent)
         self.setWindowTitle("设置网格参数")
-        self.resize(350, 200)
+        self.resize(350, 260)
         self.image_size = image_size
         
         # 创建布局
@@ -19,37 +28,76 @@ class GridParamsDialog(QDialog):
         image_info.setAlignment(Qt.AlignCenter)
         layout.addWidget(image_info)
         
+        # 规划方式：按数量或按固定尺寸
+        mode_layout = QHBoxLayout()
+        mode_label = QLabel("划分方式:")
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItem("按网格数量", PLAN_COUNT)
+        self.mode_combo.addItem("按网格尺寸", PLAN_SIZE)
+        self.mode_combo.setCurrentIndex(1 if current_mode == PLAN_SIZE else 0)
+        mode_layout.addWidget(mode_label)
+        mode_layout.addWidget(self.mode_combo)
+        layout.addLayout(mode_layout)
+        
         # 网格数量设置 - 行数
         rows_layout = QHBoxLayout()
-        rows_label = QLabel("行数:")
+        self.rows_label = QLabel("行数:")
         self.rows_spin = QSpinBox()
         self.rows_spin.setRange(1, 100)
         self.rows_spin.setValue(current_rows)
-        rows_layout.addWidget(rows_label)
+        rows_layout.addWidget(self.rows_label)
         rows_layout.addWidget(self.rows_spin)
         layout.addLayout(rows_layout)
         
         # 网格数量设置 - 列数
         cols_layout = QHBoxLayout()
-        cols_label = QLabel("列数:")
+        self.cols_label = QLabel("列数:")
         self.cols_spin = QSpinBox()
         self.cols_spin.setRange(1, 100)
         self.cols_spin.setValue(current_cols)
-        cols_layout.addWidget(cols_label)
+        cols_layout.addWidget(self.cols_label)
         cols_layout.addWidget(self.cols_spin)
         layout.addLayout(cols_layout)
         
+        # 网格尺寸设置 - 边长
+        size_layout = QHBoxLayout()
+        self.size_label = QLabel("网格边长(像素):")
+        self.size_spin = QSpinBox()
+        self.size_spin.setRange(16, 65536)
+        self.size_spin.setValue(current_tile_size)
+        size_layout.addWidget(self.size_label)
+        size_layout.addWidget(self.size_spin)
+        layout.addLayout(size_layout)
+        
+        # 网格尺寸设置 - 重叠
+        overlap_layout = QHBoxLayout()
+        self.overlap_label = QLabel("重叠(像素):")
+        self.overlap_spin = QSpinBox()
+        self.overlap_spin.setRange(0, 65535)
+        self.overlap_spin.setValue(current_overlap)
+        overlap_layout.addWidget(self.overlap_label)
+        overlap_layout.addWidget(self.overlap_spin)
+        layout.addLayout(overlap_layout)
+        
+        # 对齐内部块，使读取网格时解码完整的压缩块而不是重复解码相邻块
+        self.align_check = QCheckBox("网格边界对齐影像内部块")
+        self.align_check.setChecked(align_blocks)
+        layout.addWidget(self.align_check)
+        
         # 显示每个子块的像素信息
         self.grid_size_label = QLabel()
         self.grid_size_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.grid_size_label)
         
         # 更新网格尺寸显示
-        self.update_grid_size()
+        self.update_mode()
         
         # 连接信号
+        self.mode_combo.currentIndexChanged.connect(self.update_mode)
         self.rows_spin.valueChanged.connect(self.update_grid_size)
         self.cols_spin.valueChanged.connect(self.update_grid_size)
+        self.size_spin.valueChanged.connect(self.update_grid_size)
+        self.overlap_spin.valueChanged.connect(self.update_grid_size)
         
         # 按钮
         button_layout = QHBoxLayout()
@@ -61,22 +109,43 @@ class GridParamsDialog(QDialog):
         button_layout.addWidget(cancel_btn)
         layout.addLayout(button_layout)
     
+    def update_mode(self):
+        """根据划分方式显示对应的参数输入"""
+        by_size = self.mode_combo.currentData() == PLAN_SIZE
+        for widget in (self.rows_label, self.rows_spin, self.cols_label, self.cols_spin):
+            widget.setVisible(not by_size)
+        for widget in (self.size_label, self.size_spin, self.overlap_label, self.overlap_spin):
+            widget.setVisible(by_size)
+        self.update_grid_size()
+    
     def update_grid_size(self):
         """更新每个子块的像素信息"""
-        rows = self.rows_spin.value()
-        cols = self.cols_spin.value()
+        if self.image_size[0] <= 0 or self.image_size[1] <= 0:
+            self.grid_size_label.setText("无法计算网格尺寸 (未知图像尺寸)")
+            return
         
-        if self.image_size[0] > 0 and self.image_size[1] > 0:
+        if self.mode_combo.currentData() == PLAN_SIZE:
+            size = self.size_spin.value()
+            self.overlap_spin.setMaximum(size - 1)
+            stride = size - self.overlap_spin.value()
+            cols = max(1, -(-(self.image_size[0] - self.overlap_spin.value()) // stride))
+            rows = max(1, -(-(self.image_size[1] - self.overlap_spin.value()) // stride))
+            self.grid_size_label.setText(f"约 {rows} × {cols} 个网格")
+        else:
+            rows = self.rows_spin.value()
+            cols = self.cols_spin.value()
             grid_width = self.image_size[0] // cols
             grid_height = self.image_size[1] // rows
             self.grid_size_label.setText(f"每个网格尺寸约: {grid_width} × {grid_height} 像素")
-        else:
-            self.grid_size_label.setText("无法计算网格尺寸 (未知图像尺寸)")
     
     def get_params(self):
         """获取设置的参数"""
         return {
-            "grid_count": (self.rows_spin.value(), self.cols_spin.value())
+            "grid_count": (self.rows_spin.value(), self.cols_spin.value()),
+            "mode": self.mode_combo.currentData(),
+            "tile_size": self.size_spin.value(),
+            "overlap": self.overlap_spin.value(),
+            "align_blocks": self.align_check.isChecked()
         }
 
 
@@ -189,6 +258,190 @@ class ImageViewer(QWidget):
         super().resizeEvent(event)
 
 
+class TiledOverviewViewer(QWidget):
+    """
+    分块多分辨率示意图查看器
+    
+    影像以金字塔形式按块存储为QPixmap，绘制时只选取与当前缩放比例匹配的层级
+    并只绘制可见块；网格线和编号作为矢量叠加层实时绘制，不写入像素
+    """
+    TILE_SIZE = 512
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.levels = []          # 每层: {'downsample': 倍数, 'tiles': {(列, 行): QPixmap}}
+        self.image_size = None    # 第0层尺寸 (宽, 高)
+        self.overlay = []         # 网格叠加层
+        self.scale_factor = 1.0   # 屏幕像素 / 第0层像素
+        self.origin = QPointF(0, 0)
+        self.fit_to_view = True
+        self._drag_start = None
+        
+        self.grid_pen = QPen(QColor(255, 0, 0), 2)
+        self.grid_pen.setCosmetic(True)
+        self.label_font = QFont()
+        self.label_font.setBold(True)
+    
+    def setPyramid(self, levels):
+        """
+        设置金字塔影像
+        
+        Args:
+            levels: 模型层create_overview_pyramid_for_ui返回的各层图像数据
+        """
+        self.levels = []
+        self.image_size = None
+        
+        for level, image_data in enumerate(levels or []):
+            image = image_data_to_qimage(image_data)
+            tiles = {}
+            for ty in range(0, image.height(), self.TILE_SIZE):
+                for tx in range(0, image.width(), self.TILE_SIZE):
+                    rect = QRect(tx, ty, min(self.TILE_SIZE, image.width() - tx),
+                                 min(self.TILE_SIZE, image.height() - ty))
+                    # QImage.copy生成独立数据，此后不再依赖模型层缓冲区
+                    tiles[(tx // self.TILE_SIZE, ty // self.TILE_SIZE)] = QPixmap.fromImage(image.copy(rect))
+            
+            if level == 0:
+                self.image_size = (image.width(), image.height())
+            downsample = self.image_size[0] / float(max(1, image.width()))
+            self.levels.append({'downsample': downsample, 'tiles': tiles})
+        
+        self.fit_to_view = True
+        self.update()
+    
+    def setGridOverlay(self, overlay):
+        """
+        设置网格叠加层，只触发重绘而不重建影像金字塔
+        
+        Args:
+            overlay: 模型层get_grid_overlay_for_ui返回的列表
+        """
+        self.overlay = overlay or []
+        self.update()
+    
+    def _fit(self):
+        """计算适应视图的缩放和位置"""
+        width, height = self.image_size
+        self.scale_factor = min(self.width() / width, self.height() / height)
+        self.origin = QPointF((self.width() - width * self.scale_factor) / 2,
+                              (self.height() - height * self.scale_factor) / 2)
+    
+    def _select_level(self):
+        """选择分辨率不低于屏幕需求的最粗层级"""
+        chosen = self.levels[0]
+        for level in self.levels:
+            if level['downsample'] * self.scale_factor <= 1.0:
+                chosen = level
+        return chosen
+    
+    def paintEvent(self, event):
+        """绘制可见影像块和网格叠加层"""
+        if not self.levels:
+            return
+        
+        if self.fit_to_view:
+            self._fit()
+        
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        
+        # 可见区域（第0层坐标）
+        scale = self.scale_factor
+        view_x0 = -self.origin.x() / scale
+        view_y0 = -self.origin.y() / scale
+        view_x1 = view_x0 + self.width() / scale
+        view_y1 = view_y0 + self.height() / scale
+        
+        # 绘制当前层级的可见块
+        level = self._select_level()
+        tile_span = self.TILE_SIZE * level['downsample']
+        col0, col1 = max(0, int(view_x0 // tile_span)), int(view_x1 // tile_span)
+        row0, row1 = max(0, int(view_y0 // tile_span)), int(view_y1 // tile_span)
+        for row in range(row0, row1 + 1):
+            for col in range(col0, col1 + 1):
+                pixmap = level['tiles'].get((col, row))
+                if pixmap is None:
+                    continue
+                target = QRectF(self.origin.x() + col * tile_span * scale,
+                                self.origin.y() + row * tile_span * scale,
+                                pixmap.width() * level['downsample'] * scale,
+                                pixmap.height() * level['downsample'] * scale)
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+        
+        # 绘制网格叠加层（只绘制与可见区域相交的网格）
+        painter.setPen(self.grid_pen)
+        painter.setFont(self.label_font)
+        for item in self.overlay:
+            x, y, width, height = item['rect']
+            if x > view_x1 or y > view_y1 or x + width < view_x0 or y + height < view_y0:
+                continue
+            screen_rect = QRectF(self.origin.x() + x * scale, self.origin.y() + y * scale,
+                                 width * scale, height * scale)
+            painter.drawRect(screen_rect)
+            
+            # 网格在屏幕上足够大时才绘制编号
+            if screen_rect.width() >= 24 and screen_rect.height() >= 18:
+                label_rect = painter.fontMetrics().boundingRect(item['label']).adjusted(-3, -1, 3, 1)
+                label_rect.moveTopLeft(QPoint(int(screen_rect.x()) + 4, int(screen_rect.y()) + 4))
+                painter.fillRect(label_rect, QColor(255, 255, 255, 180))
+                painter.drawText(label_rect, Qt.AlignCenter, item['label'])
+    
+    def wheelEvent(self, event):
+        """鼠标滚轮事件，以光标位置为中心放大缩小"""
+        if not self.levels:
+            return
+        
+        self.fit_to_view = False
+        factor = 1.1 if event.angleDelta().y() > 0 else 0.9
+        new_scale = min(max(self.scale_factor * factor, 0.01), 10.0)
+        
+        # 保持光标下的影像位置不变
+        cursor = event.position()
+        ratio = new_scale / self.scale_factor
+        self.origin = QPointF(cursor.x() - (cursor.x() - self.origin.x()) * ratio,
+                              cursor.y() - (cursor.y() - self.origin.y()) * ratio)
+        self.scale_factor = new_scale
+        self.update()
+    
+    def mousePressEvent(self, event):
+        """开始拖动平移"""
+        if event.button() == Qt.LeftButton:
+            self._drag_start = event.position()
+    
+    def mouseMoveEvent(self, event):
+        """拖动平移"""
+        if self._drag_start is not None:
+            delta = event.position() - self._drag_start
+            self._drag_start = event.position()
+            self.fit_to_view = False
+            self.origin += delta
+            self.update()
+    
+    def mouseReleaseEvent(self, event):
+        """结束拖动平移"""
+        self._drag_start = None
+    
+    def mouseDoubleClickEvent(self, event):
+        """鼠标双击事件，切换适应视图和原始大小"""
+        if not self.levels:
+            return
+        
+        self.fit_to_view = not self.fit_to_view
+        if not self.fit_to_view:
+            # 原始大小 (1:1)，以控件中心为基准
+            self.scale_factor = 1.0
+            width, height = self.image_size
+            self.origin = QPointF((self.width() - width) / 2, (self.height() - height) / 2)
+        self.update()
+    
+    def resizeEvent(self, event):
+        """窗口大小改变事件，适应视图模式下重新计算缩放"""
+        if self.fit_to_view and self.levels:
+            self.update()
+        super().resizeEvent(event)
+
+
 class GridOverviewWindow(QMainWindow):
     """渔网分割示意图窗口"""
     def __init__(self, image_path, grid_result, fishnet_model=None, parent=None):
@@ -207,8 +460,8 @@ class GridOverviewWindow(QMainWindow):
         # 创建主布局
         main_layout = QVBoxLayout(central_widget)
         
-        # 创建图像查看器
-        self.overview_viewer = ImageViewer()
+        # 创建分块示意图查看器
+        self.overview_viewer = TiledOverviewViewer()
         main_layout.addWidget(self.overview_viewer, 1)
         
         # 创建按钮
@@ -253,21 +506,12 @@ class GridOverviewWindow(QMainWindow):
         try:
             # 如果提供了模型实例，优先使用模型创建分割示意图
             if self.fishnet_model:
-                # 使用模型层创建分割示意图
-                image_data = self.fishnet_model.create_overview_image_for_ui()
+                # 使用模型层创建示意图金字塔，网格线作为叠加层单独绘制
+                levels = self.fishnet_model.create_overview_pyramid_for_ui()
                 
-                if image_data:
-                    # 创建QImage - 使用RGB格式确保颜色正确
-                    overview_qimage = QImage(
-                        image_data['data'],
-                        image_data['width'],
-                        image_data['height'],
-                        image_data['bytes_per_line'],
-                        QImage.Format_RGB888  # 使用RGB格式确保红色正确显示
-                    )
-                    
-                    # 显示分割示意图
-                    self.overview_viewer.setPixmap(QPixmap.fromImage(overview_qimage))
+                if levels:
+                    self.overview_viewer.setPyramid(levels)
+                    self.overview_viewer.setGridOverlay(self.fishnet_model.get_grid_overlay_for_ui())
                     return
             
             # 备用方法：如果没有模型实例或模型方法失败，显示错误
@@ -297,6 +541,10 @@ class GridPreviewWindow(QMainWindow):
         self.fishnet_model = fishnet_model
         self.current_grid_index = 0
         
+        # 瓦片图像按需在后台加载并缓存
+        self.tile_provider = TileImageProvider(grid_result, fishnet_model, parent=self)
+        self.tile_provider.image_ready.connect(self._on_tile_ready)
+        
         # 设置中心部件为分割器
         splitter = QSplitter(Qt.Horizontal)
         self.setCentralWidget(splitter)
@@ -305,8 +553,8 @@ class GridPreviewWindow(QMainWindow):
         left_container = QWidget()
         left_layout = QVBoxLayout(left_container)
         
-        # 左侧滚动区域 - 用于显示分割示意图
-        self.grid_overview_viewer = ImageViewer()
+        # 左侧 - 用于显示分割示意图（分块金字塔 + 网格叠加层）
+        self.grid_overview_viewer = TiledOverviewViewer()
         left_layout.addWidget(self.grid_overview_viewer, 1)
         
         # 添加上一个和下一个按钮到分割图下方
@@ -384,21 +632,12 @@ class GridPreviewWindow(QMainWindow):
         try:
             # 如果提供了模型实例，优先使用模型创建分割示意图
             if self.fishnet_model:
-                # 使用模型层创建分割示意图
-                image_data = self.fishnet_model.create_overview_image_for_ui()
+                # 使用模型层创建示意图金字塔，网格线作为叠加层单独绘制
+                levels = self.fishnet_model.create_overview_pyramid_for_ui()
                 
-                if image_data:
-                    # 创建QImage - 使用RGB格式确保颜色正确
-                    overview_qimage = QImage(
-                        image_data['data'],
-                        image_data['width'],
-                        image_data['height'],
-                        image_data['bytes_per_line'],
-                        QImage.Format_RGB888  # 使用RGB格式确保红色正确显示
-                    )
-                    
-                    # 显示分割示意图
-                    self.grid_overview_viewer.setPixmap(QPixmap.fromImage(overview_qimage))
+                if levels:
+                    self.grid_overview_viewer.setPyramid(levels)
+                    self.grid_overview_viewer.setGridOverlay(self.fishnet_model.get_grid_overlay_for_ui())
                     return
             
             # 备用方法：如果没有模型实例或模型方法失败，显示错误
@@ -418,16 +657,30 @@ class GridPreviewWindow(QMainWindow):
         total_grids = len(self.grid_result)
         self.grid_index_label.setText(f"{self.current_grid_index + 1}/{total_grids}")
         
-        # 获取当前网格图像
-        current_grid = self.grid_result[self.current_grid_index]
-        if 'image' in current_grid:
-            grid_image = current_grid['image']
-            self.current_grid_viewer.setPixmap(QPixmap.fromImage(grid_image))
+        # 获取当前网格图像（未缓存时后台加载，完成后在_on_tile_ready中显示）
+        pixmap = self.tile_provider.pixmap(self.current_grid_index)
+        if pixmap is not None:
+            self.current_grid_viewer.setPixmap(pixmap)
+        
+        # 预取前后瓦片，保证导航流畅
+        index = self.current_grid_index
+        self.tile_provider.prefetch(range(max(0, index - PREFETCH_RADIUS),
+                                          min(total_grids, index + PREFETCH_RADIUS + 1)))
         
         # 更新按钮状态
         self.prev_button.setEnabled(self.current_grid_index > 0)
         self.next_button.setEnabled(self.current_grid_index < total_grids - 1)
     
+    def _on_tile_ready(self, index, size):
+        """后台加载的瓦片图像就绪"""
+        if index == self.current_grid_index and size == 0:
+            self.current_grid_viewer.setPixmap(self.tile_provider.pixmap(index))
+    
+    def closeEvent(self, event):
+        """关闭窗口时停止后台加载并释放缓存"""
+        self.tile_provider.shutdown()
+        super().closeEvent(event)
+    
     def show_previous_grid(self):
         """显示上一个网格"""
         if self.current_grid_index > 0:
@@ -452,6 +705,10 @@ class GridImagesViewer(QMainWindow):
         self.fishnet_model = fishnet_model
         self.current_index = 0
         
+        # 瓦片图像按需在后台加载并缓存，只为可见瓦片生成缩略图
+        self.tile_provider = TileImageProvider(grid_result, fishnet_model, parent=self)
+        self.tile_provider.image_ready.connect(self._on_tile_ready)
+        
         # 创建中央部件
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -525,6 +782,20 @@ class GridImagesViewer(QMainWindow):
         # 添加导航按钮布局到主布局
         main_layout.addLayout(nav_layout)
         
+        # 缩略图条 - 列表视图只绘制可见项，适用于上万个瓦片
+        self.thumbnail_model = GridThumbnailModel(self.tile_provider, thumb_size=96, parent=self)
+        self.thumbnail_view = QListView()
+        self.thumbnail_view.setViewMode(QListView.IconMode)
+        self.thumbnail_view.setFlow(QListView.LeftToRight)
+        self.thumbnail_view.setWrapping(False)
+        self.thumbnail_view.setUniformItemSizes(True)
+        self.thumbnail_view.setIconSize(QSize(96, 96))
+        self.thumbnail_view.setFixedHeight(140)
+        self.thumbnail_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.thumbnail_view.setModel(self.thumbnail_model)
+        self.thumbnail_view.clicked.connect(lambda index: self.show_image_at(index.row()))
+        main_layout.addWidget(self.thumbnail_view)
+        
         # 初始化显示
         self.update_display()
     
@@ -546,14 +817,39 @@ class GridImagesViewer(QMainWindow):
         total = len(self.grid_result)
         self.position_label.setText(f"{self.current_index + 1} / {total}")
         
-        # 显示图像
-        if 'image' in current_grid:
-            grid_image = current_grid['image']
-            self.image_viewer.setPixmap(QPixmap.fromImage(grid_image))
+        # 显示图像（未缓存时后台加载，完成后在_on_tile_ready中显示）
+        pixmap = self.tile_provider.pixmap(self.current_index)
+        if pixmap is not None:
+            self.image_viewer.setPixmap(pixmap)
+        
+        # 预取前后瓦片，保证导航流畅
+        self.tile_provider.prefetch(range(max(0, self.current_index - PREFETCH_RADIUS),
+                                          min(total, self.current_index + PREFETCH_RADIUS + 1)))
+        
+        # 同步缩略图条的选中项
+        model_index = self.thumbnail_model.index(self.current_index, 0)
+        self.thumbnail_view.setCurrentIndex(model_index)
+        self.thumbnail_view.scrollTo(model_index)
         
         # 更新按钮状态
         self.prev_button.setEnabled(self.current_index > 0)
         self.next_button.setEnabled(self.current_index < len(self.grid_result) - 1)
+    
+    def _on_tile_ready(self, index, size):
+        """后台加载的瓦片图像就绪"""
+        if index == self.current_index and size == 0:
+            self.image_viewer.setPixmap(self.tile_provider.pixmap(index))
+    
+    def show_image_at(self, index):
+        """显示指定索引的图像"""
+        if 0 <= index < len(self.grid_result) and index != self.current_index:
+            self.current_index = index
+            self.update_display()
+    
+    def closeEvent(self, event):
+        """关闭窗口时停止后台加载并释放缓存"""
+        self.tile_provider.shutdown()
+        super().closeEvent(event)
         
     def show_previous_image(self):
         """显示上一张图像"""
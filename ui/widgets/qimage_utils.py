@@ -0,0 +1,115 @@
+"""
+QImage像素处理工具
+将QImage的像素缓冲区包装为NumPy视图（不复制数据），使用查找表完成亮度增强等逐像素操作
+"""
+import numpy as np
+from PySide6.QtGui import QImage
+
+
+def qimage_to_array(qimage, writable=False):
+    """
+    将Format_RGB32/ARGB32格式的QImage缓冲区包装为NumPy视图，不复制数据
+
+    Args:
+        qimage: QImage对象，必须为32位格式
+        writable: 是否需要可写视图，只读时使用constBits避免触发深拷贝
+
+    Returns:
+        numpy.ndarray: 形状为(height, width, 4)的uint8视图，通道顺序为B、G、R、A（小端序）
+    """
+    width, height = qimage.width(), qimage.height()
+    bytes_per_line = qimage.bytesPerLine()
+    buffer = qimage.bits() if writable else qimage.constBits()
+    rows = np.frombuffer(buffer, dtype=np.uint8, count=bytes_per_line * height)
+    rows = rows.reshape(height, bytes_per_line)
+    return rows[:, :width * 4].reshape(height, width, 4)
+
+
+def brightness_lut(factor):
+    """
+    生成亮度增强查找表
+
+    Args:
+        factor: 亮度因子
+
+    Returns:
+        numpy.ndarray: 256项uint8查找表
+    """
+    return np.minimum(255, (np.arange(256) * factor).astype(np.int32)).astype(np.uint8)
+
+
+def brighten_qimage(qimage, factor=2.5):
+    """
+    使用查找表增强QImage亮度
+
+    Args:
+        qimage: 输入QImage
+        factor: 亮度因子
+
+    Returns:
+        QImage: 增强后的新图像（Format_RGB32）
+    """
+    if qimage.format() != QImage.Format_RGB32:
+        result = qimage.convertToFormat(QImage.Format_RGB32)
+    else:
+        result = qimage.copy()
+
+    if result.isNull():
+        return result
+
+    # 在新图像的缓冲区上原地查表，只处理B、G、R三个通道
+    pixels = qimage_to_array(result, writable=True)
+    lut = brightness_lut(factor)
+    pixels[:, :, :3] = lut[pixels[:, :, :3]]
+    return result
+
+
+def is_image_too_dark(qimage, threshold=10, dark_ratio=0.9, max_samples=4096):
+    """
+    基于抽样亮度直方图判断图像是否过暗
+
+    Args:
+        qimage: 输入QImage
+        threshold: 暗像素的亮度阈值
+        dark_ratio: 暗像素比例超过该值时认为图像过暗
+        max_samples: 最大抽样像素数
+
+    Returns:
+        bool: 图像是否过暗
+    """
+    width, height = qimage.width(), qimage.height()
+    if width <= 0 or height <= 0:
+        return True
+
+    if qimage.format() not in (QImage.Format_RGB32, QImage.Format_ARGB32):
+        qimage = qimage.convertToFormat(QImage.Format_RGB32)
+
+    # 等间隔抽样，只读取少量像素
+    step = max(1, int(np.ceil(np.sqrt(width * height / float(max_samples)))))
+    sample = qimage_to_array(qimage)[::step, ::step, :3]
+    brightness = sample.sum(axis=2, dtype=np.uint16) // 3
+
+    # 亮度直方图的累计比例
+    histogram = np.bincount(brightness.ravel(), minlength=256)
+    dark_count = histogram[:max(0, int(np.ceil(threshold)))].sum()
+    return dark_count / float(max(1, brightness.size)) > dark_ratio
+
+
+def image_data_to_qimage(image_data):
+    """
+    在模型层提供的像素缓冲区上直接构造QImage，不复制像素数据
+
+    Args:
+        image_data: 模型层convert_array_to_qimage_format返回的字典
+
+    Returns:
+        QImage: 共享image_data缓冲区的图像。QImage不拥有这块内存，
+                调用方需要在QImage使用期间保持对image_data的引用
+    """
+    return QImage(
+        image_data['data'],
+        image_data['width'],
+        image_data['height'],
+        image_data['bytes_per_line'],
+        QImage.Format_RGB888  # 使用RGB格式，不是BGR
+    )
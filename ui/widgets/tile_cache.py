@@ -0,0 +1,224 @@
+"""
+网格瓦片图像的按需加载与缓存
+后台线程池生成瓦片图像和缩略图，GUI线程将其转换为QPixmap并放入限定大小的LRU缓存，
+配合只查询可见项的QListView模型，实现只渲染可见瓦片的网格浏览
+"""
+from collections import OrderedDict
+
+from PySide6.QtCore import (QObject, QRunnable, QThreadPool, Signal, Qt, QSize,
+                            QAbstractListModel, QModelIndex)
+from PySide6.QtGui import QPixmap, QImage, QColor
+
+from ui.widgets.qimage_utils import image_data_to_qimage
+
+
+class PixmapLRUCache:
+    """按像素字节数限定容量的QPixmap LRU缓存"""
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._items = OrderedDict()
+
+    @staticmethod
+    def _cost(pixmap):
+        return pixmap.width() * pixmap.height() * 4
+
+    def get(self, key):
+        """获取缓存项并标记为最近使用"""
+        pixmap = self._items.get(key)
+        if pixmap is not None:
+            self._items.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        """加入缓存，超出容量时淘汰最久未使用的项"""
+        if key in self._items:
+            self.current_bytes -= self._cost(self._items.pop(key))
+        self._items[key] = pixmap
+        self.current_bytes += self._cost(pixmap)
+
+        while self.current_bytes > self.max_bytes and len(self._items) > 1:
+            _, evicted = self._items.popitem(last=False)
+            self.current_bytes -= self._cost(evicted)
+
+    def clear(self):
+        """清空缓存"""
+        self._items.clear()
+        self.current_bytes = 0
+
+
+class _TileLoadSignals(QObject):
+    """后台任务的信号载体（QRunnable本身不能发射信号）"""
+    loaded = Signal(int, int, QImage)  # 瓦片索引, 尺寸, 图像
+
+
+class _TileLoadTask(QRunnable):
+    """在线程池中加载单个瓦片图像"""
+
+    def __init__(self, provider, index, size):
+        super().__init__()
+        self.provider = provider
+        self.index = index
+        self.size = size
+        self.signals = provider._signals
+
+    def run(self):
+        try:
+            image = self.provider._load_image(self.index, self.size)
+        except Exception:
+            image = QImage()
+        try:
+            self.signals.loaded.emit(self.index, self.size, image)
+        except RuntimeError:
+            # 提供者已被销毁
+            pass
+
+
+class TileImageProvider(QObject):
+    """
+    瓦片图像提供者
+
+    pixmap()在缓存命中时立即返回，未命中时提交后台加载并返回None，
+    加载完成后通过image_ready信号通知界面刷新
+    """
+
+    image_ready = Signal(int, int)  # 瓦片索引, 尺寸（0表示原始分辨率）
+
+    def __init__(self, grid_result, fishnet_model=None, cache_bytes=256 * 1024 * 1024,
+                 max_threads=None, parent=None):
+        """
+        Args:
+            grid_result: 网格结果列表
+            fishnet_model: 渔网分割模型，用于按需读取没有预生成图像的网格
+            cache_bytes: 像素缓存的最大字节数
+            max_threads: 后台加载线程数
+        """
+        super().__init__(parent)
+        self.grid_result = grid_result or []
+        self.fishnet_model = fishnet_model
+        self.cache = PixmapLRUCache(cache_bytes)
+
+        self._pending = set()
+        self._closed = False
+
+        self._pool = QThreadPool(self)
+        if max_threads:
+            self._pool.setMaxThreadCount(max_threads)
+
+        self._signals = _TileLoadSignals()
+        self._signals.loaded.connect(self._on_loaded, Qt.QueuedConnection)
+
+    def _load_image(self, index, size):
+        """在工作线程中生成瓦片图像，缩略图按最长边缩放"""
+        grid = self.grid_result[index]
+        image = grid.get('image')
+
+        if image is None and self.fishnet_model is not None:
+            # 窗口读取由句柄池为每个线程提供独立的数据集句柄，可以并行
+            array = self.fishnet_model.get_grid_array(grid)
+            image_data = self.fishnet_model.convert_array_to_qimage_format(array)
+            # 复制一份，使图像不再依赖临时缓冲区
+            image = image_data_to_qimage(image_data).copy()
+
+        if image is None or image.isNull():
+            return QImage()
+
+        if size > 0 and (image.width() > size or image.height() > size):
+            return image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        if image is grid.get('image'):
+            return image.copy()
+        return image
+
+    def _on_loaded(self, index, size, image):
+        """GUI线程中接收加载结果，转换为QPixmap并放入缓存"""
+        self._pending.discard((index, size))
+        if self._closed or image.isNull():
+            return
+        self.cache.put((index, size), QPixmap.fromImage(image))
+        self.image_ready.emit(index, size)
+
+    def count(self):
+        """瓦片数量"""
+        return len(self.grid_result)
+
+    def pixmap(self, index, size=0):
+        """
+        获取瓦片图像
+
+        Args:
+            index: 瓦片索引
+            size: 缩略图最长边像素数，0表示原始分辨率
+
+        Returns:
+            QPixmap: 缓存命中时返回图像，否则提交后台加载并返回None
+        """
+        pixmap = self.cache.get((index, size))
+        if pixmap is None:
+            self.request(index, size)
+        return pixmap
+
+    def request(self, index, size=0):
+        """提交后台加载（已缓存或已在加载中的瓦片不会重复提交）"""
+        if self._closed or not 0 <= index < len(self.grid_result):
+            return
+        key = (index, size)
+        if key in self._pending or self.cache.get(key) is not None:
+            return
+        self._pending.add(key)
+        self._pool.start(_TileLoadTask(self, index, size))
+
+    def prefetch(self, indices, size=0):
+        """预取若干瓦片，用于上一张/下一张导航"""
+        for index in indices:
+            self.request(index, size)
+
+    def shutdown(self):
+        """取消尚未开始的加载任务并释放缓存"""
+        self._closed = True
+        self._pool.clear()
+        self._pool.waitForDone(1000)
+        self.cache.clear()
+
+
+class GridThumbnailModel(QAbstractListModel):
+    """
+    网格缩略图列表模型
+
+    视图只会为可见项查询DecorationRole，因此缩略图按需生成，
+    打开浏览器的开销只与可见瓦片数量相关
+    """
+
+    def __init__(self, provider, thumb_size=128, parent=None):
+        super().__init__(parent)
+        self.provider = provider
+        self.thumb_size = thumb_size
+
+        # 占位图，缩略图加载完成前显示
+        self._placeholder = QPixmap(thumb_size, thumb_size)
+        self._placeholder.fill(QColor("#e0e0e0"))
+
+        provider.image_ready.connect(self._on_image_ready)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.provider.count()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        grid = self.provider.grid_result[index.row()]
+        if role == Qt.DisplayRole:
+            return f"{grid.get('row', 0)}-{grid.get('col', 0)}"
+        if role == Qt.DecorationRole:
+            return self.provider.pixmap(index.row(), self.thumb_size) or self._placeholder
+        if role == Qt.SizeHintRole:
+            return QSize(self.thumb_size + 16, self.thumb_size + 24)
+        return None
+
+    def _on_image_ready(self, row, size):
+        if size == self.thumb_size:
+            model_index = self.index(row, 0)
+            self.dataChanged.emit(model_index, model_index, [Qt.DecorationRole])
@@ -3,12 +3,19 @@ API 客户端模块，用于与远程FastAPI服务通信
 """
 
 from .client import ApiClient
+from .async_client import AsyncApiClient, AIOHTTP_AVAILABLE
 from .config import ApiConfig
+from .result_cache import ResultCache
+from .download import DownloadManager
 from .task_handlers import TaskHandler, SegmentationTask, DetectionTask, ClassificationTask, ChangeDetectionTask
 
 __all__ = [
     'ApiClient',
+    'AsyncApiClient',
+    'AIOHTTP_AVAILABLE',
     'ApiConfig',
+    'ResultCache',
+    'DownloadManager',
     'TaskHandler',
     'SegmentationTask',
     'DetectionTask',
@@ -0,0 +1,305 @@
+"""
+异步API客户端，基于asyncio和aiohttp与FastAPI服务通信
+接口与ApiClient一致，所有请求共享一个带连接数限制的持久连接池
+
+本模块只作为库提供给自带事件循环的脚本和服务使用；桌面程序的批量处理（BatchJobEngine）
+和结果下载（DownloadManager）运行在工作线程中，仍使用同步的ApiClient
+"""
+import os
+import asyncio
+import logging
+from typing import Dict, Any, Optional, Tuple
+
+from .config import ApiConfig
+from .client import ApiError
+from .resilience import PollBackoff
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+
+class AsyncApiClient:
+    """异步API客户端
+
+    连接池大小、单主机连接数和超时均来自ApiConfig。会话在首次请求时创建，
+    必须在同一个事件循环中使用并在结束时关闭。
+
+    使用示例:
+        async with AsyncApiClient(config) as client:
+            results = await asyncio.gather(*[client.get(f"/tasks/{i}") for i in task_ids])
+    """
+
+    def __init__(self, config: ApiConfig = None):
+        """初始化异步API客户端
+
+        Args:
+            config: API配置，如果为None则使用默认配置
+        """
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("异步API客户端需要安装aiohttp库")
+
+        self.config = config or ApiConfig.default()
+        self.logger = logging.getLogger("AsyncApiClient")
+        self.session = None
+        # 服务端是否支持批量状态查询（None表示尚未探测）
+        self._bulk_supported = None
+
+        self.headers = {}
+        # 如果有API密钥，添加到请求头
+        if self.config.api_key:
+            self.headers["Authorization"] = f"Bearer {self.config.api_key}"
+
+    async def __aenter__(self):
+        await self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _get_session(self) -> "aiohttp.ClientSession":
+        """获取会话，首次调用时按配置创建连接池"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.config.pool_size,
+                limit_per_host=self.config.pool_per_host,
+                keepalive_timeout=self.config.keepalive_timeout
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=self.config.timeout,
+                connect=self.config.connect_timeout
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers=self.headers
+            )
+        return self.session
+
+    async def close(self):
+        """关闭会话和连接池"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    def _make_url(self, endpoint: str) -> str:
+        """构建完整的API URL
+
+        Args:
+            endpoint: API端点路径或完整URL（任务结果中的文件地址）
+
+        Returns:
+            完整的API URL
+        """
+        if endpoint.startswith(("http://", "https://")):
+            return endpoint
+
+        # 确保endpoint以/开头
+        if not endpoint.startswith("/"):
+            endpoint = f"/{endpoint}"
+
+        return f"{self.config.base_endpoint}{endpoint}"
+
+    async def _handle_response(self, response: "aiohttp.ClientResponse") -> Dict[str, Any]:
+        """处理API响应
+
+        Args:
+            response: 请求响应对象
+
+        Returns:
+            API响应数据
+
+        Raises:
+            ApiError: 当API返回错误时
+        """
+        text = await response.text()
+
+        if response.status >= 400:
+            error_msg = "API请求失败"
+            details = text
+            try:
+                error_data = await response.json(content_type=None)
+                if isinstance(error_data, dict):
+                    error_msg = error_data.get('detail', error_msg)
+                    details = error_data
+            except Exception:
+                pass
+            raise ApiError(error_msg, response.status, details)
+
+        try:
+            return await response.json(content_type=None)
+        except ValueError:
+            raise ApiError("无法解析API响应", response.status, text)
+
+    async def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """发送GET请求
+
+        Args:
+            endpoint: API端点
+            params: 查询参数
+
+        Returns:
+            API响应数据
+        """
+        session = await self._get_session()
+        try:
+            async with session.get(self._make_url(endpoint), params=params) as response:
+                return await self._handle_response(response)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ApiError(f"GET请求失败: {str(e)}")
+
+    async def post(self, endpoint: str, data: Optional[Dict[str, Any]] = None,
+                   files: Optional[Dict[str, Tuple[str, Any, str]]] = None) -> Dict[str, Any]:
+        """发送POST请求
+
+        Args:
+            endpoint: API端点
+            data: 请求数据
+            files: 上传的文件，格式与ApiClient.post相同: {字段名: (文件名, 内容或文件对象, 类型)}
+
+        Returns:
+            API响应数据
+        """
+        session = await self._get_session()
+        try:
+            if files:
+                # 有文件上传时使用multipart表单
+                form = aiohttp.FormData()
+                for key, value in (data or {}).items():
+                    form.add_field(key, str(value))
+                for field_name, (file_name, content, content_type) in files.items():
+                    form.add_field(field_name, content, filename=file_name, content_type=content_type)
+                request = session.post(self._make_url(endpoint), data=form)
+            else:
+                request = session.post(self._make_url(endpoint), json=data)
+
+            async with request as response:
+                return await self._handle_response(response)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ApiError(f"POST请求失败: {str(e)}")
+
+    async def upload_file(self, endpoint: str, file_path: str,
+                          file_param_name: str = "file",
+                          additional_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """上传文件到API
+
+        文件对象直接交给aiohttp分块发送，不会整体读入内存
+
+        Args:
+            endpoint: API端点
+            file_path: 文件路径
+            file_param_name: 文件参数名称
+            additional_data: 附加表单数据
+
+        Returns:
+            API响应数据
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                files = {file_param_name: (os.path.basename(file_path), f, 'application/octet-stream')}
+                return await self.post(endpoint, data=additional_data, files=files)
+        except IOError as e:
+            raise ApiError(f"文件上传失败: {str(e)}")
+
+    async def download_file(self, endpoint: str, save_path: str,
+                            params: Optional[Dict[str, Any]] = None,
+                            chunk_size: int = 1024 * 1024) -> str:
+        """从API下载文件
+
+        Args:
+            endpoint: API端点
+            save_path: 保存文件的路径
+            params: 查询参数
+            chunk_size: 每次写入的字节数
+
+        Returns:
+            下载文件的本地路径
+        """
+        session = await self._get_session()
+        try:
+            # 下载大文件时不限制总时长，只保留连接和读超时
+            timeout = aiohttp.ClientTimeout(total=None, connect=self.config.connect_timeout,
+                                            sock_read=self.config.timeout)
+            async with session.get(self._make_url(endpoint), params=params, timeout=timeout) as response:
+                if response.status != 200:
+                    error_msg = f"文件下载失败: HTTP {response.status}"
+                    try:
+                        error_data = await response.json(content_type=None)
+                        if isinstance(error_data, dict) and 'detail' in error_data:
+                            error_msg = error_data['detail']
+                    except Exception:
+                        pass
+                    raise ApiError(error_msg, response.status)
+
+                with open(save_path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        f.write(chunk)
+
+            return save_path
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise ApiError(f"文件下载失败: {str(e)}")
+
+    async def get_task_statuses(self, task_ids) -> Dict[str, Dict[str, Any]]:
+        """批量查询任务状态，服务端不支持批量接口时并发逐个查询
+
+        Args:
+            task_ids: 任务ID列表
+
+        Returns:
+            {任务ID: 任务信息}，查询失败的任务不包含在结果中
+        """
+        task_ids = list(task_ids)
+        if not task_ids:
+            return {}
+
+        if self._bulk_supported is not False:
+            try:
+                tasks = (await self.post("/tasks/status", data={"task_ids": task_ids})).get("tasks", {})
+                if isinstance(tasks, list):
+                    tasks = {task.get("task_id"): task for task in tasks}
+                self._bulk_supported = True
+                return tasks
+            except ApiError as e:
+                if e.status_code not in (404, 405, 501):
+                    raise
+                self._bulk_supported = False
+
+        results = await asyncio.gather(*[self.get(f"/tasks/{task_id}") for task_id in task_ids],
+                                       return_exceptions=True)
+        return {task_id: info for task_id, info in zip(task_ids, results)
+                if not isinstance(info, BaseException)}
+
+    async def wait_for_task(self, task_id: str, check_interval: float = 2,
+                            max_wait_time: float = 3600) -> Dict[str, Any]:
+        """等待任务完成，等待期间不占用线程
+
+        轮询间隔按带抖动的指数退避从很短逐步放大到check_interval
+
+        Args:
+            task_id: 任务ID
+            check_interval: 轮询间隔上限(秒)
+            max_wait_time: 最大等待时间(秒)
+
+        Returns:
+            任务结果
+        """
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        backoff = PollBackoff(max_interval=check_interval)
+        while True:
+            elapsed_time = loop.time() - start_time
+            if elapsed_time > max_wait_time:
+                raise ApiError(f"等待任务超时: {task_id}", details={"elapsed_time": elapsed_time})
+
+            task_info = await self.get(f"/tasks/{task_id}")
+            status = task_info.get("status")
+
+            if status == "completed":
+                return task_info.get("result", {})
+            elif status == "failed":
+                error_details = task_info.get("error", "未知错误")
+                raise ApiError(f"任务执行失败: {error_details}", details=task_info)
+
+            await asyncio.sleep(backoff.next())
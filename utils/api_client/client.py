@@ -1,15 +1,21 @@
 """
 API客户端，处理与FastAPI服务的HTTP通信
 """
+import os
 import json
 import time
+import uuid
 import logging
-from typing import Dict, Any, Optional, Union, List, Tuple
+from typing import Dict, Any, Optional, Union, List, Tuple, Callable
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeoutError
 
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 
 from .config import ApiConfig
+from .resilience import CircuitBreaker, RetryPolicy
 
 
 class ApiError(Exception):
@@ -21,9 +27,123 @@ class ApiError(Exception):
         super().__init__(self.message)
 
 
+class CircuitOpenError(ApiError):
+    """服务处于熔断状态，请求未发送"""
+    def __init__(self, retry_after: float = 0.0):
+        super().__init__("API服务暂不可用（熔断中）", 503, {"retry_after": retry_after})
+        self.retry_after = retry_after
+
+
+class MultipartStream:
+    """流式multipart/form-data请求体
+    
+    以类文件对象的形式提供给requests，按需从磁盘读取文件内容，
+    内存占用只与读取块大小相关；提供__len__使请求带有Content-Length
+    """
+    
+    def __init__(self, fields: Optional[Dict[str, Any]] = None,
+                 files: Optional[Dict[str, Tuple[str, str, str]]] = None,
+                 progress_callback: Optional[Callable[[int, int], None]] = None):
+        """初始化请求体
+        
+        Args:
+            fields: 普通表单字段，字典和列表按JSON编码
+            files: 文件字段，格式为 {字段名: (文件名, 文件路径, 内容类型)}
+            progress_callback: 进度回调函数，参数为(已发送字节数, 总字节数)
+        """
+        self.boundary = uuid.uuid4().hex
+        self.progress_callback = progress_callback
+        
+        # 请求体由若干段组成：bytes为内存中的段，(路径, 大小)为文件段
+        self._segments = []
+        for name, value in (fields or {}).items():
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value, ensure_ascii=False)
+            self._segments.append(self._part_header(name) + f"\r\n{value}\r\n".encode("utf-8"))
+        for name, (file_name, file_path, content_type) in (files or {}).items():
+            self._segments.append(self._part_header(name, file_name, content_type) + b"\r\n")
+            self._segments.append((file_path, os.path.getsize(file_path)))
+            self._segments.append(b"\r\n")
+        self._segments.append(f"--{self.boundary}--\r\n".encode("utf-8"))
+        
+        self.length = sum(len(seg) if isinstance(seg, bytes) else seg[1] for seg in self._segments)
+        self.sent = 0
+        self._index = 0
+        self._offset = 0
+        self._file = None
+    
+    def _part_header(self, name, file_name=None, content_type=None) -> bytes:
+        """生成一个表单项的头部"""
+        disposition = f'form-data; name="{name}"'
+        if file_name is not None:
+            disposition += f'; filename="{file_name}"'
+        header = f"--{self.boundary}\r\nContent-Disposition: {disposition}\r\n"
+        if content_type:
+            header += f"Content-Type: {content_type}\r\n"
+        return header.encode("utf-8")
+    
+    @property
+    def content_type(self) -> str:
+        """请求头中的Content-Type"""
+        return f"multipart/form-data; boundary={self.boundary}"
+    
+    def __len__(self):
+        return self.length
+    
+    def read(self, size: int = -1) -> bytes:
+        """读取下一段数据，由requests在发送时循环调用
+        
+        Args:
+            size: 最多读取的字节数，-1表示读取剩余全部内容
+            
+        Returns:
+            数据块，读取完毕时返回空字节串
+        """
+        if size is None or size < 0:
+            size = self.length - self.sent
+        
+        chunks = []
+        remaining = size
+        while remaining > 0 and self._index < len(self._segments):
+            segment = self._segments[self._index]
+            if isinstance(segment, bytes):
+                chunk = segment[self._offset:self._offset + remaining]
+                self._offset += len(chunk)
+                finished = self._offset >= len(segment)
+            else:
+                if self._file is None:
+                    self._file = open(segment[0], "rb")
+                chunk = self._file.read(remaining)
+                finished = not chunk
+                if finished:
+                    self._file.close()
+                    self._file = None
+            
+            if finished:
+                self._index += 1
+                self._offset = 0
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        
+        data = b"".join(chunks)
+        self.sent += len(data)
+        if data and self.progress_callback:
+            self.progress_callback(self.sent, self.length)
+        return data
+    
+    def close(self):
+        """关闭正在读取的文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
 class ApiClient:
     """API客户端，管理与远程API服务的通信"""
     
+    # 断点续传时单个分块的最大重试次数
+    UPLOAD_RETRIES = 5
+    
     def __init__(self, config: ApiConfig = None):
         """初始化API客户端
         
@@ -34,19 +154,46 @@ class ApiClient:
         self.logger = logging.getLogger("ApiClient")
         self.session = requests.Session()
         
+        # 按配置调整连接池大小，使并发线程复用持久连接而不是反复建连
+        adapter = HTTPAdapter(pool_maxsize=self.config.pool_per_host)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
         # 如果有API密钥，添加到请求头
         if self.config.api_key:
             self.session.headers.update({"Authorization": f"Bearer {self.config.api_key}"})
+        
+        # 服务端是否支持断点续传和文件哈希查询（None表示尚未探测）
+        self._resumable_supported = None
+        self._blob_check_supported = None
+        self._status_monitor = None
+        self._downloader = None
+        
+        # 容错：幂等请求重试、熔断器和服务健康状态缓存 (检查时间, 是否可用)
+        self.retry_policy = RetryPolicy(self.config.retry_attempts, self.config.retry_backoff)
+        self.breaker = CircuitBreaker(self.config.breaker_threshold, self.config.breaker_reset_timeout)
+        self._health = (0.0, False)
+        
+        # 对冲请求使用的线程池
+        self._hedge_executor = None
+        if self.config.hedge_delay > 0:
+            self._hedge_executor = ThreadPoolExecutor(max_workers=max(2, self.config.pool_per_host),
+                                                      thread_name_prefix="ApiHedge")
+        # 未完成的断点续传会话: (文件路径, 大小, 修改时间) -> upload_id
+        self._upload_sessions = {}
     
     def _make_url(self, endpoint: str) -> str:
         """构建完整的API URL
         
         Args:
-            endpoint: API端点路径
+            endpoint: API端点路径或完整URL（任务结果中的文件地址）
             
         Returns:
             完整的API URL
         """
+        if endpoint.startswith(("http://", "https://")):
+            return endpoint
+        
         # 确保endpoint以/开头
         if not endpoint.startswith("/"):
             endpoint = f"/{endpoint}"
@@ -84,62 +231,192 @@ class ApiClient:
                 
             raise ApiError(error_msg, response.status_code, details)
     
-    def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """发送GET请求
+    def _hedged_request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """发送对冲请求：首个请求超过hedge_delay未返回时再发一个相同请求，采用先返回的结果
+        
+        只用于只读请求
+        """
+        first = self._hedge_executor.submit(self.session.request, method, url, **kwargs)
+        try:
+            return first.result(timeout=self.config.hedge_delay)
+        except FutureTimeoutError:
+            pass
+        
+        second = self._hedge_executor.submit(self.session.request, method, url, **kwargs)
+        done, _ = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = done.pop()
+        other = second if winner is first else first
+        
+        if winner.exception() is not None:
+            # 先返回的请求出错时等待另一个
+            return other.result()
+        
+        # 丢弃较慢的响应，释放连接
+        other.add_done_callback(lambda f: f.exception() is None and f.result().close())
+        return winner.result()
+    
+    def _send(self, method: str, endpoint: str, idempotent: bool = False,
+              hedge: bool = False, **kwargs) -> requests.Response:
+        """发送请求，经过熔断器并对幂等请求按退避间隔重试
+        
+        网络错误和5xx状态码计为失败，其中网络错误和429/502/503/504会重试；
+        429表示服务正常但在限流，重试但不计入熔断器
+        非幂等请求只尝试一次，避免服务端重复创建任务
+        
+        Args:
+            method: HTTP方法
+            endpoint: API端点
+            idempotent: 是否为幂等请求（允许重试）
+            hedge: 是否允许对冲请求（需配置hedge_delay）
+            **kwargs: 传递给requests的参数
+            
+        Returns:
+            响应对象
+            
+        Raises:
+            CircuitOpenError: 服务处于熔断状态
+            ApiError: 请求失败
+        """
+        url = self._make_url(endpoint)
+        kwargs.setdefault("timeout", self.config.timeout)
+        attempts = self.retry_policy.max_attempts if idempotent else 1
+        backoff = self.retry_policy.backoff()
+        
+        for attempt in range(1, attempts + 1):
+            if not self.breaker.allow_request():
+                raise CircuitOpenError(self.breaker.remaining())
+            
+            try:
+                try:
+                    if hedge and self._hedge_executor is not None:
+                        response = self._hedged_request(method, url, **kwargs)
+                    else:
+                        response = self.session.request(method, url, **kwargs)
+                except RequestException as e:
+                    self.breaker.record_failure()
+                    if attempt >= attempts:
+                        raise ApiError(f"{method}请求失败: {str(e)}")
+                    self.logger.warning(f"{method} {endpoint} 失败，第{attempt}次重试: {str(e)}")
+                    time.sleep(backoff.next())
+                    continue
+                
+                status = response.status_code
+                if status in RetryPolicy.RETRY_STATUSES or status >= 500:
+                    if status != 429:
+                        self.breaker.record_failure()
+                    if status in RetryPolicy.RETRY_STATUSES and attempt < attempts:
+                        delay = RetryPolicy.retry_after(response.headers.get("Retry-After"),
+                                                        backoff.next(), self.retry_policy.max_delay)
+                        response.close()
+                        self.logger.warning(f"{method} {endpoint} 返回 HTTP {status}，"
+                                            f"{delay:.1f} 秒后第{attempt}次重试")
+                        time.sleep(delay)
+                        continue
+                else:
+                    self.breaker.record_success()
+                return response
+            finally:
+                # 请求抛出其他异常（如读取上传文件出错）时不能一直占用半开状态的探测名额
+                self.breaker.release_probe()
+    
+    def check_connection(self, force: bool = False) -> bool:
+        """检查API服务是否可用
+        
+        健康状态缓存health_ttl秒；熔断期间直接返回False，
+        最近有成功请求时直接返回True，都不发送探测请求。
+        强制探测（如启动服务后）不经过熔断器，/ping返回200时关闭熔断器
+        
+        Args:
+            force: 是否忽略缓存和熔断状态重新探测
+            
+        Returns:
+            API服务是否可用
+        """
+        now = time.time()
+        if not force:
+            if self.breaker.state == CircuitBreaker.OPEN:
+                return False
+            last_success = self.breaker.last_success
+            if last_success > self.breaker.last_failure and now - last_success < self.config.health_ttl:
+                return True
+            checked_at, available = self._health
+            if now - checked_at < self.config.health_ttl:
+                return available
+        
+        timeout = min(self.config.timeout, 5)
+        if force:
+            try:
+                response = self.session.request("GET", self._make_url("/ping"), timeout=timeout)
+                available = response.status_code == 200
+                response.close()
+            except RequestException:
+                available = False
+            if available:
+                self.breaker.record_success()
+        else:
+            try:
+                response = self._send("GET", "/ping", timeout=timeout)
+                available = response.status_code == 200
+            except ApiError:
+                available = False
+        
+        self._health = (time.time(), available)
+        return available
+    
+    def start_service(self) -> bool:
+        """尝试启动本机Docker中的API服务
+        
+        Returns:
+            API服务是否可用
+        """
+        from .docker_utils import ensure_api_service
+        
+        available, error = ensure_api_service(host=self.config.host, port=self.config.port)
+        if not available:
+            self.logger.error(f"启动API服务失败: {error}")
+        self._health = (time.time(), available)
+        return available
+    
+    def get(self, endpoint: str, params: Optional[Dict[str, Any]] = None,
+            hedge: bool = False) -> Dict[str, Any]:
+        """发送GET请求，失败时按退避间隔重试
         
         Args:
             endpoint: API端点
             params: 查询参数
+            hedge: 是否允许对冲请求，用于延迟敏感的状态查询
             
         Returns:
             API响应数据
         """
-        url = self._make_url(endpoint)
-        try:
-            response = self.session.get(
-                url,
-                params=params,
-                timeout=self.config.timeout
-            )
-            return self._handle_response(response)
-        except RequestException as e:
-            raise ApiError(f"GET请求失败: {str(e)}")
+        response = self._send("GET", endpoint, idempotent=True, hedge=hedge, params=params)
+        return self._handle_response(response)
     
     def post(self, endpoint: str, data: Optional[Dict[str, Any]] = None, 
-             files: Optional[Dict[str, Tuple[str, bytes, str]]] = None) -> Dict[str, Any]:
+             files: Optional[Dict[str, Tuple[str, bytes, str]]] = None,
+             idempotent: bool = False) -> Dict[str, Any]:
         """发送POST请求
         
         Args:
             endpoint: API端点
             data: 请求数据
             files: 上传的文件
+            idempotent: 请求是否幂等（如批量查询），幂等请求失败时重试
             
         Returns:
             API响应数据
         """
-        url = self._make_url(endpoint)
-        try:
-            # 如果有文件上传，不要JSON编码
-            if files:
-                response = self.session.post(
-                    url,
-                    data=data,
-                    files=files,
-                    timeout=self.config.timeout
-                )
-            else:
-                response = self.session.post(
-                    url,
-                    json=data,
-                    timeout=self.config.timeout
-                )
-            return self._handle_response(response)
-        except RequestException as e:
-            raise ApiError(f"POST请求失败: {str(e)}")
+        # 如果有文件上传，不要JSON编码
+        if files:
+            response = self._send("POST", endpoint, idempotent=idempotent, data=data, files=files)
+        else:
+            response = self._send("POST", endpoint, idempotent=idempotent, json=data)
+        return self._handle_response(response)
     
     def upload_file(self, endpoint: str, file_path: str, 
                    file_param_name: str = "file", 
-                   additional_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+                   additional_data: Optional[Dict[str, Any]] = None,
+                   progress_callback: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
         """上传文件到API
         
         Args:
@@ -147,83 +424,255 @@ class ApiClient:
             file_path: 文件路径
             file_param_name: 文件参数名称
             additional_data: 附加表单数据
+            progress_callback: 进度回调函数，参数为(已发送字节数, 总字节数)
             
         Returns:
             API响应数据
         """
+        return self.upload_files(endpoint, {file_param_name: file_path},
+                                 additional_data, progress_callback)
+    
+    def has_blob(self, digest: str) -> bool:
+        """查询服务端是否已保存指定内容哈希的文件
+        
+        协议：GET /blobs/{sha256} 返回 {"exists": true/false}；
+        接口返回404/405/501时认为服务端不支持，此后不再查询
+        
+        Args:
+            digest: 文件内容的SHA-256哈希
+            
+        Returns:
+            服务端是否已有该文件
+        """
+        if self._blob_check_supported is False:
+            return False
         try:
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
-                
-            files = {file_param_name: (file_path.split('/')[-1], file_content, 'application/octet-stream')}
-            return self.post(endpoint, data=additional_data, files=files)
+            info = self.get(f"/blobs/{digest}")
+        except ApiError as e:
+            if e.status_code in (404, 405, 501):
+                self._blob_check_supported = False
+            return False
+        self._blob_check_supported = True
+        return bool(info.get("exists", False))
+    
+    def upload_files(self, endpoint: str, files: Dict[str, str],
+                     additional_data: Optional[Dict[str, Any]] = None,
+                     progress_callback: Optional[Callable[[int, int], None]] = None,
+                     digests: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """上传一个或多个文件到API，文件内容从磁盘流式读取，不整体载入内存
+        
+        提供digests时以 "<参数名>_sha256" 字段一并提交文件哈希，服务端已有的文件不再上传。
+        文件总大小达到resumable_threshold且服务端提供/uploads接口时，先逐个文件分块
+        断点续传，再以 "<参数名>_upload_id" 字段提交任务；否则发送流式multipart请求
+        
+        Args:
+            endpoint: API端点
+            files: {文件参数名称: 文件路径}
+            additional_data: 附加表单数据
+            progress_callback: 进度回调函数，参数为(已发送字节数, 总字节数)
+            digests: {文件参数名称: 文件内容SHA-256哈希}
+            
+        Returns:
+            API响应数据
+        """
+        if digests:
+            additional_data = dict(additional_data or {})
+            for name, digest in digests.items():
+                additional_data[f"{name}_sha256"] = digest
+            
+            # 跳过服务端已保存的文件
+            files = {name: path for name, path in files.items()
+                     if not (name in digests and self.has_blob(digests[name]))}
+            if not files:
+                self.logger.info("服务端已有全部输入文件，跳过上传")
+                return self.post(endpoint, data=additional_data)
+        
+        try:
+            sizes = {name: os.path.getsize(path) for name, path in files.items()}
+        except OSError as e:
+            raise ApiError(f"文件上传失败: {str(e)}")
+        total = sum(sizes.values())
+        
+        if self._resumable_supported is not False and total >= self.config.resumable_threshold:
+            data = dict(additional_data or {})
+            uploaded = 0
+            for name, path in files.items():
+                callback = None
+                if progress_callback:
+                    callback = lambda sent, size, base=uploaded: progress_callback(base + sent, total)
+                upload_id = self._resumable_upload(path, callback)
+                if upload_id is None:
+                    # 服务端不支持断点续传，改用流式multipart
+                    data = None
+                    break
+                data[f"{name}_upload_id"] = upload_id
+                uploaded += sizes[name]
+            
+            if data is not None:
+                return self.post(endpoint, data=data)
+        
+        stream = MultipartStream(
+            additional_data,
+            {name: (os.path.basename(path), path, 'application/octet-stream') for name, path in files.items()},
+            progress_callback
+        )
+        try:
+            response = self._send("POST", endpoint, data=stream,
+                                  headers={"Content-Type": stream.content_type})
+            return self._handle_response(response)
         except IOError as e:
             raise ApiError(f"文件上传失败: {str(e)}")
+        finally:
+            stream.close()
+    
+    def _resumable_upload(self, file_path: str,
+                          progress_callback: Optional[Callable[[int, int], None]] = None) -> Optional[str]:
+        """分块断点续传一个文件
+        
+        协议：POST /uploads 创建会话并返回 upload_id、offset 和可选的 chunk_size；
+        PUT /uploads/{upload_id} 携带 Content-Range 发送分块并返回新的 offset；
+        GET /uploads/{upload_id} 查询服务端已接收的 offset。
+        分块失败时按服务端 offset 重新定位继续上传，未完成的会话在本客户端内保留，
+        再次上传同一文件时从断点继续。
+        
+        Args:
+            file_path: 文件路径
+            progress_callback: 进度回调函数，参数为(已发送字节数, 文件大小)
+            
+        Returns:
+            upload_id，服务端不支持断点续传时返回None
+        """
+        size = os.path.getsize(file_path)
+        key = (os.path.abspath(file_path), size, os.path.getmtime(file_path))
+        chunk_size = self.config.upload_chunk_size
+        upload_id = self._upload_sessions.get(key)
+        offset = 0
+        
+        if upload_id:
+            try:
+                offset = int(self.get(f"/uploads/{upload_id}").get("offset", 0))
+            except ApiError:
+                upload_id = None
+        
+        if not upload_id:
+            try:
+                info = self.post("/uploads", data={"filename": os.path.basename(file_path), "size": size})
+            except ApiError as e:
+                if e.status_code in (404, 405, 501):
+                    self.logger.info("服务端不支持断点续传，使用流式上传")
+                    self._resumable_supported = False
+                    return None
+                raise
+            upload_id = info.get("upload_id")
+            if not upload_id:
+                raise ApiError("无法创建上传会话", details=info)
+            offset = int(info.get("offset", 0))
+            chunk_size = int(info.get("chunk_size", chunk_size))
+            self._upload_sessions[key] = upload_id
+        
+        self._resumable_supported = True
+        failures = 0
+        
+        with open(file_path, "rb") as f:
+            while offset < size:
+                f.seek(offset)
+                chunk = f.read(chunk_size)
+                try:
+                    response = self._send(
+                        "PUT", f"/uploads/{upload_id}",
+                        data=chunk,
+                        headers={
+                            "Content-Type": "application/octet-stream",
+                            "Content-Range": f"bytes {offset}-{offset + len(chunk) - 1}/{size}"
+                        }
+                    )
+                    offset = int(self._handle_response(response).get("offset", offset + len(chunk)))
+                    failures = 0
+                except ApiError as e:
+                    failures += 1
+                    if failures > self.UPLOAD_RETRIES:
+                        # 保留会话，下次上传同一文件时从断点继续
+                        raise ApiError(f"分块上传失败: {str(e)}", details={"upload_id": upload_id, "offset": offset})
+                    self.logger.warning(f"分块上传失败，第{failures}次重试: {str(e)}")
+                    time.sleep(failures)
+                    try:
+                        offset = int(self.get(f"/uploads/{upload_id}").get("offset", offset))
+                    except ApiError:
+                        pass
+                    continue
+                
+                if progress_callback:
+                    progress_callback(offset, size)
+        
+        self._upload_sessions.pop(key, None)
+        return upload_id
     
     def download_file(self, endpoint: str, save_path: str, 
-                     params: Optional[Dict[str, Any]] = None) -> str:
+                     params: Optional[Dict[str, Any]] = None,
+                     checksum: Optional[str] = None,
+                     progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
         """从API下载文件
         
+        服务端支持Range请求时分段并行下载并可从中断处续传，下载完成后校验SHA-256，
+        详见DownloadManager
+        
         Args:
-            endpoint: API端点
+            endpoint: API端点或完整URL
             save_path: 保存文件的路径
             params: 查询参数
+            checksum: 期望的SHA-256，为None时使用响应头中的值（没有则不校验）
+            progress_callback: 进度回调函数，参数为(已下载字节数, 总字节数)
             
         Returns:
             下载文件的本地路径
         """
-        url = self._make_url(endpoint)
+        if self._downloader is None:
+            from .download import DownloadManager
+            self._downloader = DownloadManager(self)
         try:
-            response = self.session.get(
-                url,
-                params=params,
-                timeout=self.config.timeout,
-                stream=True
-            )
-            
-            if response.status_code != 200:
-                error_msg = f"文件下载失败: HTTP {response.status_code}"
-                try:
-                    error_data = response.json()
-                    if isinstance(error_data, dict) and 'detail' in error_data:
-                        error_msg = error_data['detail']
-                except:
-                    pass
-                raise ApiError(error_msg, response.status_code)
-            
-            with open(save_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-                    
-            return save_path
-        except RequestException as e:
+            return self._downloader.download(endpoint, save_path, params, checksum, progress_callback)
+        except IOError as e:
             raise ApiError(f"文件下载失败: {str(e)}")
     
-    def wait_for_task(self, task_id: str, check_interval: int = 2, 
-                     max_wait_time: int = 3600) -> Dict[str, Any]:
+    @property
+    def status_monitor(self):
+        """任务状态查询器（首次访问时创建）"""
+        if self._status_monitor is None:
+            from .task_status import TaskStatusMonitor
+            self._status_monitor = TaskStatusMonitor(self)
+        return self._status_monitor
+    
+    def get_task_statuses(self, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量查询任务状态
+        
+        Args:
+            task_ids: 任务ID列表
+            
+        Returns:
+            {任务ID: 任务信息}
+        """
+        return self.status_monitor.get_statuses(task_ids)
+    
+    def wait_for_task(self, task_id: str, check_interval: float = 2, 
+                     max_wait_time: int = 3600,
+                     progress_callback: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
         """等待任务完成
         
+        服务端支持时通过SSE推送等待，否则以带抖动的指数退避间隔轮询，
+        短任务不必等满一个固定间隔
+        
         Args:
             task_id: 任务ID
-            check_interval: 检查间隔时间(秒)
+            check_interval: 轮询间隔上限(秒)
             max_wait_time: 最大等待时间(秒)
+            progress_callback: 进度回调函数，参数为进度百分比
             
         Returns:
             任务结果
         """
-        start_time = time.time()
-        while True:
-            elapsed_time = time.time() - start_time
-            if elapsed_time > max_wait_time:
-                raise ApiError(f"等待任务超时: {task_id}", details={"elapsed_time": elapsed_time})
-            
-            task_info = self.get(f"/tasks/{task_id}")
-            status = task_info.get("status")
-            
-            if status == "completed":
-                return task_info.get("result", {})
-            elif status == "failed":
-                error_details = task_info.get("error", "未知错误")
-                raise ApiError(f"任务执行失败: {error_details}", details=task_info)
-            
-            time.sleep(check_interval) 
\ No newline at end of file
+        task_info = self.status_monitor.wait(task_id, check_interval, max_wait_time, progress_callback)
+        
+        if task_info.get("status") == "failed":
+            error_details = task_info.get("error", "未知错误")
+            raise ApiError(f"任务执行失败: {error_details}", details=task_info)
+        return task_info.get("result", {})
@@ -16,6 +16,33 @@ class ApiConfig:
     api_key: str = ""
     timeout: int = 30
     use_ssl: bool = False
+    # 连接池参数
+    pool_size: int = 100             # 连接池总连接数上限
+    pool_per_host: int = 16          # 单个主机的连接数上限
+    connect_timeout: float = 10      # 建立连接超时(秒)
+    keepalive_timeout: float = 60    # 空闲连接保持时间(秒)
+    # 上传参数
+    resumable_threshold: int = 64 * 1024 * 1024  # 达到该大小的文件优先使用断点续传(服务端支持时)
+    upload_chunk_size: int = 8 * 1024 * 1024     # 断点续传的分块大小(字节)
+    # 下载参数
+    download_segments: int = 4                   # 单个文件的最大并行分段数(服务端支持Range时)
+    download_segment_size: int = 32 * 1024 * 1024  # 文件按该大小划分分段，小于该值时不分段
+    # 容错参数
+    retry_attempts: int = 3                      # 幂等请求的最大尝试次数
+    retry_backoff: float = 0.5                   # 首次重试前的等待时间(秒)
+    breaker_threshold: int = 5                   # 触发熔断的连续失败次数
+    breaker_reset_timeout: float = 30            # 熔断持续时间(秒)
+    health_ttl: float = 10                       # 服务健康状态的缓存时间(秒)
+    hedge_delay: float = 0                       # 状态查询超过该时间未返回时发出对冲请求(秒)，0为不对冲
+    # 结果缓存参数
+    cache_enabled: bool = True
+    cache_dir: str = ""                          # 为空时使用用户目录下的 .rsiis/api_cache
+    cache_max_bytes: int = 2 * 1024 ** 3         # 缓存总大小上限(字节)
+    
+    @property
+    def resolved_cache_dir(self) -> str:
+        """获取结果缓存目录"""
+        return self.cache_dir or os.path.join(os.path.expanduser("~"), ".rsiis", "api_cache")
     
     @property
     def base_endpoint(self) -> str:
@@ -39,7 +66,24 @@ class ApiConfig:
             base_url=config_data.get('base_url', ''),
             api_key=config_data.get('api_key', ''),
             timeout=config_data.get('timeout', 30),
-            use_ssl=config_data.get('use_ssl', False)
+            use_ssl=config_data.get('use_ssl', False),
+            pool_size=config_data.get('pool_size', 100),
+            pool_per_host=config_data.get('pool_per_host', 16),
+            connect_timeout=config_data.get('connect_timeout', 10),
+            keepalive_timeout=config_data.get('keepalive_timeout', 60),
+            resumable_threshold=config_data.get('resumable_threshold', 64 * 1024 * 1024),
+            upload_chunk_size=config_data.get('upload_chunk_size', 8 * 1024 * 1024),
+            download_segments=config_data.get('download_segments', 4),
+            download_segment_size=config_data.get('download_segment_size', 32 * 1024 * 1024),
+            retry_attempts=config_data.get('retry_attempts', 3),
+            retry_backoff=config_data.get('retry_backoff', 0.5),
+            breaker_threshold=config_data.get('breaker_threshold', 5),
+            breaker_reset_timeout=config_data.get('breaker_reset_timeout', 30),
+            health_ttl=config_data.get('health_ttl', 10),
+            hedge_delay=config_data.get('hedge_delay', 0),
+            cache_enabled=config_data.get('cache_enabled', True),
+            cache_dir=config_data.get('cache_dir', ''),
+            cache_max_bytes=config_data.get('cache_max_bytes', 2 * 1024 ** 3)
         )
     
     @classmethod
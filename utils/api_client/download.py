@@ -0,0 +1,289 @@
+"""
+结果文件下载管理
+服务端支持Range请求时将文件分段并行下载，直接写入目标文件的对应位置；
+下载进度记录在旁路状态文件中，中断后从已写入的位置继续，完成后校验SHA-256
+"""
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable
+
+from requests.exceptions import RequestException
+from urllib3.exceptions import HTTPError as Urllib3Error
+
+from .client import ApiError
+
+
+class DownloadManager:
+    """分段并行、可续传的下载管理器
+
+    状态文件为 "<目标文件>.download.json"，记录文件大小、ETag/Last-Modified和每个分段已写入的位置；
+    服务端两者都不提供时无法确认文件未变化，不续传而是重新下载；
+    目标文件在下载开始时按最终大小预分配，各分段直接写入，不产生临时副本
+
+    使用示例:
+        manager = DownloadManager(api_client)
+        manager.download(result["segmentation_url"], save_path, progress_callback=callback)
+    """
+
+    # 流式读取的块大小范围，根据读取速度自适应调整
+    MIN_CHUNK_SIZE = 256 * 1024
+    MAX_CHUNK_SIZE = 8 * 1024 * 1024
+    # 单个分段中断后的最大重试次数
+    SEGMENT_RETRIES = 3
+    # 状态文件的最小保存间隔(秒)
+    STATE_SAVE_INTERVAL = 1.0
+    # 禁止压缩传输，保证Range偏移与文件偏移一致
+    HEADERS = {"Accept-Encoding": "identity"}
+
+    def __init__(self, api_client):
+        """初始化下载管理器
+
+        分段数和分段大小来自ApiClient的配置（download_segments、download_segment_size）
+
+        Args:
+            api_client: ApiClient实例
+        """
+        self.api_client = api_client
+        self.max_segments = max(1, api_client.config.download_segments)
+        self.segment_size = max(self.MIN_CHUNK_SIZE, api_client.config.download_segment_size)
+        self.logger = logging.getLogger("DownloadManager")
+
+    @staticmethod
+    def _state_path(save_path: str) -> str:
+        return save_path + ".download.json"
+
+    @staticmethod
+    def _expected_checksum(headers, checksum: Optional[str]) -> Optional[str]:
+        """获取期望的SHA-256（十六进制），优先使用调用方提供的值，其次为响应头"""
+        if checksum:
+            return checksum.split(":", 1)[-1].lower()
+
+        value = headers.get("X-Checksum-Sha256")
+        if value:
+            return value.lower()
+
+        # RFC 3230 Digest: sha-256=<base64>
+        for item in headers.get("Digest", "").split(","):
+            algorithm, _, encoded = item.strip().partition("=")
+            if algorithm.lower() == "sha-256" and encoded:
+                try:
+                    return base64.b64decode(encoded).hex()
+                except ValueError:
+                    return None
+        return None
+
+    def _probe(self, endpoint: str, params: Optional[Dict[str, Any]]):
+        """用单字节Range请求探测文件大小、ETag和是否支持分段
+
+        Returns:
+            (文件大小或None, 是否支持Range, 响应头)
+        """
+        response = self.api_client._send("GET", endpoint, idempotent=True, params=params,
+                                         headers={"Range": "bytes=0-0", **self.HEADERS}, stream=True)
+        with response:
+            if response.status_code == 206:
+                content_range = response.headers.get("Content-Range", "")
+                total = content_range.rsplit("/", 1)[-1]
+                if total.isdigit():
+                    return int(total), True, response.headers
+            if response.status_code == 200:
+                length = response.headers.get("Content-Length")
+                return (int(length) if length and length.isdigit() else None), False, response.headers
+            raise ApiError(f"文件下载失败: HTTP {response.status_code}", response.status_code)
+
+    @staticmethod
+    def _validators(headers) -> Dict[str, Optional[str]]:
+        """用于判断服务端文件是否变化的响应头"""
+        return {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified")}
+
+    def _load_state(self, save_path: str, size: int,
+                    validators: Dict[str, Optional[str]]) -> Optional[Dict[str, Any]]:
+        """读取与当前文件匹配的续传状态，没有ETag和Last-Modified时不续传"""
+        if not any(validators.values()):
+            return None
+        try:
+            with open(self._state_path(save_path), "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (IOError, ValueError):
+            return None
+        if state.get("size") != size or not os.path.exists(save_path):
+            return None
+        if any(state.get(name) != value for name, value in validators.items()):
+            return None
+        return state
+
+    def _save_state(self, save_path: str, state: Dict[str, Any]):
+        temp_path = self._state_path(save_path) + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temp_path, self._state_path(save_path))
+
+    def _stream_into(self, response, f, start: int, end: Optional[int],
+                     on_written: Callable[[int], None]) -> int:
+        """将响应内容写入文件的指定位置，块大小按读取速度自适应
+
+        Returns:
+            写入结束后的文件位置
+        """
+        f.seek(start)
+        position = start
+        chunk_size = self.MIN_CHUNK_SIZE
+
+        while end is None or position <= end:
+            read_start = time.time()
+            chunk = response.raw.read(chunk_size, decode_content=True)
+            if not chunk:
+                break
+            if end is not None and position + len(chunk) > end + 1:
+                chunk = chunk[:end + 1 - position]
+            f.write(chunk)
+            position += len(chunk)
+            on_written(position)
+
+            # 读取一块很快时放大块大小，减少Python层循环次数；变慢时缩小，保持进度和续传位置及时更新
+            elapsed = time.time() - read_start
+            if elapsed < 0.1:
+                chunk_size = min(chunk_size * 2, self.MAX_CHUNK_SIZE)
+            elif elapsed > 1.0:
+                chunk_size = max(chunk_size // 2, self.MIN_CHUNK_SIZE)
+
+        if end is not None and position <= end:
+            raise ApiError(f"下载内容不完整: 已写入到 {position}，应写入到 {end + 1}")
+        return position
+
+    def _download_segment(self, endpoint: str, params, save_path: str, state: Dict[str, Any],
+                          index: int, lock: threading.Lock, report: Callable[[], None]):
+        """下载一个分段，中断时从已写入位置重试"""
+        segment = state["segments"][index]
+        failures = 0
+        last_save = [0.0]
+
+        def on_written(position):
+            with lock:
+                segment["position"] = position
+                now = time.time()
+                if now - last_save[0] >= self.STATE_SAVE_INTERVAL:
+                    last_save[0] = now
+                    self._save_state(save_path, state)
+            report()
+
+        with open(save_path, "r+b") as f:
+            while segment["position"] <= segment["end"]:
+                headers = {"Range": f"bytes={segment['position']}-{segment['end']}", **self.HEADERS}
+                try:
+                    response = self.api_client._send("GET", endpoint, idempotent=True, params=params,
+                                                     headers=headers, stream=True)
+                    with response:
+                        if response.status_code != 206:
+                            raise ApiError(f"分段下载失败: HTTP {response.status_code}", response.status_code)
+                        self._stream_into(response, f, segment["position"], segment["end"], on_written)
+                except (RequestException, Urllib3Error, ApiError) as e:
+                    failures += 1
+                    if failures > self.SEGMENT_RETRIES:
+                        raise ApiError(f"分段下载失败: {str(e)}")
+                    self.logger.warning(f"分段{index}下载中断，第{failures}次重试: {str(e)}")
+                    time.sleep(failures)
+
+    def _verify(self, save_path: str, expected: Optional[str]):
+        """校验文件的SHA-256"""
+        if not expected:
+            return
+        sha256 = hashlib.sha256()
+        with open(save_path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.MAX_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+        if sha256.hexdigest() != expected:
+            os.remove(save_path)
+            raise ApiError("下载文件校验失败", details={"expected": expected, "actual": sha256.hexdigest()})
+
+    def download(self, endpoint: str, save_path: str, params: Optional[Dict[str, Any]] = None,
+                 checksum: Optional[str] = None,
+                 progress_callback: Optional[Callable[[int, int], None]] = None) -> str:
+        """下载文件
+
+        Args:
+            endpoint: API端点或完整URL
+            save_path: 保存文件的路径
+            params: 查询参数
+            checksum: 期望的SHA-256（十六进制，可带 "sha256:" 前缀），为None时使用响应头中的值
+            progress_callback: 进度回调函数，参数为(已下载字节数, 总字节数)
+
+        Returns:
+            下载文件的本地路径
+        """
+        size, ranged, headers = self._probe(endpoint, params)
+        validators = self._validators(headers)
+        expected = self._expected_checksum(headers, checksum)
+
+        if not ranged or not size:
+            return self._download_single(endpoint, params, save_path, size, expected, progress_callback)
+
+        state = self._load_state(save_path, size, validators)
+        if state is None:
+            segment_count = min(self.max_segments, max(1, -(-size // self.segment_size)))
+            segment_size = -(-size // segment_count)
+            state = {
+                "size": size,
+                **validators,
+                "segments": [
+                    {"start": start, "end": min(start + segment_size, size) - 1, "position": start}
+                    for start in range(0, size, segment_size)
+                ]
+            }
+            # 预分配目标文件，各分段直接写入对应位置
+            with open(save_path, "wb") as f:
+                f.truncate(size)
+            self._save_state(save_path, state)
+        else:
+            self.logger.info(f"继续未完成的下载: {save_path}")
+
+        lock = threading.Lock()
+
+        def report():
+            if progress_callback:
+                done = sum(seg["position"] - seg["start"] for seg in state["segments"])
+                progress_callback(done, size)
+
+        pending = [i for i, seg in enumerate(state["segments"]) if seg["position"] <= seg["end"]]
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+            futures = [executor.submit(self._download_segment, endpoint, params, save_path,
+                                       state, index, lock, report) for index in pending]
+            try:
+                for future in futures:
+                    future.result()
+            finally:
+                # 无论成功与否都保存进度，失败后可续传
+                with lock:
+                    self._save_state(save_path, state)
+
+        os.remove(self._state_path(save_path))
+        self._verify(save_path, expected)
+        return save_path
+
+    def _download_single(self, endpoint: str, params, save_path: str, size: Optional[int],
+                         expected: Optional[str],
+                         progress_callback: Optional[Callable[[int, int], None]]) -> str:
+        """服务端不支持Range时单连接流式下载"""
+        def on_written(position):
+            if progress_callback:
+                progress_callback(position, size or position)
+
+        response = self.api_client._send("GET", endpoint, idempotent=True, params=params, stream=True)
+        with response:
+            if response.status_code != 200:
+                raise ApiError(f"文件下载失败: HTTP {response.status_code}", response.status_code)
+
+            with open(save_path, "wb") as f:
+                try:
+                    self._stream_into(response, f, 0, None, on_written)
+                except (RequestException, Urllib3Error) as e:
+                    raise ApiError(f"文件下载失败: {str(e)}")
+
+        self._verify(save_path, expected)
+        return save_path
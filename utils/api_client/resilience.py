@@ -0,0 +1,169 @@
+"""
+请求容错组件
+提供退避间隔、熔断器和重试策略，服务端不稳定时快速失败并在恢复后自动放行
+"""
+import time
+import random
+import threading
+from typing import Optional
+
+
+class PollBackoff:
+    """带抖动的指数退避间隔
+
+    首次间隔很短，使短任务能尽快返回；之后逐步放大到上限，
+    抖动使大量并发任务的轮询时间相互错开
+    """
+
+    def __init__(self, initial: float = 0.2, max_interval: float = 5.0,
+                 factor: float = 1.6, jitter: float = 0.2):
+        """初始化退避间隔
+
+        Args:
+            initial: 首次间隔(秒)
+            max_interval: 最大间隔(秒)
+            factor: 每次放大的倍数
+            jitter: 抖动比例，实际间隔在 ±jitter 范围内随机
+        """
+        self.initial = initial
+        self.max_interval = max_interval
+        self.factor = factor
+        self.jitter = jitter
+        self._interval = initial
+
+    def next(self) -> float:
+        """获取下一次等待间隔并放大间隔"""
+        interval = self._interval
+        self._interval = min(self._interval * self.factor, self.max_interval)
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def reset(self):
+        """状态发生变化时恢复到首次间隔"""
+        self._interval = self.initial
+
+
+class CircuitBreaker:
+    """熔断器
+
+    连续失败达到阈值后进入打开状态，在reset_timeout内直接拒绝请求；
+    超时后进入半开状态，只放行一个探测请求，成功则关闭，失败则重新打开
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        """初始化熔断器
+
+        Args:
+            failure_threshold: 触发熔断的连续失败次数
+            reset_timeout: 熔断持续时间(秒)
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_thread = None       # 发送探测请求的线程，为None时没有进行中的探测
+        self.last_success = 0.0
+        self.last_failure = 0.0
+
+    @property
+    def state(self) -> str:
+        """当前状态"""
+        with self._lock:
+            if self._state == self.OPEN and time.time() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def remaining(self) -> float:
+        """距离允许探测还剩的时间(秒)，未熔断时为0"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0.0
+            return max(0.0, self._opened_at + self.reset_timeout - time.time())
+
+    def allow_request(self) -> bool:
+        """当前是否允许发送请求"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.time() - self._opened_at < self.reset_timeout:
+                return False
+            # 半开状态只放行一个探测请求
+            if self._probe_thread is not None:
+                return False
+            self._state = self.HALF_OPEN
+            self._probe_thread = threading.get_ident()
+            return True
+
+    def record_success(self):
+        """记录一次成功请求"""
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_thread = None
+            self.last_success = time.time()
+
+    def record_failure(self):
+        """记录一次失败请求"""
+        with self._lock:
+            self.last_failure = time.time()
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.time()
+            self._probe_thread = None
+
+    def release_probe(self):
+        """本线程的探测请求既未记录成功也未记录失败（如抛出了非网络异常）时放回探测名额"""
+        with self._lock:
+            if self._probe_thread == threading.get_ident():
+                self._probe_thread = None
+
+
+class RetryPolicy:
+    """重试策略
+
+    只对幂等请求重试；网络错误和表示服务暂时不可用的状态码会触发重试，
+    重试间隔按带抖动的指数退避增长，服务端返回Retry-After时优先使用
+    """
+
+    # 可重试的HTTP状态码
+    RETRY_STATUSES = (429, 502, 503, 504)
+
+    def __init__(self, max_attempts: int = 3, initial_delay: float = 0.5, max_delay: float = 8.0):
+        """初始化重试策略
+
+        Args:
+            max_attempts: 最大尝试次数（含首次）
+            initial_delay: 首次重试前的等待时间(秒)
+            max_delay: 重试等待时间上限(秒)
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+
+    def backoff(self) -> PollBackoff:
+        """为一次请求创建退避间隔序列"""
+        return PollBackoff(initial=self.initial_delay, max_interval=self.max_delay, factor=2.0)
+
+    @staticmethod
+    def retry_after(value: Optional[str], default: float, limit: float) -> float:
+        """解析Retry-After响应头（秒数形式）
+
+        Args:
+            value: 响应头的值
+            default: 无法解析时使用的等待时间
+            limit: 等待时间上限
+
+        Returns:
+            等待时间(秒)
+        """
+        try:
+            return min(max(0.0, float(value)), limit)
+        except (TypeError, ValueError):
+            return default
@@ -0,0 +1,278 @@
+"""
+推理结果本地缓存
+以文件内容哈希 + 模型名称 + 参数为键缓存任务结果和结果文件，
+按最近使用时间和总大小淘汰；文件哈希按路径、大小和修改时间记忆，未变化的文件不会重复计算。
+索引在内存中维护，写入缓存项时立即保存，哈希记忆和最近使用时间的变化按间隔批量保存
+"""
+import os
+import json
+import time
+import atexit
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional, List
+
+
+class ResultCache:
+    """推理结果缓存
+
+    目录结构:
+        index.json          文件哈希记忆和缓存项的大小、最近使用时间
+        results/<键>.json   任务结果
+        files/<键>/<文件名>  任务结果文件（如下载的结果栅格）
+
+    使用示例:
+        cache = ResultCache(cache_dir, max_bytes=2 * 1024 ** 3)
+        key = cache.task_key("segmentation", [cache.file_digest(path)], "default", params)
+        result = cache.get_result(key)
+    """
+
+    # 计算文件哈希时每次读取的字节数
+    HASH_CHUNK_SIZE = 4 * 1024 * 1024
+    # 只有哈希记忆和最近使用时间变化时，两次保存索引的最小间隔(秒)
+    FLUSH_INTERVAL = 5.0
+    # 哈希记忆的最大条数，超出时丢弃最久未使用的记录
+    MAX_DIGESTS = 10000
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 ** 3):
+        """初始化结果缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节）
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.logger = logging.getLogger("ResultCache")
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.join(cache_dir, "results"), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, "files"), exist_ok=True)
+
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._index = {"digests": {}, "entries": {}}
+        self._dirty = False
+        self._saved_at = time.time()
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            self._index["digests"].update(index.get("digests", {}))
+            self._index["entries"].update(index.get("entries", {}))
+        except (IOError, ValueError):
+            pass
+
+        # 退出时保存尚未写入的最近使用时间和哈希记忆
+        atexit.register(self.flush)
+
+    def _save_index(self):
+        """原子写入索引文件（调用方持有锁）"""
+        self._prune_digests()
+        temp_path = self._index_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(temp_path, self._index_path)
+        self._dirty = False
+        self._saved_at = time.time()
+
+    def _mark_dirty(self):
+        """标记索引已变化，距上次保存超过FLUSH_INTERVAL时才写入（调用方持有锁）"""
+        self._dirty = True
+        if time.time() - self._saved_at >= self.FLUSH_INTERVAL:
+            self._save_index()
+
+    def flush(self):
+        """保存尚未写入的索引变化"""
+        with self._lock:
+            if self._dirty:
+                self._save_index()
+
+    def _prune_digests(self):
+        """哈希记忆超过MAX_DIGESTS时丢弃最久未使用的记录（调用方持有锁）"""
+        digests = self._index["digests"]
+        for path in list(digests)[:max(0, len(digests) - self.MAX_DIGESTS)]:
+            del digests[path]
+
+    def file_digest(self, file_path: str) -> str:
+        """计算文件内容的SHA-256哈希
+
+        路径、大小和修改时间都未变化时直接返回记忆的哈希值
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            十六进制哈希字符串
+        """
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime]
+
+        with self._lock:
+            known = self._index["digests"].get(path)
+            if known and known[:2] == signature:
+                # 移到末尾，按使用顺序淘汰
+                self._index["digests"][path] = self._index["digests"].pop(path)
+                return known[2]
+
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b""):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+
+        with self._lock:
+            self._index["digests"].pop(path, None)
+            self._index["digests"][path] = signature + [digest]
+            self._mark_dirty()
+        return digest
+
+    @staticmethod
+    def task_key(task_type: str, digests: List[str], model_name: str,
+                 options: Optional[Dict[str, Any]] = None) -> str:
+        """生成任务缓存键
+
+        Args:
+            task_type: 任务类型
+            digests: 输入文件哈希列表（按参数顺序）
+            model_name: 模型名称
+            options: 影响结果的其他参数
+
+        Returns:
+            缓存键
+        """
+        payload = json.dumps({
+            "task_type": task_type,
+            "inputs": list(digests),
+            "model_name": model_name,
+            "options": options or {}
+        }, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _result_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, "results", f"{key}.json")
+
+    def _files_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, "files", key)
+
+    def _touch(self, key: str, added_bytes: int = 0):
+        """更新缓存项的最近使用时间和大小"""
+        entry = self._index["entries"].setdefault(key, {"size": 0, "last_used": 0})
+        entry["size"] += added_bytes
+        entry["last_used"] = time.time()
+
+    def get_result(self, key: str) -> Optional[Dict[str, Any]]:
+        """获取缓存的任务结果
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            任务结果，未命中时返回None
+        """
+        with self._lock:
+            if key not in self._index["entries"]:
+                return None
+            try:
+                with open(self._result_path(key), "r", encoding="utf-8") as f:
+                    result = json.load(f)
+            except (IOError, ValueError):
+                self._remove(key)
+                self._save_index()
+                return None
+            self._touch(key)
+            self._mark_dirty()
+            return result
+
+    def put_result(self, key: str, result: Dict[str, Any]):
+        """缓存任务结果
+
+        Args:
+            key: 缓存键
+            result: 任务结果
+        """
+        with self._lock:
+            data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+            previous = self._result_size(key)
+            with open(self._result_path(key), "wb") as f:
+                f.write(data)
+            self._touch(key, len(data) - previous)
+            self._evict(keep=key)
+            self._save_index()
+
+    def _result_size(self, key: str) -> int:
+        path = self._result_path(key)
+        return os.path.getsize(path) if os.path.exists(path) else 0
+
+    def get_file(self, key: str, name: str) -> Optional[str]:
+        """获取缓存的结果文件路径
+
+        Args:
+            key: 缓存键
+            name: 文件名
+
+        Returns:
+            缓存中的文件路径，未命中时返回None
+        """
+        path = os.path.join(self._files_dir(key), name)
+        with self._lock:
+            if key not in self._index["entries"] or not os.path.exists(path):
+                return None
+            self._touch(key)
+            self._mark_dirty()
+        return path
+
+    def put_file(self, key: str, name: str, source_path: str) -> str:
+        """将结果文件复制到缓存
+
+        Args:
+            key: 缓存键
+            name: 文件名
+            source_path: 源文件路径
+
+        Returns:
+            缓存中的文件路径
+        """
+        with self._lock:
+            os.makedirs(self._files_dir(key), exist_ok=True)
+            target = os.path.join(self._files_dir(key), name)
+            previous = os.path.getsize(target) if os.path.exists(target) else 0
+            shutil.copyfile(source_path, target)
+            self._touch(key, os.path.getsize(target) - previous)
+            self._evict(keep=key)
+            self._save_index()
+        return target
+
+    def _remove(self, key: str):
+        """删除一个缓存项（调用方持有锁）"""
+        self._index["entries"].pop(key, None)
+        try:
+            os.remove(self._result_path(key))
+        except OSError:
+            pass
+        shutil.rmtree(self._files_dir(key), ignore_errors=True)
+
+    def _evict(self, keep: Optional[str] = None):
+        """超出容量时按最近使用时间淘汰缓存项，并限制哈希记忆的条数（调用方持有锁）"""
+        self._prune_digests()
+        entries = self._index["entries"]
+        total = sum(entry["size"] for entry in entries.values())
+        if total <= self.max_bytes:
+            return
+
+        for key in sorted(entries, key=lambda k: entries[k]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entries[key]["size"]
+            self.logger.info(f"淘汰缓存项: {key}")
+            self._remove(key)
+
+    def clear(self):
+        """清空缓存（保留文件哈希记忆）"""
+        with self._lock:
+            for key in list(self._index["entries"]):
+                self._remove(key)
+            self._save_index()
@@ -11,6 +11,7 @@ from PySide6.QtCore import QObject, Signal, Qt
 
 from .client import ApiClient, ApiError
 from .config import ApiConfig
+from .result_cache import ResultCache
 
 
 # 创建一个自定义元类来解决ABC和QObject的元类冲突
@@ -28,14 +29,17 @@ class TaskHandler(QObject, metaclass=TaskHandlerMeta):
     task_completed = Signal(str, dict)  # 任务ID, 结果数据
     task_failed = Signal(str, str)  # 任务ID, 错误信息
     
-    def __init__(self, api_client: Optional[ApiClient] = None):
+    def __init__(self, api_client: Optional[ApiClient] = None,
+                 result_cache: Optional[ResultCache] = None):
         """初始化任务处理器
         
         Args:
             api_client: API客户端实例，如果为None则创建新实例
+            result_cache: 结果缓存，为None时不缓存结果
         """
         super().__init__()
         self.api_client = api_client or ApiClient()
+        self.result_cache = result_cache
         self.logger = logging.getLogger(self.__class__.__name__)
     
     @abstractmethod
@@ -59,19 +63,105 @@ class TaskHandler(QObject, metaclass=TaskHandlerMeta):
         """
         pass
     
+    @abstractmethod
+    def prepare_request(self, *args, **kwargs) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """准备任务请求，参数与submit_task相同
+        
+        Returns:
+            (API端点, {文件参数名称: 文件路径}, 表单数据)
+        """
+        pass
+    
+    def cache_key(self, *args, **kwargs) -> Optional[str]:
+        """计算任务的缓存键，参数与submit_task相同
+        
+        键由任务端点、输入文件内容哈希、模型名称和其余参数组成，
+        文件移动或重命名后仍能命中缓存
+        
+        Returns:
+            缓存键，未启用缓存时返回None
+        """
+        if self.result_cache is None:
+            return None
+        endpoint, files, data = self.prepare_request(*args, **kwargs)
+        digests = [self.result_cache.file_digest(path) for path in files.values()]
+        options = {key: value for key, value in data.items() if key != "model_name"}
+        return ResultCache.task_key(endpoint, digests, data.get("model_name"), options)
+    
+    def get_cached_result(self, *args, **kwargs) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """查找缓存的任务结果，参数与submit_task相同
+        
+        Returns:
+            (缓存键, 缓存结果)，未命中时缓存结果为None
+        """
+        key = self.cache_key(*args, **kwargs)
+        if key is None:
+            return None, None
+        return key, self.result_cache.get_result(key)
+    
+    def store_result(self, key: Optional[str], result: Dict[str, Any]):
+        """缓存任务结果
+        
+        Args:
+            key: cache_key返回的缓存键
+            result: 任务结果
+        """
+        if key is not None and self.result_cache is not None:
+            self.result_cache.put_result(key, result)
+    
+    def _upload(self, endpoint: str, files: Dict[str, str],
+                data: Dict[str, Any], progress_id: str) -> Dict[str, Any]:
+        """流式上传文件并提交任务，上传进度通过task_progress信号报告
+        
+        Args:
+            endpoint: API端点
+            files: {文件参数名称: 文件路径}
+            data: 附加表单数据
+            progress_id: 上传阶段进度信号使用的标识（尚无任务ID，使用影像路径）
+            
+        Returns:
+            API响应数据
+        """
+        last_percent = [-1]
+        
+        def on_progress(sent, total):
+            percent = int(sent * 100 / total) if total else 100
+            # 只在百分比变化时发出信号，避免大量跨线程信号
+            if percent != last_percent[0]:
+                last_percent[0] = percent
+                self.task_progress.emit(progress_id, percent)
+        
+        # 附带文件哈希，服务端已有的文件不再重复上传
+        digests = None
+        if self.result_cache is not None:
+            digests = {name: self.result_cache.file_digest(path) for name, path in files.items()}
+        
+        return self.api_client.upload_files(endpoint, files, additional_data=data,
+                                            progress_callback=on_progress, digests=digests)
+    
     def execute_task(self, *args, **kwargs) -> Dict[str, Any]:
         """执行任务并等待结果
         
         Returns:
             任务结果数据
         """
+        # 相同输入、模型和参数的任务直接返回缓存结果
+        key, result = self.get_cached_result(*args, **kwargs)
+        if result is not None:
+            self.logger.info("命中结果缓存，跳过上传和推理")
+            self.task_completed.emit(f"cached_{key[:16]}", result)
+            return result
+        
         # 提交任务
         task_id = self.submit_task(*args, **kwargs)
         self.task_started.emit(task_id)
         
         try:
             # 等待任务完成
-            result = self.api_client.wait_for_task(task_id)
+            result = self.api_client.wait_for_task(
+                task_id, progress_callback=lambda progress: self.task_progress.emit(task_id, progress)
+            )
+            self.store_result(key, result)
             self.task_completed.emit(task_id, result)
             return result
         except ApiError as e:
@@ -96,20 +186,9 @@ class SegmentationTask(TaskHandler):
         """
         self.logger.info(f"提交分割任务: {image_path}, 模型: {model_name}")
         
-        # 准备请求数据
-        data = {
-            "model_name": model_name
-        }
-        
-        if params:
-            data.update(params)
-        
         # 上传文件并提交任务
-        result = self.api_client.upload_file(
-            "/tasks/segmentation",
-            file_path=image_path,
-            additional_data=data
-        )
+        endpoint, files, data = self.prepare_request(image_path, model_name, params)
+        result = self._upload(endpoint, files, data, image_path)
         
         # 返回任务ID
         task_id = result.get("task_id")
@@ -128,6 +207,27 @@ class SegmentationTask(TaskHandler):
             分割结果数据，包含分割图像URL
         """
         return self.api_client.get(f"/tasks/segmentation/{task_id}")
+    
+    def prepare_request(self, image_path: str, model_name: str = "default", 
+                        params: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """准备分割任务的请求
+        
+        Args:
+            image_path: 影像路径
+            model_name: 模型名称
+            params: 其他参数
+            
+        Returns:
+            (API端点, {文件参数名称: 文件路径}, 表单数据)
+        """
+        data = {
+            "model_name": model_name
+        }
+        
+        if params:
+            data.update(params)
+        
+        return "/tasks/segmentation", {"file": image_path}, data
 
 
 class DetectionTask(TaskHandler):
@@ -149,21 +249,9 @@ class DetectionTask(TaskHandler):
         """
         self.logger.info(f"提交目标检测任务: {image_path}, 模型: {model_name}")
         
-        # 准备请求数据
-        data = {
-            "model_name": model_name,
-            "confidence": confidence
-        }
-        
-        if params:
-            data.update(params)
-        
         # 上传文件并提交任务
-        result = self.api_client.upload_file(
-            "/tasks/detection",
-            file_path=image_path,
-            additional_data=data
-        )
+        endpoint, files, data = self.prepare_request(image_path, model_name, confidence, params)
+        result = self._upload(endpoint, files, data, image_path)
         
         # 返回任务ID
         task_id = result.get("task_id")
@@ -182,6 +270,30 @@ class DetectionTask(TaskHandler):
             检测结果数据，包含检测框、类别和置信度
         """
         return self.api_client.get(f"/tasks/detection/{task_id}")
+    
+    def prepare_request(self, image_path: str, model_name: str = "default", 
+                        confidence: float = 0.5, 
+                        params: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """准备目标检测任务的请求
+        
+        Args:
+            image_path: 影像路径
+            model_name: 模型名称
+            confidence: 置信度阈值
+            params: 其他参数
+            
+        Returns:
+            (API端点, {文件参数名称: 文件路径}, 表单数据)
+        """
+        data = {
+            "model_name": model_name,
+            "confidence": confidence
+        }
+        
+        if params:
+            data.update(params)
+        
+        return "/tasks/detection", {"file": image_path}, data
 
 
 class ClassificationTask(TaskHandler):
@@ -201,20 +313,9 @@ class ClassificationTask(TaskHandler):
         """
         self.logger.info(f"提交场景分类任务: {image_path}, 模型: {model_name}")
         
-        # 准备请求数据
-        data = {
-            "model_name": model_name
-        }
-        
-        if params:
-            data.update(params)
-        
         # 上传文件并提交任务
-        result = self.api_client.upload_file(
-            "/tasks/classification",
-            file_path=image_path,
-            additional_data=data
-        )
+        endpoint, files, data = self.prepare_request(image_path, model_name, params)
+        result = self._upload(endpoint, files, data, image_path)
         
         # 返回任务ID
         task_id = result.get("task_id")
@@ -233,6 +334,27 @@ class ClassificationTask(TaskHandler):
             分类结果数据，包含类别和置信度
         """
         return self.api_client.get(f"/tasks/classification/{task_id}")
+    
+    def prepare_request(self, image_path: str, model_name: str = "default", 
+                        params: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """准备场景分类任务的请求
+        
+        Args:
+            image_path: 影像路径
+            model_name: 模型名称
+            params: 其他参数
+            
+        Returns:
+            (API端点, {文件参数名称: 文件路径}, 表单数据)
+        """
+        data = {
+            "model_name": model_name
+        }
+        
+        if params:
+            data.update(params)
+        
+        return "/tasks/classification", {"file": image_path}, data
 
 
 class ChangeDetectionTask(TaskHandler):
@@ -254,30 +376,9 @@ class ChangeDetectionTask(TaskHandler):
         """
         self.logger.info(f"提交变化检测任务: {before_image_path} -> {after_image_path}, 模型: {model_name}")
         
-        # 准备请求数据
-        data = {
-            "model_name": model_name
-        }
-        
-        if params:
-            data.update(params)
-        
-        # 上传文件并提交任务
-        files = {
-            "before_image": (os.path.basename(before_image_path), open(before_image_path, "rb"), "application/octet-stream"),
-            "after_image": (os.path.basename(after_image_path), open(after_image_path, "rb"), "application/octet-stream")
-        }
-        
-        try:
-            result = self.api_client.post(
-                "/tasks/change_detection",
-                data=data,
-                files=files
-            )
-        finally:
-            # 确保文件被关闭
-            for file_obj in files.values():
-                file_obj[1].close()
+        # 上传文件并提交任务（两期影像在同一个请求体中流式发送）
+        endpoint, files, data = self.prepare_request(before_image_path, after_image_path, model_name, params)
+        result = self._upload(endpoint, files, data, before_image_path)
         
         # 返回任务ID
         task_id = result.get("task_id")
@@ -295,4 +396,31 @@ class ChangeDetectionTask(TaskHandler):
         Returns:
             变化检测结果数据，包含变化区域图像URL
         """
-        return self.api_client.get(f"/tasks/change_detection/{task_id}") 
\ No newline at end of file
+        return self.api_client.get(f"/tasks/change_detection/{task_id}")
+    
+    def prepare_request(self, before_image_path: str, after_image_path: str, 
+                        model_name: str = "default", 
+                        params: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """准备变化检测任务的请求
+        
+        Args:
+            before_image_path: 变化前影像路径
+            after_image_path: 变化后影像路径
+            model_name: 模型名称
+            params: 其他参数
+            
+        Returns:
+            (API端点, {文件参数名称: 文件路径}, 表单数据)
+        """
+        data = {
+            "model_name": model_name
+        }
+        
+        if params:
+            data.update(params)
+        
+        files = {
+            "before_image": before_image_path,
+            "after_image": after_image_path
+        }
+        return "/tasks/change_detection", files, data 
\ No newline at end of file
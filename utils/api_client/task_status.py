@@ -0,0 +1,183 @@
+"""
+任务状态查询
+提供带抖动的指数退避轮询、批量状态查询和SSE推送等待，
+服务端不支持批量接口或推送时自动退回到逐个轮询
+"""
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Callable
+
+from requests.exceptions import RequestException
+
+from .client import ApiError
+from .resilience import PollBackoff
+
+
+# 任务的终止状态
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class TaskStatusMonitor:
+    """任务状态查询器
+
+    协议:
+        POST /tasks/status  {"task_ids": [...]} -> {"tasks": {任务ID: 任务信息}}
+        GET  /tasks/{id}/events  SSE流，每条 data 为任务信息JSON
+    两个接口都是可选的，返回404/405/406/501时此后不再使用
+
+    使用示例:
+        monitor = TaskStatusMonitor(api_client)
+        statuses = monitor.get_statuses(task_ids)
+        info = monitor.wait(task_id, max_interval=2)
+    """
+
+    # 逐个查询时的并发数
+    FALLBACK_WORKERS = 8
+
+    def __init__(self, api_client):
+        """初始化任务状态查询器
+
+        Args:
+            api_client: ApiClient实例
+        """
+        self.api_client = api_client
+        self.logger = logging.getLogger("TaskStatusMonitor")
+
+        # 服务端是否支持批量查询和推送（None表示尚未探测）
+        self._bulk_supported = None
+        self._push_supported = None
+
+    def get_status(self, task_id: str) -> Dict[str, Any]:
+        """查询单个任务的状态（只读请求，允许对冲）"""
+        return self.api_client.get(f"/tasks/{task_id}", hedge=True)
+
+    def get_statuses(self, task_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """查询多个任务的状态，服务端支持时只发送一个请求
+
+        Args:
+            task_ids: 任务ID列表
+
+        Returns:
+            {任务ID: 任务信息}，查询失败的任务不包含在结果中
+        """
+        task_ids = list(task_ids)
+        if not task_ids:
+            return {}
+
+        if self._bulk_supported is not False:
+            try:
+                response = self.api_client.post("/tasks/status", data={"task_ids": task_ids},
+                                                idempotent=True)
+                tasks = response.get("tasks", {})
+                if isinstance(tasks, list):
+                    tasks = {task.get("task_id"): task for task in tasks}
+                self._bulk_supported = True
+                return tasks
+            except ApiError as e:
+                if e.status_code not in (404, 405, 501):
+                    raise
+                self.logger.info("服务端不支持批量状态查询，改为逐个查询")
+                self._bulk_supported = False
+
+        statuses = {}
+
+        def query(task_id):
+            try:
+                statuses[task_id] = self.get_status(task_id)
+            except ApiError as e:
+                self.logger.warning(f"查询任务状态失败: {task_id}, {str(e)}")
+
+        with ThreadPoolExecutor(max_workers=min(self.FALLBACK_WORKERS, len(task_ids))) as executor:
+            list(executor.map(query, task_ids))
+        return statuses
+
+    def _wait_push(self, task_id: str, deadline: float,
+                   progress_callback: Optional[Callable[[int], None]] = None) -> Optional[Dict[str, Any]]:
+        """通过SSE推送等待任务结束
+
+        Returns:
+            终止状态的任务信息；服务端不支持推送或连接中断时返回None，由调用方改为轮询
+        """
+        client = self.api_client
+        try:
+            response = client.session.get(
+                client._make_url(f"/tasks/{task_id}/events"),
+                headers={"Accept": "text/event-stream"},
+                stream=True,
+                timeout=(client.config.connect_timeout, client.config.timeout)
+            )
+        except RequestException:
+            return None
+
+        with response:
+            content_type = response.headers.get("Content-Type", "")
+            if response.status_code in (404, 405, 406, 501) or "text/event-stream" not in content_type:
+                self.logger.info("服务端不支持任务状态推送，使用轮询")
+                self._push_supported = False
+                return None
+            self._push_supported = True
+
+            try:
+                for line in response.iter_lines(decode_unicode=True):
+                    if time.time() > deadline:
+                        return None
+                    if not line or not line.startswith("data:"):
+                        continue
+                    try:
+                        info = json.loads(line[5:].strip())
+                    except ValueError:
+                        continue
+
+                    if progress_callback and isinstance(info.get("progress"), (int, float)):
+                        progress_callback(int(info["progress"]))
+                    if info.get("status") in TERMINAL_STATUSES:
+                        return info
+            except RequestException:
+                # 连接中断或读超时，改为轮询
+                pass
+        return None
+
+    def wait(self, task_id: str, max_interval: float = 2, max_wait_time: float = 3600,
+             progress_callback: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+        """等待任务结束
+
+        服务端支持时通过SSE推送等待，否则以指数退避间隔轮询
+
+        Args:
+            task_id: 任务ID
+            max_interval: 轮询间隔上限(秒)
+            max_wait_time: 最大等待时间(秒)
+            progress_callback: 进度回调函数，参数为进度百分比
+
+        Returns:
+            终止状态的任务信息
+        """
+        start_time = time.time()
+        deadline = start_time + max_wait_time
+
+        info = None
+        if self._push_supported is not False:
+            info = self._wait_push(task_id, deadline, progress_callback)
+
+        backoff = PollBackoff(max_interval=max_interval)
+        last_progress = None
+        while info is None or info.get("status") not in TERMINAL_STATUSES:
+            elapsed_time = time.time() - start_time
+            if elapsed_time > max_wait_time:
+                raise ApiError(f"等待任务超时: {task_id}", details={"elapsed_time": elapsed_time})
+
+            info = self.get_status(task_id)
+            if info.get("status") in TERMINAL_STATUSES:
+                break
+
+            progress = info.get("progress")
+            if progress != last_progress:
+                last_progress = progress
+                if progress_callback and isinstance(progress, (int, float)):
+                    progress_callback(int(progress))
+
+            time.sleep(min(backoff.next(), max(0.0, deadline - time.time())))
+
+        return info
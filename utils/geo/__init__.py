@@ -5,11 +5,41 @@
 
 from utils.geo.raster_loader import RasterLoader, RasterData, RASTERIO_AVAILABLE, GDAL_AVAILABLE
 from utils.geo.vector_utils import VectorUtils, VECTOR_LIBS_AVAILABLE
+from utils.geo.dataset_pool import DatasetPool, KIND_GDAL, KIND_RASTERIO
+from utils.geo.config import GeoConfig
+from utils.geo.raster_cache import RasterCache
+from utils.geo.tile_export import TileExporter
+from utils.geo.process_export import ProcessTileExporter
+from utils.geo.tile_format import TileFormat, FORMAT_GTIFF, FORMAT_COG, COMPRESSIONS
+from utils.geo.grid_planner import GridPlanner, PLAN_COUNT, PLAN_SIZE
+from utils.geo.virtual_export import VirtualTileExporter, VIRTUAL_VRT, VIRTUAL_INDEX
+from utils.geo.stretch import StretchEngine, STRETCH_MINMAX, STRETCH_CUMULATIVE, STRETCH_STDDEV
 
 __all__ = [
     'RasterLoader', 
     'RasterData', 
     'VectorUtils',
+    'DatasetPool',
+    'KIND_GDAL',
+    'KIND_RASTERIO',
+    'GeoConfig',
+    'RasterCache',
+    'TileExporter',
+    'ProcessTileExporter',
+    'TileFormat',
+    'FORMAT_GTIFF',
+    'FORMAT_COG',
+    'COMPRESSIONS',
+    'GridPlanner',
+    'PLAN_COUNT',
+    'PLAN_SIZE',
+    'VirtualTileExporter',
+    'VIRTUAL_VRT',
+    'VIRTUAL_INDEX',
+    'StretchEngine',
+    'STRETCH_MINMAX',
+    'STRETCH_CUMULATIVE',
+    'STRETCH_STDDEV',
     'RASTERIO_AVAILABLE',
     'GDAL_AVAILABLE',
     'VECTOR_LIBS_AVAILABLE'
@@ -0,0 +1,60 @@
+"""
+栅格处理配置模块，管理数据集句柄池、GDAL块缓存和原始栅格磁盘缓存等参数
+"""
+import os
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+from utils.geo.dataset_pool import DatasetPool
+from utils.geo.raster_cache import RasterCache
+from utils.geo.raster_loader import RasterLoader
+
+
+@dataclass
+class GeoConfig:
+    """栅格处理配置类"""
+    gdal_cache_mb: int = 512         # GDAL块缓存大小(MB)，0表示使用GDAL默认值
+    max_idle_handles: int = 16       # 句柄池中保留的空闲数据集句柄数
+    # 原始栅格磁盘缓存参数
+    raw_cache_enabled: bool = False              # 渔网分割前将整景波段解码到磁盘缓存，网格直接在内存映射上切片
+    raw_cache_dir: str = ""                      # 为空时使用用户目录下的 .rsiis/raster_cache
+    raw_cache_max_bytes: int = 8 * 1024 ** 3     # 缓存总大小上限(字节)
+
+    @classmethod
+    def from_file(cls, config_path: str) -> 'GeoConfig':
+        """从配置文件加载栅格处理配置"""
+        config_path = Path(config_path)
+        if not config_path.exists():
+            raise FileNotFoundError(f"栅格处理配置文件不存在: {config_path}")
+
+        with open(config_path, 'r', encoding='utf-8') as f:
+            config_data = json.load(f)
+
+        return cls(
+            gdal_cache_mb=config_data.get('gdal_cache_mb', 512),
+            max_idle_handles=config_data.get('max_idle_handles', 16),
+            raw_cache_enabled=config_data.get('raw_cache_enabled', False),
+            raw_cache_dir=config_data.get('raw_cache_dir', ''),
+            raw_cache_max_bytes=config_data.get('raw_cache_max_bytes', 8 * 1024 ** 3)
+        )
+
+    @classmethod
+    def default(cls) -> 'GeoConfig':
+        """获取默认配置"""
+        return cls()
+
+    @classmethod
+    def load_default(cls) -> 'GeoConfig':
+        """加载 utils/geo/geo_config.json，文件不存在时使用默认配置"""
+        default_config = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geo_config.json")
+        if os.path.exists(default_config):
+            return cls.from_file(default_config)
+        return cls.default()
+
+    def apply(self):
+        """将配置应用到句柄池、GDAL块缓存和原始栅格缓存，应在程序启动、打开任何影像之前调用"""
+        DatasetPool.configure(max_idle_handles=self.max_idle_handles,
+                              cache_max_mb=self.gdal_cache_mb or None)
+        RasterCache.configure(cache_dir=self.raw_cache_dir, max_bytes=self.raw_cache_max_bytes)
+        RasterLoader.USE_RAW_CACHE = self.raw_cache_enabled
@@ -0,0 +1,241 @@
+"""
+数据集句柄池
+进程内按 路径+修改时间+大小 复用已打开的GDAL/rasterio数据集，重复的窗口读取不再重新解析文件头，
+已解码的块保留在GDAL块缓存中；句柄在归还前由获取方独占，空闲句柄按LRU关闭
+"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# raster_loader通过句柄池打开数据集，这里单独检查库的可用性以避免循环导入
+try:
+    import rasterio
+    RASTERIO_AVAILABLE = True
+except ImportError:
+    RASTERIO_AVAILABLE = False
+
+try:
+    from osgeo import gdal
+    GDAL_AVAILABLE = True
+except ImportError:
+    GDAL_AVAILABLE = False
+
+# 数据集类型
+KIND_GDAL = "gdal"
+KIND_RASTERIO = "rasterio"
+
+
+class DatasetPool:
+    """
+    数据集句柄池
+
+    acquire只返回空闲句柄或新打开的句柄，句柄在release之前由获取方独占，
+    因此GDAL句柄不会被两个线程同时使用；保存在共享对象上的句柄（如RasterData）也不会再被分配给其他调用方。
+    文件被修改后（修改时间或大小变化）旧句柄不再复用，空闲时关闭
+
+    使用示例:
+        with DatasetPool.open(path, KIND_GDAL) as dataset:
+            data = dataset.ReadAsArray(x, y, width, height)
+
+        dataset = DatasetPool.acquire(path, KIND_RASTERIO)   # 长期持有
+        ...
+        DatasetPool.release(dataset)
+    """
+
+    # 空闲句柄数上限，超出时关闭最久未使用的空闲句柄
+    MAX_IDLE_HANDLES = 16
+
+    # (类型, 路径, 修改时间, 大小) -> [句柄记录, ...]，句柄记录按最近使用排序保存在_lru中
+    _handles = {}
+    _lru = OrderedDict()       # id(数据集) -> 句柄记录
+    _lock = threading.Lock()
+
+    @staticmethod
+    def configure(max_idle_handles=None, cache_max_mb=None):
+        """
+        配置句柄池和GDAL块缓存
+
+        Args:
+            max_idle_handles: 空闲句柄数上限
+            cache_max_mb: GDAL块缓存大小(MB)，同时写入GDAL_CACHEMAX环境变量，
+                          使rasterio和之后启动的工作进程使用相同的设置
+        """
+        if max_idle_handles is not None:
+            with DatasetPool._lock:
+                DatasetPool.MAX_IDLE_HANDLES = max(0, int(max_idle_handles))
+                closing = DatasetPool._evict_locked()
+            DatasetPool._close_all(closing)
+
+        if cache_max_mb is not None:
+            os.environ["GDAL_CACHEMAX"] = str(int(cache_max_mb))
+            if GDAL_AVAILABLE:
+                gdal.SetCacheMax(int(cache_max_mb) * 1024 * 1024)
+
+    @staticmethod
+    def default_kind():
+        """GDAL可用时默认使用GDAL句柄"""
+        return KIND_GDAL if GDAL_AVAILABLE else KIND_RASTERIO
+
+    @staticmethod
+    def _stamp(path):
+        """文件标识：规范化路径、修改时间和大小"""
+        path = os.path.normcase(os.path.abspath(path))
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _open(kind, path):
+        if kind == KIND_GDAL:
+            if not GDAL_AVAILABLE:
+                raise RuntimeError("缺少GDAL库")
+            dataset = gdal.Open(path, gdal.GA_ReadOnly)
+            if dataset is None:
+                raise IOError(f"无法打开输入文件: {path}")
+            return dataset
+        if kind == KIND_RASTERIO:
+            if not RASTERIO_AVAILABLE:
+                raise RuntimeError("缺少rasterio库")
+            return rasterio.open(path)
+        raise ValueError(f"未知的数据集类型: {kind}")
+
+    @staticmethod
+    def _close(entry):
+        """关闭句柄：rasterio显式关闭，GDAL释放最后一个引用"""
+        dataset = entry.pop("dataset", None)
+        if entry["kind"] == KIND_RASTERIO and dataset is not None:
+            try:
+                dataset.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _close_all(entries):
+        for entry in entries:
+            DatasetPool._close(entry)
+
+    @staticmethod
+    def _evict_locked(key_prefix=None):
+        """
+        挑出需要关闭的空闲句柄（调用方持有锁）：已被修改的文件的旧句柄，以及超出上限的最久未使用的句柄
+
+        Returns:
+            list: 从池中移除的句柄记录，由调用方在锁外关闭
+        """
+        closing = []
+
+        def remove(entry):
+            DatasetPool._lru.pop(id(entry["dataset"]), None)
+            entries = DatasetPool._handles.get(entry["key"], [])
+            if entry in entries:
+                entries.remove(entry)
+            if not entries:
+                DatasetPool._handles.pop(entry["key"], None)
+            closing.append(entry)
+
+        if key_prefix is not None:
+            for key in [k for k in DatasetPool._handles if k[:2] == key_prefix[:2] and k != key_prefix]:
+                for entry in list(DatasetPool._handles[key]):
+                    if not entry["in_use"]:
+                        remove(entry)
+
+        idle = [entry for entry in DatasetPool._lru.values() if not entry["in_use"]]
+        for entry in idle[:max(0, len(idle) - DatasetPool.MAX_IDLE_HANDLES)]:
+            remove(entry)
+        return closing
+
+    @staticmethod
+    def acquire(path, kind=None):
+        """
+        获取独占的数据集句柄；用完后必须调用release
+
+        Args:
+            path: 栅格文件路径
+            kind: KIND_GDAL或KIND_RASTERIO，None表示按可用的库选择
+
+        Returns:
+            GDAL或rasterio数据集
+        """
+        kind = kind or DatasetPool.default_kind()
+        normalized, mtime, size = DatasetPool._stamp(path)
+        key = (kind, normalized, mtime, size)
+
+        with DatasetPool._lock:
+            entries = DatasetPool._handles.get(key, [])
+            entry = next((e for e in entries if not e["in_use"]), None)
+            if entry is not None:
+                entry["in_use"] = True
+                DatasetPool._lru.move_to_end(id(entry["dataset"]))
+                return entry["dataset"]
+
+        # 打开文件不持有锁，其他线程可以同时获取别的句柄
+        dataset = DatasetPool._open(kind, path)
+        entry = {"key": key, "kind": kind, "dataset": dataset, "in_use": True}
+        with DatasetPool._lock:
+            DatasetPool._handles.setdefault(key, []).append(entry)
+            DatasetPool._lru[id(dataset)] = entry
+            closing = DatasetPool._evict_locked(key)
+        DatasetPool._close_all(closing)
+        return dataset
+
+    @staticmethod
+    def release(dataset):
+        """
+        归还数据集句柄，归还后可分配给其他调用方；不属于句柄池的数据集会被直接关闭
+
+        Args:
+            dataset: acquire返回的数据集
+        """
+        if dataset is None:
+            return
+        with DatasetPool._lock:
+            entry = DatasetPool._lru.get(id(dataset))
+            if entry is not None:
+                entry["in_use"] = False
+                closing = DatasetPool._evict_locked()
+        if entry is None:
+            if hasattr(dataset, "close"):
+                dataset.close()
+            return
+        DatasetPool._close_all(closing)
+
+    @staticmethod
+    @contextmanager
+    def open(path, kind=None):
+        """在with语句中获取并自动归还数据集句柄"""
+        dataset = DatasetPool.acquire(path, kind)
+        try:
+            yield dataset
+        finally:
+            DatasetPool.release(dataset)
+
+    @staticmethod
+    def invalidate(path=None):
+        """
+        关闭空闲句柄
+
+        Args:
+            path: 只关闭该文件的句柄，None表示关闭所有空闲句柄（程序退出或清空缓存时）
+        """
+        normalized = os.path.normcase(os.path.abspath(path)) if path else None
+        with DatasetPool._lock:
+            closing = []
+            for key in list(DatasetPool._handles):
+                if normalized and key[1] != normalized:
+                    continue
+                for entry in list(DatasetPool._handles[key]):
+                    if not entry["in_use"]:
+                        DatasetPool._handles[key].remove(entry)
+                        DatasetPool._lru.pop(id(entry["dataset"]), None)
+                        closing.append(entry)
+                if not DatasetPool._handles[key]:
+                    DatasetPool._handles.pop(key)
+        DatasetPool._close_all(closing)
+
+    @staticmethod
+    def stats():
+        """句柄池状态：句柄总数、使用中的句柄数和空闲句柄数"""
+        with DatasetPool._lock:
+            total = len(DatasetPool._lru)
+            in_use = sum(1 for entry in DatasetPool._lru.values() if entry["in_use"])
+        return {"handles": total, "in_use": in_use, "idle": total - in_use}
@@ -0,0 +1,212 @@
+"""
+网格规划工具
+按数量或按固定尺寸（可重叠）规划网格，可将网格边界对齐到GeoTIFF的内部块/条带边界，
+并估算按规划读取时需要解码的块数和读放大倍数
+"""
+import numpy as np
+
+# 规划方式
+PLAN_COUNT = "count"   # 按行列数量均分
+PLAN_SIZE = "size"     # 按固定尺寸和步长
+
+
+class GridPlanner:
+    """
+    网格规划器 - 只计算网格窗口，不读取像素数据
+
+    块尺寸使用 (块宽, 块高) 表示：分块存储的GeoTIFF通常为256×256或512×512，
+    条带存储的GeoTIFF为 (影像宽度, 每条带行数)
+
+    使用示例:
+        block = GridPlanner.block_shape(raster_data.rasterio_dataset or raster_data.gdal_dataset)
+        cells = GridPlanner.size_grid(width, height, 512, overlap=64, block=block)
+        cost = GridPlanner.estimate_cost(cells, width, height, block, bytes_per_pixel=3)
+    """
+
+    # 对齐块边界后步长不得小于原步长的比例
+    MIN_ALIGNED_STRIDE = 0.75
+    # 按数量规划时边界吸附的最大偏移（占网格尺寸的比例），超出时保持均分位置
+    MAX_SNAP_SHIFT = 0.1
+
+    @staticmethod
+    def block_shape(dataset):
+        """
+        获取数据集第一个波段的内部块尺寸
+
+        Args:
+            dataset: rasterio或GDAL数据集
+
+        Returns:
+            tuple: (块宽, 块高)，无法获取时返回None
+        """
+        if dataset is None:
+            return None
+        try:
+            if hasattr(dataset, 'block_shapes'):
+                block_h, block_w = dataset.block_shapes[0]
+                return int(block_w), int(block_h)
+            if hasattr(dataset, 'GetRasterBand'):
+                block_w, block_h = dataset.GetRasterBand(1).GetBlockSize()
+                return int(block_w), int(block_h)
+        except Exception:
+            pass
+        return None
+
+    @staticmethod
+    def _snap_edges(edges, block, max_shift=None):
+        """将内部边界吸附到最近的块边界，吸附后与相邻边界重合或偏移超过max_shift的保持原位置"""
+        length = edges[-1]
+        if not block or block <= 1 or block >= length:
+            return edges
+
+        snapped = [0]
+        for edge in edges[1:-1]:
+            candidate = int(round(edge / block)) * block
+            if not snapped[-1] < candidate < length:
+                candidate = edge
+            if max_shift is not None and abs(candidate - edge) > max_shift:
+                candidate = edge
+            if candidate <= snapped[-1]:
+                continue
+            snapped.append(candidate)
+        snapped.append(length)
+        return snapped
+
+    @staticmethod
+    def count_grid(width, height, rows, cols, block=None):
+        """
+        按行列数量规划网格
+
+        不对齐时每格为 width // cols × height // rows，余数归入最后一行/列；
+        对齐时内部边界吸附到最近的块边界，各格尺寸略有差异；吸附偏移超过网格尺寸的
+        MAX_SNAP_SHIFT 时该边界保持均分位置（块相对网格较大时不改变均分结果），
+        条带存储的影像只在行方向吸附到条带边界
+
+        Args:
+            width: 影像宽度
+            height: 影像高度
+            rows: 行数
+            cols: 列数
+            block: (块宽, 块高)，为None时不对齐
+
+        Returns:
+            list: 网格列表，每个元素包含 'position' (x, y, width, height)、'row' 和 'col'（从1开始）
+        """
+        std_width = width // cols
+        std_height = height // rows
+        x_edges = [col * std_width for col in range(cols)] + [width]
+        y_edges = [row * std_height for row in range(rows)] + [height]
+
+        if block:
+            x_edges = GridPlanner._snap_edges(x_edges, block[0], std_width * GridPlanner.MAX_SNAP_SHIFT)
+            y_edges = GridPlanner._snap_edges(y_edges, block[1], std_height * GridPlanner.MAX_SNAP_SHIFT)
+
+        cells = []
+        for row, (y0, y1) in enumerate(zip(y_edges[:-1], y_edges[1:])):
+            for col, (x0, x1) in enumerate(zip(x_edges[:-1], x_edges[1:])):
+                if x1 > x0 and y1 > y0:
+                    cells.append({'position': (x0, y0, x1 - x0, y1 - y0), 'row': row + 1, 'col': col + 1})
+        return cells
+
+    @staticmethod
+    def _offsets(length, tile, stride, block, snap_last):
+        """计算一个方向上的窗口起点"""
+        if block and 1 < block <= stride and block < length:
+            # 步长向下取整到块尺寸的整数倍，使窗口起点落在块边界上（重叠略有增加，不会产生缝隙）；
+            # 取整后步长缩短过多时网格数会明显增加，此时不对齐
+            aligned = stride // block * block
+            if aligned >= stride * GridPlanner.MIN_ALIGNED_STRIDE:
+                stride = aligned
+
+        offsets = [0]
+        while offsets[-1] + tile < length:
+            offsets.append(offsets[-1] + stride)
+
+        if snap_last and len(offsets) > 1:
+            # 最后一个窗口贴齐影像边缘，保持完整的窗口尺寸
+            offsets[-1] = max(0, length - tile)
+            if offsets[-1] <= offsets[-2]:
+                offsets.pop()
+        return offsets
+
+    @staticmethod
+    def size_grid(width, height, tile_width, tile_height=None, overlap=0, block=None, snap_last=False):
+        """
+        按固定尺寸和重叠规划网格
+
+        Args:
+            width: 影像宽度
+            height: 影像高度
+            tile_width: 网格宽度
+            tile_height: 网格高度，为None时与宽度相同
+            overlap: 相邻网格的重叠像素数
+            block: (块宽, 块高)，不为None时将步长向下调整为块尺寸的整数倍（重叠相应增加）
+            snap_last: 是否将最后一行/列网格贴齐影像边缘（保持完整尺寸）；
+                       否则最后一行/列网格在边缘处截断
+
+        Returns:
+            list: 网格列表，每个元素包含 'position' (x, y, width, height)、'row' 和 'col'（从1开始）
+        """
+        tile_height = tile_height or tile_width
+        if tile_width <= 0 or tile_height <= 0:
+            raise ValueError("网格尺寸必须大于0")
+        if overlap < 0 or overlap >= min(tile_width, tile_height):
+            raise ValueError("重叠像素数必须大于等于0且小于网格尺寸")
+
+        x_offsets = GridPlanner._offsets(width, tile_width, tile_width - overlap,
+                                         block[0] if block else None, snap_last)
+        y_offsets = GridPlanner._offsets(height, tile_height, tile_height - overlap,
+                                         block[1] if block else None, snap_last)
+
+        return [
+            {'position': (x, y, min(tile_width, width - x), min(tile_height, height - y)),
+             'row': row + 1, 'col': col + 1}
+            for row, y in enumerate(y_offsets)
+            for col, x in enumerate(x_offsets)
+        ]
+
+    @staticmethod
+    def estimate_cost(cells, width, height, block=None, bytes_per_pixel=1):
+        """
+        估算按规划逐格读取时的I/O开销
+
+        一个网格只要与某个块有交集，读取时就需要解码整个块；
+        被多个网格共享的块会被重复解码（未命中块缓存时）
+
+        Args:
+            cells: 网格列表（count_grid或size_grid的返回值）
+            width: 影像宽度
+            height: 影像高度
+            block: (块宽, 块高)，为None时按逐行条带估算
+            bytes_per_pixel: 每个像素的字节数（波段数 × 数据类型字节数）
+
+        Returns:
+            dict: 网格数、块尺寸、解码块次数、不重复块数、重复解码次数、
+                  读取字节数、请求字节数和读放大倍数（读取/请求）
+        """
+        block_w, block_h = block or (width, 1)
+        blocks_x = -(-width // block_w)
+        blocks_y = -(-height // block_h)
+        counts = np.zeros((blocks_y, blocks_x), dtype=np.int32)
+
+        requested = 0
+        for cell in cells:
+            x, y, w, h = cell['position']
+            counts[y // block_h:(y + h - 1) // block_h + 1, x // block_w:(x + w - 1) // block_w + 1] += 1
+            requested += w * h
+
+        blocks_read = int(counts.sum())
+        unique_blocks = int(np.count_nonzero(counts))
+        bytes_read = blocks_read * block_w * block_h * bytes_per_pixel
+        bytes_requested = requested * bytes_per_pixel
+
+        return {
+            'cells': len(cells),
+            'block_shape': (block_w, block_h),
+            'blocks_read': blocks_read,
+            'unique_blocks': unique_blocks,
+            'redundant_reads': blocks_read - unique_blocks,
+            'bytes_read': bytes_read,
+            'bytes_requested': bytes_requested,
+            'read_amplification': bytes_read / bytes_requested if bytes_requested else 0.0
+        }
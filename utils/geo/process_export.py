@@ -0,0 +1,156 @@
+"""
+多进程瓦片导出
+每个工作进程按路径打开一次源数据集，处理按内部块顺序划分的一段瓦片并直接写入磁盘，
+读取、解码、数组处理和编码都不受主进程GIL限制，可以用满所有CPU核
+"""
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from utils.geo.tile_export import TileExporter
+
+# 工作进程内的导出器，由进程初始化函数创建
+_worker_exporter = None
+
+
+def _init_worker(source_path, tile_format):
+    """工作进程初始化：创建只在本进程使用的导出器，数据集在第一次读取时打开"""
+    global _worker_exporter
+    _worker_exporter = TileExporter(source_path, max_workers=1, tile_format=tile_format)
+
+
+def _export_shard(shard):
+    """
+    在工作进程中导出一段瓦片
+
+    Args:
+        shard: [(瓦片序号, 窗口, 输出路径), ...]
+
+    Returns:
+        list: [(瓦片序号, 写出字节数, 错误信息或None), ...]
+    """
+    results = []
+    for index, position, output_path in shard:
+        try:
+            nbytes = _worker_exporter._write_tile({'position': position, 'output_path': output_path})
+            results.append((index, nbytes, None))
+        except Exception as e:
+            results.append((index, 0, str(e)))
+    return results
+
+
+class ProcessTileExporter(TileExporter):
+    """
+    多进程瓦片导出引擎
+
+    与TileExporter接口相同；瓦片按内部块顺序排好后切成连续的分片，
+    相邻瓦片落在同一进程中，可以复用该进程GDAL块缓存中已解码的块。
+    工作进程使用spawn方式启动，不继承主进程的数据集句柄和线程状态
+
+    使用示例:
+        exporter = ProcessTileExporter(source_path, max_workers=32, progress_callback=callback)
+        stats = exporter.export(tiles)
+    """
+
+    def __init__(self, source_path, max_workers=None, shard_size=None, progress_callback=None,
+                 tile_format=None, cancel_event=None):
+        """
+        初始化导出引擎
+
+        Args:
+            source_path: 源栅格文件路径
+            max_workers: 工作进程数，默认为CPU核数
+            shard_size: 每个分片的瓦片数，None表示按瓦片数和进程数自动选择
+            progress_callback: 进度回调函数，参数为(已完成数, 总数, 统计信息字典)
+            tile_format: 瓦片输出格式，None表示DEFLATE压缩的分块GeoTIFF
+            cancel_event: threading.Event，被设置时不再提交新的分片，已提交的分片写完后返回
+        """
+        super().__init__(source_path, max_workers=max_workers or os.cpu_count() or 4,
+                         progress_callback=progress_callback, tile_format=tile_format,
+                         cancel_event=cancel_event)
+        self.shard_size = shard_size
+
+    def export(self, tiles):
+        """
+        多进程并行导出瓦片
+
+        Args:
+            tiles: 瓦片列表，每个元素包含 'position' (x, y, width, height) 和 'output_path'，
+                   其他键不会传给工作进程
+
+        Returns:
+            dict: 导出统计信息，包含成功文件、失败列表、耗时、瓦片/秒和MB/秒；取消时 'cancelled' 为True
+        """
+        total = len(tiles)
+        stats = {
+            'saved': [],
+            'failed': [],
+            'cancelled': False,
+            'bytes': 0,
+            'elapsed': 0.0,
+            'tiles_per_sec': 0.0,
+            'mb_per_sec': 0.0
+        }
+        if total == 0:
+            return stats
+
+        start_time = time.time()
+        ordered = self._order_tiles(tiles)
+        # 主进程只在排序时读取块尺寸，不保留数据集句柄
+        self._close_sources()
+
+        # 每个进程约分到4个分片，兼顾负载均衡与进度更新频率
+        shard_size = self.shard_size or max(1, min(256, total // (self.max_workers * 4)))
+        shards = [
+            [(start + i, tile['position'], tile['output_path'])
+             for i, tile in enumerate(ordered[start:start + shard_size])]
+            for start in range(0, total, shard_size)
+        ]
+        pending = {}
+
+        def collect(done_futures):
+            for future in done_futures:
+                shard = pending.pop(future)
+                try:
+                    results = future.result()
+                except Exception as e:
+                    # 工作进程异常退出时整段记为失败
+                    results = [(index, 0, str(e)) for index, _, _ in shard]
+
+                for index, nbytes, error in results:
+                    tile = ordered[index]
+                    if error is None:
+                        stats['bytes'] += nbytes
+                        stats['saved'].append(tile['output_path'])
+                    else:
+                        self.last_error = f"导出瓦片失败: {tile['output_path']}, 错误: {error}"
+                        stats['failed'].append((tile, error))
+
+                elapsed = max(time.time() - start_time, 1e-6)
+                finished = len(stats['saved']) + len(stats['failed'])
+                stats['elapsed'] = elapsed
+                stats['tiles_per_sec'] = finished / elapsed
+                stats['mb_per_sec'] = stats['bytes'] / (1024 * 1024) / elapsed
+                if self.progress_callback:
+                    self.progress_callback(finished, total, stats)
+
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(shards)), mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(self.source_path, self.tile_format)) as executor:
+            for shard in shards:
+                if self.cancel_event.is_set():
+                    stats['cancelled'] = True
+                    break
+                # 每个进程最多排队两个分片，取消后能尽快停止
+                while len(pending) >= self.max_workers * 2:
+                    done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                    collect(done)
+                pending[executor.submit(_export_shard, shard)] = shard
+
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                collect(done)
+
+        return stats
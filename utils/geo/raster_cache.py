@@ -0,0 +1,265 @@
+"""
+原始栅格磁盘缓存
+按 路径+修改时间+大小+波段选择 将解码后的波段以原始数据类型写入磁盘上的.npy文件，
+之后以内存映射方式打开；分块、统计等分析直接在映射上切片得到视图，同一景影像的重复分析不再读取和解压源文件
+"""
+import os
+import json
+import hashlib
+import threading
+
+import numpy as np
+
+from utils.geo.dataset_pool import DatasetPool, KIND_GDAL, KIND_RASTERIO, GDAL_AVAILABLE, RASTERIO_AVAILABLE
+
+if RASTERIO_AVAILABLE:
+    from rasterio.windows import Window
+
+if GDAL_AVAILABLE:
+    from osgeo import gdal_array
+
+
+class RasterCache:
+    """
+    原始栅格内存映射缓存
+
+    缓存数组形状为 (波段数, 行数, 列数)，数据类型与源文件一致（各波段类型不同时取可容纳所有波段的类型）。
+    写入时按行条带读取源文件，内存占用与影像大小无关；缓存文件先写到临时文件再原子替换，
+    中途取消或失败不会留下不完整的缓存。超出容量上限时按最近使用时间淘汰
+
+    使用示例:
+        cube = RasterCache.get(path)                    # 所有波段
+        nir = RasterCache.get(path, bands=[8])[0]       # 只缓存第8波段
+        tile = cube[:, y:y + height, x:x + width]       # 视图，不复制数据
+    """
+
+    # 缓存目录，为空时使用用户目录下的 .rsiis/raster_cache
+    CACHE_DIR = ""
+    # 缓存总大小上限（字节）
+    MAX_BYTES = 8 * 1024 ** 3
+    # 写入缓存时每次读取的行数
+    STRIP_ROWS = 1024
+
+    # 缓存键 -> 已打开的内存映射（同一进程内重复获取返回同一个映射）
+    _maps = {}
+    _lock = threading.Lock()
+    # 缓存键 -> 写入锁，同一缓存只由一个线程生成
+    _build_locks = {}
+
+    @staticmethod
+    def configure(cache_dir=None, max_bytes=None):
+        """
+        配置缓存目录和容量上限
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存总大小上限（字节）
+        """
+        if cache_dir is not None:
+            with RasterCache._lock:
+                RasterCache.CACHE_DIR = cache_dir
+                RasterCache._maps.clear()
+        if max_bytes is not None:
+            RasterCache.MAX_BYTES = int(max_bytes)
+            RasterCache._evict()
+
+    @staticmethod
+    def cache_dir():
+        """实际使用的缓存目录"""
+        return RasterCache.CACHE_DIR or os.path.join(os.path.expanduser("~"), ".rsiis", "raster_cache")
+
+    @staticmethod
+    def cache_key(path, bands=None):
+        """
+        生成缓存键：规范化路径、修改时间、大小和波段选择
+
+        Args:
+            path: 栅格文件路径
+            bands: 波段序号列表（从1开始），None表示所有波段
+
+        Returns:
+            str: 缓存键
+        """
+        normalized = os.path.normcase(os.path.abspath(path))
+        stat = os.stat(normalized)
+        payload = json.dumps([normalized, stat.st_mtime_ns, stat.st_size,
+                              list(bands) if bands else None])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _file_path(key):
+        return os.path.join(RasterCache.cache_dir(), f"{key}.npy")
+
+    @staticmethod
+    def get(path, bands=None, build=True, cancel_event=None, progress_callback=None):
+        """
+        获取原始波段的只读内存映射，缓存不存在时从源文件生成
+
+        Args:
+            path: 栅格文件路径
+            bands: 波段序号列表（从1开始），None表示所有波段
+            build: 缓存不存在时是否生成，False时直接返回None
+            cancel_event: threading.Event，生成缓存期间被设置时放弃并返回None
+            progress_callback: 生成缓存的进度回调函数，参数为(已读取行数, 总行数)
+
+        Returns:
+            numpy.memmap: 形状为(波段数, 行数, 列数)的只读数组；未命中且不生成、或被取消时返回None
+        """
+        key = RasterCache.cache_key(path, bands)
+        cube = RasterCache._lookup(key)
+        if cube is not None or not build:
+            return cube
+
+        with RasterCache._lock:
+            build_lock = RasterCache._build_locks.setdefault(key, threading.Lock())
+        with build_lock:
+            # 等待期间其他线程可能已生成同一缓存
+            cube = RasterCache._lookup(key)
+            if cube is None:
+                if not RasterCache._build(path, bands, RasterCache._file_path(key),
+                                          cancel_event, progress_callback):
+                    return None
+                RasterCache._evict(keep=key)
+                cube = RasterCache._lookup(key)
+        with RasterCache._lock:
+            RasterCache._build_locks.pop(key, None)
+        return cube
+
+    @staticmethod
+    def _lookup(key):
+        """打开已有的缓存文件并更新最近使用时间，不存在时返回None"""
+        file_path = RasterCache._file_path(key)
+        with RasterCache._lock:
+            cube = RasterCache._maps.get(key)
+            if cube is None:
+                if not os.path.exists(file_path):
+                    return None
+                try:
+                    cube = np.load(file_path, mmap_mode="r")
+                except (IOError, OSError, ValueError):
+                    # 损坏的缓存文件重新生成
+                    RasterCache._remove_file(file_path)
+                    return None
+                RasterCache._maps[key] = cube
+        try:
+            os.utime(file_path)
+        except OSError:
+            pass
+        return cube
+
+    @staticmethod
+    def _build(path, bands, file_path, cancel_event=None, progress_callback=None):
+        """
+        按行条带读取源文件写入缓存文件
+
+        Returns:
+            bool: 是否完成（被取消时返回False）
+        """
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        kind = DatasetPool.default_kind()
+
+        with DatasetPool.open(path, kind) as dataset:
+            if kind == KIND_GDAL:
+                width, height, count = dataset.RasterXSize, dataset.RasterYSize, dataset.RasterCount
+                band_list = list(bands) if bands else list(range(1, count + 1))
+                dtypes = [gdal_array.GDALTypeCodeToNumericTypeCode(dataset.GetRasterBand(b).DataType)
+                          for b in band_list]
+            else:
+                width, height, count = dataset.width, dataset.height, dataset.count
+                band_list = list(bands) if bands else list(range(1, count + 1))
+                dtypes = [dataset.dtypes[b - 1] for b in band_list]
+
+            cube = np.lib.format.open_memmap(temp_path, mode="w+", dtype=np.result_type(*dtypes),
+                                             shape=(len(band_list), height, width))
+            try:
+                for y in range(0, height, RasterCache.STRIP_ROWS):
+                    if cancel_event is not None and cancel_event.is_set():
+                        del cube
+                        RasterCache._remove_file(temp_path)
+                        return False
+                    rows = min(RasterCache.STRIP_ROWS, height - y)
+                    if kind == KIND_GDAL:
+                        for i, b in enumerate(band_list):
+                            cube[i, y:y + rows] = dataset.GetRasterBand(b).ReadAsArray(0, y, width, rows)
+                    else:
+                        cube[:, y:y + rows] = dataset.read(band_list, window=Window(0, y, width, rows))
+                    if progress_callback:
+                        progress_callback(y + rows, height)
+                cube.flush()
+            except Exception:
+                del cube
+                RasterCache._remove_file(temp_path)
+                raise
+
+        del cube
+        os.replace(temp_path, file_path)
+        return True
+
+    @staticmethod
+    def _remove_file(file_path):
+        try:
+            os.remove(file_path)
+        except OSError:
+            # Windows下仍被映射的文件无法删除，留待下次淘汰
+            pass
+
+    @staticmethod
+    def _evict(keep=None):
+        """超出容量时按最近使用时间删除缓存文件"""
+        directory = RasterCache.cache_dir()
+        if not os.path.isdir(directory):
+            return
+
+        entries = []
+        for name in os.listdir(directory):
+            if not name.endswith(".npy"):
+                continue
+            file_path = os.path.join(directory, name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name[:-4], file_path))
+
+        total = sum(entry[1] for entry in entries)
+        for _, size, key, file_path in sorted(entries):
+            if total <= RasterCache.MAX_BYTES:
+                break
+            if key == keep:
+                continue
+            with RasterCache._lock:
+                RasterCache._maps.pop(key, None)
+            RasterCache._remove_file(file_path)
+            total -= size
+
+    @staticmethod
+    def contains(path, bands=None):
+        """判断缓存是否已存在"""
+        return os.path.exists(RasterCache._file_path(RasterCache.cache_key(path, bands)))
+
+    @staticmethod
+    def release():
+        """关闭本进程打开的所有内存映射，缓存文件保留在磁盘上"""
+        with RasterCache._lock:
+            RasterCache._maps.clear()
+
+    @staticmethod
+    def clear():
+        """删除所有缓存文件"""
+        RasterCache.release()
+        directory = RasterCache.cache_dir()
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if name.endswith((".npy", ".tmp")):
+                    RasterCache._remove_file(os.path.join(directory, name))
+
+    @staticmethod
+    def stats():
+        """缓存状态：文件数、总字节数和本进程打开的映射数"""
+        directory = RasterCache.cache_dir()
+        files = [os.path.join(directory, name) for name in os.listdir(directory)
+                 if name.endswith(".npy")] if os.path.isdir(directory) else []
+        with RasterCache._lock:
+            mapped = len(RasterCache._maps)
+        return {"files": len(files), "bytes": sum(os.path.getsize(f) for f in files), "mapped": mapped}
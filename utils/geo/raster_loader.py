@@ -1,11 +1,17 @@
 import os
 import sys
+import threading
 import traceback
 import warnings
+from collections import OrderedDict
 import numpy as np
 from PIL import Image
 import warnings
 
+from utils.geo.stretch import StretchEngine, STRETCH_MINMAX
+from utils.geo.dataset_pool import DatasetPool, KIND_GDAL, KIND_RASTERIO
+from utils.geo.raster_cache import RasterCache
+
 # 尝试导入地理空间库，并记录可用性
 try:
     import rasterio
@@ -55,6 +61,144 @@ class RasterData:
         self.rasterio_dataset = None    # rasterio数据集
         self.gdal_dataset = None        # GDAL数据集
         self.error_message = None       # 错误信息
+        self.is_preview = False         # image/array是否为降采样预览
+        self.preview_scale = (1.0, 1.0) # 预览图相对原图的缩放比例 (x方向, y方向)
+        self.bands = BandReader(self)   # 惰性波段访问器，按需读取任意波段并保留原始数据类型
+
+
+class BandReader:
+    """
+    RasterData的惰性波段访问器
+    
+    按需读取任意波段或波段组合，可指定窗口，保留原始数据类型；最近读取的整波段保存在内存中
+    （按总字节数LRU淘汰），切换RGB组合或计算指数时不再重新读取文件。
+    数据来源依次为：内存中的整波段、原始栅格磁盘缓存（RasterLoader.USE_RAW_CACHE开启时）、数据集
+    
+    使用示例:
+        nir = raster.bands[8]                                    # 整波段 (行, 列)
+        rgb = raster.bands.read([4, 3, 2], window=(x, y, w, h))  # (3, h, w)
+    """
+    
+    # 内存中保存的整波段总字节数上限
+    MAX_CACHE_BYTES = 512 * 1024 ** 2
+    
+    def __init__(self, raster):
+        self._raster = raster
+        self._cache = OrderedDict()     # 波段序号 -> 只读的整波段数组
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+    
+    def __len__(self):
+        return self._raster.bands_count
+    
+    def __getitem__(self, band):
+        return self.read(band)
+    
+    def read(self, bands, window=None, out_shape=None):
+        """
+        读取波段数据
+        
+        Args:
+            bands: 波段序号（从1开始）或序号列表
+            window: 窗口 (x, y, width, height)，None表示整幅
+            out_shape: (行数, 列数)，指定时按该尺寸降采样读取（GDAL会自动选用最合适的金字塔层），结果不缓存
+            
+        Returns:
+            numpy.ndarray: 单个序号时形状为(行, 列)，序号列表时为(波段数, 行, 列)
+        """
+        single = isinstance(bands, (int, np.integer))
+        band_list = [int(bands)] if single else [int(b) for b in bands]
+        for band in band_list:
+            if not 1 <= band <= self._raster.bands_count:
+                raise IndexError(f"波段序号超出范围: {band}")
+        
+        arrays = [self._read_band(band, window, out_shape) for band in band_list]
+        return arrays[0] if single else np.stack(arrays)
+    
+    def clear(self):
+        """释放内存中保存的波段"""
+        with self._lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+    
+    @staticmethod
+    def _slice(array, window):
+        if window is None:
+            return array
+        x, y, width, height = window
+        return array[y:y + height, x:x + width]
+    
+    def _read_band(self, band, window, out_shape):
+        raster = self._raster
+        if out_shape is None:
+            with self._lock:
+                full = self._cache.get(band)
+                if full is not None:
+                    self._cache.move_to_end(band)
+            if full is not None:
+                return self._slice(full, window)
+            
+            if not raster.is_geotiff:
+                # 常规图像已在内存中
+                array = raster.array if raster.array.ndim == 3 else raster.array[:, :, np.newaxis]
+                return self._slice(array[:, :, band - 1], window)
+            
+            if RasterLoader.USE_RAW_CACHE:
+                cube = RasterCache.get(raster.image_path, build=False)
+                if cube is not None:
+                    return self._slice(cube[band - 1], window)
+        
+        data = self._read_source(band, window, out_shape)
+        if window is None and out_shape is None:
+            self._remember(band, data)
+        return data
+    
+    def _remember(self, band, data):
+        """保存整波段，超出上限时淘汰最久未使用的波段"""
+        if data.nbytes > BandReader.MAX_CACHE_BYTES:
+            return
+        data.flags.writeable = False
+        with self._lock:
+            if band in self._cache:
+                return
+            self._cache[band] = data
+            self._cache_bytes += data.nbytes
+            while self._cache_bytes > BandReader.MAX_CACHE_BYTES:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= evicted.nbytes
+    
+    def _read_source(self, band, window, out_shape):
+        """
+        从句柄池获取当前线程独占的句柄读取数据
+        
+        RasterData上的句柄只用于读取元数据：GDAL/rasterio数据集不是线程安全的，
+        预览瓦片线程、后台任务和GUI线程会同时读取同一景影像
+        """
+        raster = self._raster
+        if raster.rasterio_dataset is not None:
+            kind = KIND_RASTERIO
+        elif raster.gdal_dataset is not None:
+            kind = KIND_GDAL
+        else:
+            kind = DatasetPool.default_kind()
+        
+        with DatasetPool.open(raster.image_path, kind) as dataset:
+            return self._read_dataset(dataset, kind, band, window, out_shape)
+    
+    def _read_dataset(self, dataset, kind, band, window, out_shape):
+        x, y, width, height = window or (0, 0, self._raster.width, self._raster.height)
+        if kind == KIND_RASTERIO:
+            kwargs = {}
+            if window is not None:
+                kwargs['window'] = Window(x, y, width, height)
+            if out_shape:
+                kwargs['out_shape'] = out_shape
+            return dataset.read(band, **kwargs)
+        
+        gdal_band = dataset.GetRasterBand(band)
+        if out_shape:
+            return gdal_band.ReadAsArray(x, y, width, height, buf_xsize=out_shape[1], buf_ysize=out_shape[0])
+        return gdal_band.ReadAsArray(x, y, width, height)
 
 
 class RasterLoader:
@@ -63,13 +207,22 @@ class RasterLoader:
     支持GeoTIFF、常规图像格式，以及Sentinel-2卫星数据等
     """
     
+    # 显示拉伸模式及是否按波段分别拉伸
+    STRETCH_MODE = STRETCH_MINMAX
+    STRETCH_PER_BAND = False
+    # 是否通过原始栅格磁盘缓存读取全分辨率波段，开启后同一景影像的重复加载和窗口读取不再解码源文件
+    USE_RAW_CACHE = False
+    
     @staticmethod
-    def load(file_path):
+    def load(file_path, preview_size=None):
         """
         加载栅格数据，自动选择合适的方法
         
         Args:
             file_path: 文件路径
+            preview_size: 预览图最长边的像素数。指定后GeoTIFF只按该分辨率读取显示数据，
+                          优先使用内部金字塔（overview），没有金字塔时进行降采样读取；
+                          为None时读取全分辨率数据
             
         Returns:
             RasterData: 加载的栅格数据对象
@@ -88,14 +241,14 @@ class RasterLoader:
             # 尝试使用多种方法加载
             # 1. 优先使用rasterio（最佳支持地理信息）
             if RASTERIO_AVAILABLE:
-                success, message = RasterLoader._load_with_rasterio(raster)
+                success, message = RasterLoader._load_with_rasterio(raster, preview_size)
                 if success:
                     return raster, True
                 # 如果失败，尝试下一种方法
             
             # 2. 尝试GDAL
             if GDAL_AVAILABLE:
-                success, message = RasterLoader._load_with_gdal(raster)
+                success, message = RasterLoader._load_with_gdal(raster, preview_size)
                 if success:
                     return raster, True
                 raster.error_message = message
@@ -119,13 +272,96 @@ class RasterLoader:
         return raster, False
     
     @staticmethod
-    def _load_with_rasterio(raster):
+    def close(raster):
+        """
+        归还RasterData持有的数据集句柄，句柄是否关闭由句柄池决定
+        
+        Args:
+            raster: RasterData对象
+        """
+        if raster is None:
+            return
+        raster.bands.clear()
+        if raster.rasterio_dataset is not None:
+            DatasetPool.release(raster.rasterio_dataset)
+            raster.rasterio_dataset = None
+        if raster.gdal_dataset is not None:
+            DatasetPool.release(raster.gdal_dataset)
+            raster.gdal_dataset = None
+    
+    @staticmethod
+    def raw_bands(raster, bands=None, build=True, cancel_event=None):
+        """
+        获取保留原始数据类型的全分辨率波段，GeoTIFF由原始栅格磁盘缓存提供内存映射
+        
+        Args:
+            raster: RasterData对象
+            bands: 波段序号列表（从1开始），None表示所有波段
+            build: 缓存不存在时是否生成
+            cancel_event: threading.Event，生成缓存期间被设置时返回None
+            
+        Returns:
+            numpy.ndarray: 形状为(波段数, 行数, 列数)的只读数组，可直接切片；无法获取时返回None
+        """
+        if raster is None or not raster.image_path:
+            return None
+        if raster.is_geotiff:
+            return RasterCache.get(raster.image_path, bands, build=build, cancel_event=cancel_event)
+        if raster.array is None:
+            return None
+        # 常规图像已在内存中，返回按波段排列的视图
+        cube = raster.array if raster.array.ndim == 3 else raster.array[:, :, np.newaxis]
+        cube = np.moveaxis(cube, -1, 0)
+        return cube[[b - 1 for b in bands]] if bands else cube
+    
+    @staticmethod
+    def _cached_band(raster, index):
+        """开启原始栅格缓存且读取全分辨率数据时，从缓存取出单个波段"""
+        if not RasterLoader.USE_RAW_CACHE or raster.metadata.get("preview_shape"):
+            return None
+        cube = RasterLoader.raw_bands(raster)
+        return cube[index - 1] if cube is not None else None
+    
+    @staticmethod
+    def _setup_preview(raster, preview_size):
+        """
+        根据预览尺寸计算显示数据的读取尺寸，并记录缩放比例
+        
+        Args:
+            raster: RasterData对象（已填写宽度和高度）
+            preview_size: 预览图最长边的像素数，None表示全分辨率
+        """
+        raster.metadata.pop("preview_shape", None)
+        raster.is_preview = False
+        raster.preview_scale = (1.0, 1.0)
+        
+        if not preview_size or max(raster.width, raster.height) <= preview_size:
+            return
+        
+        ratio = preview_size / float(max(raster.width, raster.height))
+        out_width = max(1, int(round(raster.width * ratio)))
+        out_height = max(1, int(round(raster.height * ratio)))
+        
+        raster.metadata["preview_shape"] = (out_height, out_width)
+        raster.is_preview = True
+        raster.preview_scale = (out_width / float(raster.width), out_height / float(raster.height))
+    
+    @staticmethod
+    def _read_band(raster, index):
+        """读取单个波段，预览模式下按预览尺寸读取（GDAL会自动选用最合适的金字塔层）"""
+        cached = RasterLoader._cached_band(raster, index)
+        if cached is not None:
+            return cached
+        return raster.bands.read(index, out_shape=raster.metadata.get("preview_shape"))
+    
+    @staticmethod
+    def _load_with_rasterio(raster, preview_size=None):
         """使用rasterio加载GeoTIFF"""
         try:
             # 使用rasterio环境设置，提高兼容性
             with rasterio.Env(GDAL_SKIP='PDF'):  # 跳过PDF驱动避免某些冲突
-                # 打开GeoTIFF文件
-                dataset = rasterio.open(raster.image_path)
+                # 从句柄池获取GeoTIFF数据集，由RasterLoader.close归还
+                dataset = DatasetPool.acquire(raster.image_path, KIND_RASTERIO)
                 
                 # 保存基本信息
                 raster.rasterio_dataset = dataset
@@ -136,6 +372,7 @@ class RasterLoader:
                 raster.is_geotiff = True
                 raster.geo_transform = dataset.transform
                 raster.crs = dataset.crs
+                RasterLoader._setup_preview(raster, preview_size)
                 
                 # 检测是否为Sentinel-2数据（通常波段数较多）
                 raster.is_sentinel = raster.bands_count > 10
@@ -156,29 +393,36 @@ class RasterLoader:
                     max_band = min(raster.bands_count, 4) 
                     if max_band >= 4:
                         # 使用B4,B3,B2
-                        blue = dataset.read(2)
-                        green = dataset.read(3)
-                        red = dataset.read(4)
+                        blue = RasterLoader._read_band(raster, 2)
+                        green = RasterLoader._read_band(raster, 3)
+                        red = RasterLoader._read_band(raster, 4)
                     else:
                         # 使用标准顺序
-                        red = dataset.read(1)
-                        green = dataset.read(2)
-                        blue = dataset.read(3) if max_band >= 3 else dataset.read(1)
+                        red = RasterLoader._read_band(raster, 1)
+                        green = RasterLoader._read_band(raster, 2)
+                        blue = RasterLoader._read_band(raster, 3 if max_band >= 3 else 1)
                     
                     # 记录波段使用信息
                     if max_band >= 4:
                         raster.metadata["band_combination"] = "R:Band4, G:Band3, B:Band2"
+                        raster.band_indices = {'red': 4, 'green': 3, 'blue': 2}
+                    else:
+                        raster.band_indices = {'red': 1, 'green': 2, 'blue': 3 if max_band >= 3 else 1}
                     
                     rgb = np.stack([red, green, blue], axis=2)
                 else:
                     # 单波段，转换为RGB
-                    single_band = dataset.read(1)
+                    single_band = RasterLoader._read_band(raster, 1)
                     rgb = np.stack([single_band, single_band, single_band], axis=2)
+                    raster.band_indices = {'red': 1, 'green': 1, 'blue': 1}
                 
-                # 标准化处理并创建PIL图像
-                rgb_norm = RasterLoader._enhance_sentinel_image(rgb)
-                raster.array = rgb_norm
-                raster.image = Image.fromarray(rgb_norm)
+                # Sentinel数据已在_process_sentinel中完成处理
+                if not raster.is_sentinel:
+                    # 标准化处理并创建PIL图像，记录拉伸范围供窗口读取复用
+                    raster.metadata["display_range"] = RasterLoader._display_range(rgb, raster)
+                    rgb_norm = RasterLoader._enhance_sentinel_image(rgb, raster.metadata["display_range"])
+                    raster.array = rgb_norm
+                    raster.image = Image.fromarray(rgb_norm)
                 
                 return True, "成功"
                 
@@ -187,20 +431,21 @@ class RasterLoader:
             exc_type, exc_value, exc_traceback = sys.exc_info()
             error_details = ''.join(traceback.format_exception(exc_type, exc_value, exc_traceback))
             
-            # 关闭已打开的rasterio文件
+            # 归还已打开的rasterio数据集
             if raster.rasterio_dataset:
-                raster.rasterio_dataset.close()
+                DatasetPool.release(raster.rasterio_dataset)
                 raster.rasterio_dataset = None
             
             return False, f"rasterio加载失败: {str(e)}\n{error_details}"
     
     @staticmethod
-    def _load_with_gdal(raster):
+    def _load_with_gdal(raster, preview_size=None):
         """使用GDAL加载GeoTIFF"""
         try:
-            # 打开数据集
-            dataset = gdal.Open(raster.image_path, gdal.GA_ReadOnly)
-            if dataset is None:
+            # 从句柄池获取数据集，由RasterLoader.close归还
+            try:
+                dataset = DatasetPool.acquire(raster.image_path, KIND_GDAL)
+            except IOError:
                 return False, "GDAL无法打开文件"
                 
             # 保存基本信息
@@ -213,6 +458,7 @@ class RasterLoader:
             # 获取变换和投影信息
             raster.geo_transform = dataset.GetGeoTransform()
             raster.crs = dataset.GetProjection()
+            RasterLoader._setup_preview(raster, preview_size)
             
             # 读取数据 - 默认假设band1=红, band2=绿, band3=蓝
             # 但有些数据可能是band1=蓝, band2=绿, band3=红，这取决于数据源
@@ -243,9 +489,9 @@ class RasterLoader:
                 blue_idx = min(blue_idx, raster.bands_count)
                 
                 # 读取相应波段
-                red = dataset.GetRasterBand(red_idx).ReadAsArray()
-                green = dataset.GetRasterBand(green_idx).ReadAsArray()
-                blue = dataset.GetRasterBand(blue_idx).ReadAsArray()
+                red = RasterLoader._read_band(raster, red_idx)
+                green = RasterLoader._read_band(raster, green_idx)
+                blue = RasterLoader._read_band(raster, blue_idx)
                 
                 # 设置波段索引信息
                 raster.band_indices = {'red': red_idx, 'green': green_idx, 'blue': blue_idx}
@@ -254,7 +500,7 @@ class RasterLoader:
                 raster.metadata["band_combination"] = f"R{red_idx}G{green_idx}B{blue_idx}"
             else:
                 # 单波段 - 转为RGB
-                band = dataset.GetRasterBand(1).ReadAsArray()
+                band = RasterLoader._read_band(raster, 1)
                 red = green = blue = band
                 raster.band_indices = {'red': 1, 'green': 1, 'blue': 1}
             
@@ -262,8 +508,9 @@ class RasterLoader:
             # 在NumPy中，RGB图像的形状是(height, width, 3)，其中最后一个维度按R,G,B顺序排列
             rgb = np.dstack([red, green, blue])
             
-            # 数据归一化
-            rgb_norm = RasterLoader._enhance_sentinel_image(rgb)
+            # 数据归一化，记录拉伸范围供窗口读取复用
+            raster.metadata["display_range"] = RasterLoader._display_range(rgb, raster)
+            rgb_norm = RasterLoader._enhance_sentinel_image(rgb, raster.metadata["display_range"])
             raster.array = rgb_norm
             raster.image = Image.fromarray(rgb_norm)
             
@@ -283,6 +530,11 @@ class RasterLoader:
             exc_type, exc_value, exc_traceback = sys.exc_info()
             error_details = ''.join(traceback.format_exception(exc_type, exc_value, exc_traceback))
             
+            # 归还已打开的GDAL数据集
+            if raster.gdal_dataset:
+                DatasetPool.release(raster.gdal_dataset)
+                raster.gdal_dataset = None
+            
             return False, f"GDAL加载失败: {str(e)}\n{error_details}"
     
     @staticmethod
@@ -334,9 +586,9 @@ class RasterLoader:
             red_idx = min(2, raster.bands_count)
             
             # 读取波段数据
-            blue = raster.rasterio_dataset.read(blue_idx)
-            green = raster.rasterio_dataset.read(green_idx)
-            red = raster.rasterio_dataset.read(red_idx)
+            blue = RasterLoader._read_band(raster, blue_idx)
+            green = RasterLoader._read_band(raster, green_idx)
+            red = RasterLoader._read_band(raster, red_idx)
             
             # 记录使用的波段信息
             raster.band_indices = {'red': red_idx, 'green': green_idx, 'blue': blue_idx}
@@ -346,7 +598,8 @@ class RasterLoader:
             rgb = np.dstack([red, green, blue])
             
             # 应用增强的标准化处理
-            rgb_norm = RasterLoader._enhance_sentinel_image(rgb)
+            raster.metadata["display_range"] = RasterLoader._display_range(rgb, raster)
+            rgb_norm = RasterLoader._enhance_sentinel_image(rgb, raster.metadata["display_range"])
             
             # 保存数据
             raster.array = rgb_norm
@@ -365,12 +618,103 @@ class RasterLoader:
             return False, f"Sentinel-2数据处理失败: {str(e)}\n{error_details}"
     
     @staticmethod
-    def _enhance_sentinel_image(array):
+    def read_window_rgb(raster, x_off, y_off, width, height):
+        """
+        按需读取指定窗口的显示用RGB数据，只读取窗口覆盖的像素而不读取整景影像
+        
+        使用加载时记录的波段组合和拉伸范围，保证各窗口与整图显示效果一致
+        
+        Args:
+            raster: RasterData对象
+            x_off, y_off: 窗口左上角的像素坐标
+            width, height: 窗口的宽度和高度
+            
+        Returns:
+            numpy.ndarray: 形状为(height, width, 3)的uint8数组
+        """
+        indices = raster.band_indices or {}
+        band_list = [indices.get('red', 1), indices.get('green', 2), indices.get('blue', 3)]
+        
+        if raster.is_geotiff:
+            # 由波段访问器读取：内存中的整波段或原始栅格缓存直接切片，否则按窗口读取数据集
+            band_list = [min(i, raster.bands_count) for i in band_list]
+            data = raster.bands.read(band_list, window=(x_off, y_off, width, height))
+            rgb = np.moveaxis(data, 0, -1)
+        elif raster.array is not None:
+            # 常规图像已在内存中，直接切片
+            return np.ascontiguousarray(raster.array[y_off:y_off + height, x_off:x_off + width])
+        else:
+            return np.zeros((max(1, height), max(1, width), 3), dtype=np.uint8)
+        
+        rgb_norm = RasterLoader._enhance_sentinel_image(rgb, raster.metadata.get("display_range"))
+        return np.ascontiguousarray(rgb_norm)
+    
+    @staticmethod
+    def set_rgb_bands(raster, red, green, blue):
         """
-        处理图像显示 - 不再使用累积计数截断方法增强，而是保持原始数据
+        切换显示用的RGB波段组合，通过波段访问器读取，不重新打开文件
+        
+        Args:
+            raster: 已加载的GeoTIFF RasterData对象
+            red, green, blue: 波段序号（从1开始）
+            
+        Returns:
+            bool: 是否成功
+            str: 错误消息或成功信息
+        """
+        if raster is None or not raster.is_geotiff:
+            return False, "仅GeoTIFF支持切换波段组合"
+        
+        try:
+            bands = [int(red), int(green), int(blue)]
+            data = raster.bands.read(bands, out_shape=raster.metadata.get("preview_shape"))
+            rgb = np.moveaxis(data, 0, -1)
+            
+            raster.band_indices = {'red': bands[0], 'green': bands[1], 'blue': bands[2]}
+            raster.metadata["band_combination"] = f"R{bands[0]}G{bands[1]}B{bands[2]}"
+            raster.metadata["display_range"] = RasterLoader._display_range(rgb, raster)
+            rgb_norm = np.ascontiguousarray(
+                RasterLoader._enhance_sentinel_image(rgb, raster.metadata["display_range"]))
+            raster.array = rgb_norm
+            raster.image = Image.fromarray(rgb_norm)
+            return True, "成功"
+        except Exception as e:
+            return False, f"切换波段组合失败: {str(e)}"
+    
+    @staticmethod
+    def _display_range(array, raster=None):
+        """
+        计算显示拉伸使用的数值范围，基于抽样统计并按数据集缓存
         
         Args:
             array: 原始numpy数组
+            raster: RasterData对象，提供时按文件路径和波段组合缓存统计结果
+            
+        Returns:
+            tuple: (lows, highs) 各波段的拉伸范围，uint8数据无需拉伸时返回None
+        """
+        if array is None or array.size == 0 or array.dtype == np.uint8:
+            return None
+        
+        def compute():
+            return StretchEngine.compute_stats(array, mode=RasterLoader.STRETCH_MODE,
+                                               per_band=RasterLoader.STRETCH_PER_BAND)
+        
+        key = None
+        if raster is not None and raster.band_indices:
+            bands = [raster.band_indices.get(name) for name in ('red', 'green', 'blue')]
+            key = StretchEngine.cache_key(raster.image_path, bands,
+                                          RasterLoader.STRETCH_MODE, RasterLoader.STRETCH_PER_BAND)
+        return StretchEngine.get_cached_stats(key, compute)
+    
+    @staticmethod
+    def _enhance_sentinel_image(array, value_range=None):
+        """
+        处理图像显示 - 不再使用累积计数截断方法增强，而是进行线性拉伸使其可显示
+        
+        Args:
+            array: 原始numpy数组
+            value_range: 拉伸范围 (lows, highs)，为None时根据数组抽样统计计算
             
         Returns:
             numpy.ndarray: 处理后可显示的数组
@@ -380,24 +724,16 @@ class RasterLoader:
             if array is None or array.size == 0:
                 return np.zeros((10, 10, 3), dtype=np.uint8)
             
-            # 替换无效值（负值或异常大值）
-            array = np.nan_to_num(array, nan=0, posinf=0, neginf=0)
+            # uint8数据已可直接显示
+            if array.dtype == np.uint8:
+                return array
             
-            # 判断数据类型，只进行最基本的转换使其可显示
-            if array.dtype != np.uint8:
-                # 简单地进行线性缩放以适应0-255范围
-                min_val = np.min(array)
-                max_val = np.max(array)
-                
-                # 避免除零错误
-                if max_val - min_val < 0.0001:
-                    min_val, max_val = 0, 1
-                
-                # 线性缩放到0-255范围
-                normalized = np.clip((array - min_val) / (max_val - min_val) * 255, 0, 255).astype(np.uint8)
-                return normalized
+            if value_range is None:
+                value_range = RasterLoader._display_range(array)
             
-            return array
+            # 查表/分块线性缩放到0-255范围
+            lows, highs = value_range
+            return StretchEngine.apply(array, lows, highs)
             
         except Exception as e:
             # 如果处理失败，尝试返回原始数组
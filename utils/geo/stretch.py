@@ -0,0 +1,206 @@
+"""
+影像显示拉伸引擎
+基于抽样统计计算各波段的拉伸范围，并按数据集缓存统计结果；
+拉伸时使用查找表（LUT）分块写入输出数组，避免生成整景大小的浮点副本
+"""
+import os
+import threading
+
+import numpy as np
+
+
+# 拉伸模式
+STRETCH_MINMAX = 'minmax'           # 最小值/最大值
+STRETCH_CUMULATIVE = 'cumulative'   # 累积计数截断（默认2%-98%）
+STRETCH_STDDEV = 'stddev'           # 均值±n倍标准差
+
+
+class StretchEngine:
+    """
+    影像显示拉伸引擎
+
+    使用示例:
+        lows, highs = StretchEngine.compute_stats(rgb, mode=STRETCH_CUMULATIVE)
+        display = StretchEngine.apply(rgb, lows, highs)
+    """
+
+    # 统计抽样的最大像素数
+    MAX_SAMPLES = 1000000
+    # 分块拉伸时每块的行数
+    CHUNK_ROWS = 512
+
+    # 按数据集缓存的统计结果
+    _stats_cache = {}
+    _cache_lock = threading.Lock()
+
+    @staticmethod
+    def sample(array, max_samples=None):
+        """
+        对影像数组进行等间隔抽样，返回视图而不复制数据
+
+        Args:
+            array: (height, width) 或 (height, width, bands) 数组
+            max_samples: 最大抽样像素数
+
+        Returns:
+            numpy.ndarray: 抽样后的数组视图
+        """
+        max_samples = max_samples or StretchEngine.MAX_SAMPLES
+        pixels = array.shape[0] * array.shape[1]
+        step = max(1, int(np.ceil(np.sqrt(pixels / float(max_samples)))))
+        return array[::step, ::step]
+
+    @staticmethod
+    def compute_stats(array, mode=STRETCH_MINMAX, per_band=True, cut=(2.0, 98.0),
+                      std_factor=2.5, max_samples=None):
+        """
+        计算拉伸范围
+
+        Args:
+            array: (height, width) 或 (height, width, bands) 数组
+            mode: 拉伸模式，STRETCH_MINMAX / STRETCH_CUMULATIVE / STRETCH_STDDEV
+            per_band: 是否为每个波段单独计算范围，False时所有波段共用一个范围
+            cut: 累积计数截断的百分位 (低, 高)
+            std_factor: 标准差模式下的倍数
+            max_samples: 最大抽样像素数
+
+        Returns:
+            tuple: (lows, highs)，每个为长度等于波段数的float64数组
+        """
+        if array.ndim == 2:
+            array = array[:, :, np.newaxis]
+        bands = array.shape[2]
+
+        if mode == STRETCH_MINMAX and np.issubdtype(array.dtype, np.integer):
+            # 整数数据的最值规约不产生副本，直接在全图上精确计算
+            axis = (0, 1) if per_band else None
+            lows = np.asarray(np.min(array, axis=axis), dtype=np.float64)
+            highs = np.asarray(np.max(array, axis=axis), dtype=np.float64)
+        else:
+            samples = StretchEngine.sample(array, max_samples).reshape(-1, bands)
+            if not per_band:
+                samples = samples.reshape(-1, 1)
+            if np.issubdtype(samples.dtype, np.floating):
+                # 与原实现一致，将无效值视为0
+                samples = np.nan_to_num(samples, nan=0, posinf=0, neginf=0)
+
+            if mode == STRETCH_CUMULATIVE:
+                lows, highs = np.percentile(samples, cut, axis=0)
+            elif mode == STRETCH_STDDEV:
+                mean = samples.mean(axis=0, dtype=np.float64)
+                std = samples.std(axis=0, dtype=np.float64)
+                lows = np.maximum(mean - std_factor * std, samples.min(axis=0))
+                highs = np.minimum(mean + std_factor * std, samples.max(axis=0))
+            else:
+                lows, highs = samples.min(axis=0), samples.max(axis=0)
+
+        lows = np.broadcast_to(np.asarray(lows, dtype=np.float64), (bands,)).copy()
+        highs = np.broadcast_to(np.asarray(highs, dtype=np.float64), (bands,)).copy()
+
+        # 避免除零错误：范围过小时退回到0-1
+        flat = highs - lows < 0.0001
+        lows[flat], highs[flat] = 0.0, 1.0
+        return lows, highs
+
+    @staticmethod
+    def cache_key(path, bands, mode=STRETCH_MINMAX, per_band=True):
+        """
+        生成数据集统计缓存的键：路径+修改时间+波段组合+拉伸模式
+
+        Returns:
+            tuple: 缓存键，文件不存在时返回None
+        """
+        if not path or not os.path.exists(path):
+            return None
+        path = os.path.normpath(os.path.abspath(path))
+        return (path, os.path.getmtime(path), tuple(bands), mode, per_band)
+
+    @staticmethod
+    def get_cached_stats(key, compute):
+        """
+        获取缓存的统计结果，不存在时调用compute计算并缓存
+
+        Args:
+            key: cache_key生成的键，为None时不使用缓存
+            compute: 无参函数，返回 (lows, highs)
+
+        Returns:
+            tuple: (lows, highs)
+        """
+        if key is None:
+            return compute()
+        with StretchEngine._cache_lock:
+            stats = StretchEngine._stats_cache.get(key)
+        if stats is None:
+            stats = compute()
+            with StretchEngine._cache_lock:
+                StretchEngine._stats_cache[key] = stats
+        return stats
+
+    @staticmethod
+    def clear_cache():
+        """清空统计缓存"""
+        with StretchEngine._cache_lock:
+            StretchEngine._stats_cache.clear()
+
+    @staticmethod
+    def _build_lut(dtype, low, high):
+        """为8/16位整数类型构建查找表，索引为数据按无符号解释后的值"""
+        if dtype.itemsize == 1:
+            values = np.arange(256, dtype=np.uint8).view(dtype)
+        else:
+            values = np.arange(65536, dtype=np.uint16).view(dtype)
+        scaled = (values.astype(np.float32) - low) * (255.0 / (high - low))
+        return np.clip(scaled, 0, 255).astype(np.uint8)
+
+    @staticmethod
+    def apply(array, lows, highs, out=None, chunk_rows=None):
+        """
+        按拉伸范围线性拉伸到0-255，分块写入输出数组
+
+        8/16位整数数据使用查找表，其他类型逐块计算，额外内存只与块大小相关
+
+        Args:
+            array: (height, width) 或 (height, width, bands) 数组
+            lows, highs: compute_stats返回的拉伸范围
+            out: 可选的uint8输出数组，形状与array相同
+            chunk_rows: 每块的行数
+
+        Returns:
+            numpy.ndarray: uint8数组
+        """
+        squeeze = array.ndim == 2
+        if squeeze:
+            array = array[:, :, np.newaxis]
+        height, width, bands = array.shape
+        chunk_rows = chunk_rows or StretchEngine.CHUNK_ROWS
+
+        if out is None:
+            out = np.empty((height, width, bands), dtype=np.uint8)
+        elif out.ndim == 2:
+            out = out[:, :, np.newaxis]
+
+        use_lut = np.issubdtype(array.dtype, np.integer) and array.dtype.itemsize <= 2
+        index_dtype = np.uint8 if array.dtype.itemsize == 1 else np.uint16
+
+        for b in range(bands):
+            low, high = float(lows[b]), float(highs[b])
+            band = array[:, :, b]
+            out_band = out[:, :, b]
+
+            if use_lut:
+                lut = StretchEngine._build_lut(array.dtype, low, high)
+                for r0 in range(0, height, chunk_rows):
+                    chunk = band[r0:r0 + chunk_rows]
+                    out_band[r0:r0 + chunk_rows] = lut[chunk.view(index_dtype) if chunk.dtype != index_dtype else chunk]
+            else:
+                scale = np.float32(255.0 / (high - low))
+                for r0 in range(0, height, chunk_rows):
+                    chunk = band[r0:r0 + chunk_rows].astype(np.float32)
+                    np.nan_to_num(chunk, copy=False, nan=0, posinf=0, neginf=0)
+                    chunk -= np.float32(low)
+                    chunk *= scale
+                    np.clip(chunk, 0, 255, out=chunk)
+                    out_band[r0:r0 + chunk_rows] = chunk
+
+        return out[:, :, 0] if squeeze else out
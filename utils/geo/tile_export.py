@@ -0,0 +1,210 @@
+"""
+瓦片流式导出引擎
+每个工作线程只打开一次源数据集，按内部块顺序读取窗口，
+通过有界线程池并行写出瓦片，并统计导出进度与吞吐量
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+
+from utils.geo.raster_loader import RASTERIO_AVAILABLE, GDAL_AVAILABLE
+from utils.geo.tile_format import TileFormat
+from utils.geo.dataset_pool import DatasetPool, KIND_GDAL, KIND_RASTERIO
+
+if RASTERIO_AVAILABLE:
+    import rasterio
+    from rasterio.windows import Window
+
+if GDAL_AVAILABLE:
+    from osgeo import gdal
+
+
+class TileExporter:
+    """
+    瓦片流式导出引擎
+
+    使用示例:
+        exporter = TileExporter(source_path, max_workers=8, progress_callback=callback,
+                                tile_format=TileFormat(FORMAT_COG, compress="ZSTD"))
+        stats = exporter.export([
+            {'position': (x, y, width, height), 'output_path': path},
+            ...
+        ])
+    """
+
+    def __init__(self, source_path, max_workers=None, max_pending=None, progress_callback=None,
+                 tile_format=None, cancel_event=None):
+        """
+        初始化导出引擎
+
+        Args:
+            source_path: 源栅格文件路径
+            max_workers: 写出线程数，默认为CPU核数（最多16）
+            max_pending: 同时排队的最大瓦片数，用于限制内存占用，默认为线程数的2倍
+            progress_callback: 进度回调函数，参数为(已完成数, 总数, 统计信息字典)
+            tile_format: 瓦片输出格式，None表示DEFLATE压缩的分块GeoTIFF
+            cancel_event: threading.Event，被设置时不再提交新的瓦片，已排队的瓦片写完后返回
+        """
+        self.source_path = source_path
+        self.tile_format = tile_format or TileFormat()
+        self.max_workers = max_workers or min(16, os.cpu_count() or 4)
+        self.max_pending = max_pending or self.max_workers * 2
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event or threading.Event()
+        self.last_error = None
+
+        # 每个线程独立持有的源数据集
+        self._local = threading.local()
+        self._opened = []
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        """取消导出"""
+        self.cancel_event.set()
+
+    def _get_source(self):
+        """获取当前线程的源数据集，首次调用时从句柄池获取"""
+        source = getattr(self._local, 'source', None)
+        if source is None:
+            if GDAL_AVAILABLE:
+                kind = KIND_GDAL
+            elif RASTERIO_AVAILABLE:
+                kind = KIND_RASTERIO
+            else:
+                raise RuntimeError("缺少GDAL或rasterio库，无法导出GeoTIFF瓦片")
+
+            source = (kind, DatasetPool.acquire(self.source_path, kind))
+            self._local.source = source
+            with self._lock:
+                self._opened.append(source)
+        return source
+
+    def _close_sources(self):
+        """将所有线程获取的数据集归还句柄池，下次导出同一文件时直接复用"""
+        with self._lock:
+            for kind, dataset in self._opened:
+                DatasetPool.release(dataset)
+            self._opened = []
+        self._local = threading.local()
+
+    def _block_shape(self):
+        """获取源数据的内部块尺寸 (块高, 块宽)"""
+        try:
+            kind, dataset = self._get_source()
+            if kind == KIND_GDAL:
+                block_w, block_h = dataset.GetRasterBand(1).GetBlockSize()
+                return block_h, block_w
+            return dataset.block_shapes[0]
+        except Exception:
+            return 1, 1
+
+    def _order_tiles(self, tiles):
+        """按内部块的行列顺序排列瓦片，使相邻读取命中同一批压缩块"""
+        block_h, block_w = self._block_shape()
+        block_h, block_w = max(1, block_h), max(1, block_w)
+        return sorted(tiles, key=lambda t: (t['position'][1] // block_h, t['position'][0] // block_w,
+                                            t['position'][1], t['position'][0]))
+
+    def _write_tile(self, tile):
+        """
+        读取一个窗口并写出为GeoTIFF
+
+        Returns:
+            int: 写出的原始数据字节数
+        """
+        x_off, y_off, width, height = tile['position']
+        output_path = tile['output_path']
+        kind, src = self._get_source()
+
+        if kind == KIND_GDAL:
+            geotransform = list(src.GetGeoTransform())
+            geotransform[0] = geotransform[0] + x_off * geotransform[1] + y_off * geotransform[2]
+            geotransform[3] = geotransform[3] + x_off * geotransform[4] + y_off * geotransform[5]
+
+            data = src.ReadAsArray(x_off, y_off, width, height)
+            if data.ndim == 2:
+                data = data[np.newaxis, :, :]
+
+            nodata_values = [src.GetRasterBand(i + 1).GetNoDataValue() for i in range(src.RasterCount)]
+            self.tile_format.write_gdal(output_path, data, geotransform, src.GetProjection(),
+                                        nodata_values, src.GetRasterBand(1).DataType)
+        else:
+            window = Window(x_off, y_off, width, height)
+            data = src.read(window=window)
+            profile = src.profile.copy()
+            profile.update({
+                'height': height,
+                'width': width,
+                'transform': src.window_transform(window)
+            })
+            self.tile_format.write_rasterio(output_path, data, profile)
+
+        return data.nbytes
+
+    def export(self, tiles):
+        """
+        并行导出瓦片
+
+        Args:
+            tiles: 瓦片列表，每个元素包含 'position' (x, y, width, height) 和 'output_path'
+
+        Returns:
+            dict: 导出统计信息，包含成功文件、失败列表、耗时、瓦片/秒和MB/秒；取消时 'cancelled' 为True
+        """
+        total = len(tiles)
+        stats = {
+            'saved': [],
+            'failed': [],
+            'cancelled': False,
+            'bytes': 0,
+            'elapsed': 0.0,
+            'tiles_per_sec': 0.0,
+            'mb_per_sec': 0.0
+        }
+        if total == 0:
+            return stats
+
+        start_time = time.time()
+        ordered = self._order_tiles(tiles)
+        pending = {}
+
+        def collect(done_futures):
+            for future in done_futures:
+                tile = pending.pop(future)
+                try:
+                    stats['bytes'] += future.result()
+                    stats['saved'].append(tile['output_path'])
+                except Exception as e:
+                    self.last_error = f"导出瓦片失败: {tile['output_path']}, 错误: {str(e)}"
+                    stats['failed'].append((tile, str(e)))
+
+                elapsed = max(time.time() - start_time, 1e-6)
+                finished = len(stats['saved']) + len(stats['failed'])
+                stats['elapsed'] = elapsed
+                stats['tiles_per_sec'] = finished / elapsed
+                stats['mb_per_sec'] = stats['bytes'] / (1024 * 1024) / elapsed
+                if self.progress_callback:
+                    self.progress_callback(finished, total, stats)
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for tile in ordered:
+                    if self.cancel_event.is_set():
+                        stats['cancelled'] = True
+                        break
+                    # 控制排队数量，避免一次性读入过多窗口
+                    while len(pending) >= self.max_pending:
+                        done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending[executor.submit(self._write_tile, tile)] = tile
+
+                while pending:
+                    done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                    collect(done)
+        finally:
+            self._close_sources()
+
+        return stats
@@ -0,0 +1,242 @@
+"""
+瓦片输出格式
+管理GeoTIFF/COG的创建选项：内部分块、压缩与预测器、金字塔和BIGTIFF，
+并提供GDAL和rasterio两种写出方式
+"""
+import numpy as np
+
+from utils.geo.raster_loader import RASTERIO_AVAILABLE, GDAL_AVAILABLE
+
+if RASTERIO_AVAILABLE:
+    import rasterio
+    import rasterio.shutil
+    from rasterio.io import MemoryFile
+    from rasterio.enums import Resampling
+
+if GDAL_AVAILABLE:
+    from osgeo import gdal, gdal_array
+
+# 输出格式
+FORMAT_GTIFF = "GTiff"   # 内部分块的GeoTIFF
+FORMAT_COG = "COG"       # Cloud-Optimized GeoTIFF
+
+# 支持的压缩方式
+COMPRESSIONS = ("DEFLATE", "ZSTD", "LZW", "NONE")
+
+
+class TileFormat:
+    """
+    瓦片输出格式
+
+    默认输出DEFLATE压缩、256×256内部分块的GeoTIFF；整数数据使用水平差分预测器，
+    浮点数据使用浮点预测器。COG格式的金字塔与分块布局由COG驱动生成，
+    GDAL版本过低没有COG驱动时退回到带内部金字塔的分块GeoTIFF
+
+    使用示例:
+        tile_format = TileFormat(FORMAT_COG, compress="ZSTD", overviews=True)
+        exporter = TileExporter(source_path, tile_format=tile_format)
+    """
+
+    def __init__(self, driver=FORMAT_GTIFF, compress="DEFLATE", level=None, block_size=256,
+                 overviews=False, overview_resampling="AVERAGE", bigtiff="IF_SAFER"):
+        """
+        初始化输出格式
+
+        Args:
+            driver: 输出格式，FORMAT_GTIFF或FORMAT_COG
+            compress: 压缩方式，COMPRESSIONS之一
+            level: 压缩级别（DEFLATE为1-9，ZSTD为1-22），None表示使用驱动默认值
+            block_size: 内部分块边长（像素），应为16的倍数
+            overviews: 是否生成内部金字塔（COG格式按瓦片大小自动决定层数）
+            overview_resampling: 金字塔重采样方法，分类结果应使用NEAREST
+            bigtiff: BIGTIFF选项，YES/NO/IF_NEEDED/IF_SAFER
+        """
+        compress = (compress or "NONE").upper()
+        if compress not in COMPRESSIONS:
+            raise ValueError(f"不支持的压缩方式: {compress}")
+
+        self.driver = driver
+        self.compress = compress
+        self.level = level
+        self.block_size = block_size
+        self.overviews = overviews
+        self.overview_resampling = overview_resampling.upper()
+        self.bigtiff = bigtiff
+
+    def predictor(self, dtype):
+        """
+        根据数据类型选择预测器
+
+        Returns:
+            int: 1为无预测器，2为水平差分（整数），3为浮点预测器
+        """
+        if self.compress == "NONE":
+            return 1
+        return 3 if np.issubdtype(np.dtype(dtype), np.floating) else 2
+
+    def overview_factors(self, width, height):
+        """计算金字塔的降采样倍数，最小一层不小于一个内部块"""
+        min_size = self.block_size or 256
+        factors = []
+        factor = 2
+        while min(width, height) // factor >= min_size:
+            factors.append(factor)
+            factor *= 2
+        return factors
+
+    def _compress_for_gdal(self):
+        """当前GDAL不支持ZSTD时退回到DEFLATE"""
+        if self.compress == "ZSTD":
+            options = gdal.GetDriverByName("GTiff").GetMetadataItem("DMD_CREATIONOPTIONLIST") or ""
+            if "ZSTD" not in options:
+                return "DEFLATE"
+        return self.compress
+
+    def gdal_options(self, dtype, cog=False):
+        """
+        生成GDAL创建选项
+
+        Args:
+            dtype: numpy数据类型
+            cog: 是否为COG驱动生成选项
+
+        Returns:
+            list: "KEY=VALUE" 形式的创建选项
+        """
+        compress = self._compress_for_gdal()
+        options = [f"COMPRESS={compress}", f"BIGTIFF={self.bigtiff}"]
+
+        if compress != "NONE":
+            predictor = self.predictor(dtype)
+            # COG驱动的PREDICTOR=YES会按数据类型自动选择
+            options.append("PREDICTOR=YES" if cog else f"PREDICTOR={predictor}")
+            if self.level is not None and compress in ("DEFLATE", "ZSTD"):
+                options.append(f"LEVEL={self.level}" if cog else
+                               f"{'ZLEVEL' if compress == 'DEFLATE' else 'ZSTD_LEVEL'}={self.level}")
+
+        if cog:
+            options.append(f"BLOCKSIZE={self.block_size or 512}")
+            options.append(f"OVERVIEWS={'AUTO' if self.overviews else 'NONE'}")
+            options.append(f"OVERVIEW_RESAMPLING={self.overview_resampling}")
+        elif self.block_size:
+            options += ["TILED=YES", f"BLOCKXSIZE={self.block_size}", f"BLOCKYSIZE={self.block_size}"]
+        return options
+
+    def rasterio_profile(self, dtype):
+        """
+        生成rasterio写出参数（分块GeoTIFF）
+
+        Args:
+            dtype: numpy数据类型
+
+        Returns:
+            dict: 可直接合并到profile中的参数
+        """
+        profile = {"driver": "GTiff", "BIGTIFF": self.bigtiff, "compress": self.compress.lower()}
+        if self.compress == "NONE":
+            profile.pop("compress")
+        else:
+            profile["predictor"] = self.predictor(dtype)
+            if self.level is not None and self.compress == "DEFLATE":
+                profile["zlevel"] = self.level
+            elif self.level is not None and self.compress == "ZSTD":
+                profile["zstd_level"] = self.level
+
+        if self.block_size:
+            profile.update({"tiled": True, "blockxsize": self.block_size, "blockysize": self.block_size})
+        else:
+            profile["tiled"] = False
+        return profile
+
+    def write_gdal(self, output_path, data, geotransform, projection, nodata_values=None, data_type=None):
+        """
+        使用GDAL写出瓦片
+
+        Args:
+            output_path: 输出文件路径
+            data: 形状为 (波段, 行, 列) 的数组
+            geotransform: GDAL风格的地理变换
+            projection: 投影WKT
+            nodata_values: 每个波段的NoData值列表，可以为None
+            data_type: GDAL数据类型，None表示按数组类型推断
+        """
+        bands, height, width = data.shape
+        if data_type is None:
+            data_type = gdal_array.NumericTypeCodeToGDALTypeCode(data.dtype)
+        cog_driver = gdal.GetDriverByName("COG") if self.driver == FORMAT_COG else None
+
+        if self.driver == FORMAT_COG:
+            # COG只能由已有数据集复制生成：先写入内存数据集
+            target = gdal.GetDriverByName("MEM").Create("", width, height, bands, data_type)
+        else:
+            target = gdal.GetDriverByName("GTiff").Create(output_path, width, height, bands, data_type,
+                                                          options=self.gdal_options(data.dtype))
+        if target is None:
+            raise IOError(f"无法创建输出文件: {output_path}")
+
+        target.SetGeoTransform(geotransform)
+        if projection:
+            target.SetProjection(projection)
+        for i in range(bands):
+            band = target.GetRasterBand(i + 1)
+            band.WriteArray(data[i])
+            if nodata_values and nodata_values[i] is not None:
+                band.SetNoDataValue(nodata_values[i])
+
+        factors = self.overview_factors(width, height) if self.overviews else []
+        if self.driver == FORMAT_COG:
+            if cog_driver is not None:
+                result = cog_driver.CreateCopy(output_path, target, options=self.gdal_options(data.dtype, cog=True))
+            else:
+                # 没有COG驱动时生成等价布局：分块GeoTIFF，金字塔写在主影像之前
+                if factors:
+                    target.BuildOverviews(self.overview_resampling, factors)
+                options = self.gdal_options(data.dtype) + ["COPY_SRC_OVERVIEWS=YES"]
+                if not self.block_size:
+                    options += ["TILED=YES", "BLOCKXSIZE=512", "BLOCKYSIZE=512"]
+                result = gdal.GetDriverByName("GTiff").CreateCopy(output_path, target, options=options)
+            if result is None:
+                raise IOError(f"无法创建输出文件: {output_path}")
+            result = None
+        elif factors:
+            target.BuildOverviews(self.overview_resampling, factors)
+        target = None
+
+    def write_rasterio(self, output_path, data, profile):
+        """
+        使用rasterio写出瓦片
+
+        Args:
+            output_path: 输出文件路径
+            data: 形状为 (波段, 行, 列) 的数组
+            profile: 瓦片的基本参数（尺寸、波段数、数据类型、crs、transform、nodata）
+        """
+        # 源数据的压缩和分块参数不沿用，以本格式为准
+        profile = {key: value for key, value in profile.items()
+                   if key not in ("compress", "predictor", "zlevel", "zstd_level", "tiled",
+                                  "blockxsize", "blockysize")}
+        profile.update(self.rasterio_profile(data.dtype))
+        _, height, width = data.shape
+        factors = self.overview_factors(width, height) if self.overviews else []
+        resampling = getattr(Resampling, self.overview_resampling.lower(), Resampling.average)
+
+        if self.driver != FORMAT_COG:
+            with rasterio.open(output_path, "w", **profile) as dst:
+                dst.write(data)
+                if factors:
+                    dst.build_overviews(factors, resampling)
+            return
+
+        # COG: 在内存中写出后由COG驱动复制生成
+        with MemoryFile() as memory_file:
+            with memory_file.open(**dict(profile, driver="GTiff")) as dataset:
+                dataset.write(data)
+            with memory_file.open() as dataset:
+                options = {"compress": self.compress, "blocksize": self.block_size or 512,
+                           "overviews": "AUTO" if self.overviews else "NONE",
+                           "overview_resampling": self.overview_resampling, "bigtiff": self.bigtiff}
+                if self.compress != "NONE":
+                    options["predictor"] = "YES"
+                if self.level is not None:
+                    options["level"] = self.level
+                rasterio.shutil.copy(dataset, output_path, driver="COG", **options)
@@ -17,6 +17,17 @@ except ImportError:
 
 # 本地导入
 from utils.geo.raster_loader import RasterData
+from utils.geo.dataset_pool import DatasetPool, KIND_GDAL
+
+# 网格矢量导出支持的格式（扩展名 -> fiona驱动）
+GRID_VECTOR_DRIVERS = {
+    '.shp': 'ESRI Shapefile',
+    '.gpkg': 'GPKG',
+    '.fgb': 'FlatGeobuf'
+}
+
+# 网格矢量导出每批写入的要素数
+GRID_BATCH_SIZE = 50000
 
 
 class VectorUtils:
@@ -35,6 +46,63 @@ class VectorUtils:
             output_path: 输出shapefile文件路径
             attributes: 额外属性字段，可选
             
+        Returns:
+            bool: 是否成功
+            str: 错误消息或成功信息
+        """
+        return VectorUtils.export_grid(raster_data, grid_result, output_path,
+                                       driver='ESRI Shapefile', attributes=attributes)
+    
+    @staticmethod
+    def grid_footprints(transform, positions):
+        """
+        批量计算网格外框的地理坐标
+        
+        所有网格的四个角点组成一个 (N, 5, 3) 的齐次坐标数组，与仿射矩阵一次相乘得到地理坐标，
+        不逐个构造shapely对象
+        
+        Args:
+            transform: 地理变换，GDAL风格的六元组或rasterio的Affine；为None时输出像素坐标
+            positions: 网格位置，形状为 (N, 4) 的 (x, y, width, height)
+            
+        Returns:
+            numpy.ndarray: 形状为 (N, 5, 2) 的闭合外环坐标（左上、右上、右下、左下、左上）
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 4)
+        x0, y0 = positions[:, 0], positions[:, 1]
+        x1, y1 = x0 + positions[:, 2], y0 + positions[:, 3]
+        
+        ring_x = np.stack([x0, x1, x1, x0, x0], axis=1)
+        ring_y = np.stack([y0, y0, y1, y1, y0], axis=1)
+        pixels = np.stack([ring_x, ring_y, np.ones_like(ring_x)], axis=-1)
+        
+        if transform is None:
+            return pixels[..., :2]
+        if hasattr(transform, 'to_gdal'):
+            # rasterio风格的transform
+            transform = transform.to_gdal()
+        
+        matrix = np.array([[transform[1], transform[2], transform[0]],
+                           [transform[4], transform[5], transform[3]]], dtype=np.float64)
+        return pixels @ matrix.T
+    
+    @staticmethod
+    def export_grid(raster_data, grid_result, output_path, driver=None, attributes=None,
+                    batch_size=GRID_BATCH_SIZE):
+        """
+        导出网格外框为矢量文件
+        
+        外框坐标批量计算，要素按批写入；GeoPackage和FlatGeobuf默认建立空间索引，
+        Shapefile同时写出.qix空间索引
+        
+        Args:
+            raster_data: RasterData对象，包含原始栅格数据信息
+            grid_result: 分割结果列表，每个元素为一个字典，包含位置信息
+            output_path: 输出文件路径
+            driver: 输出驱动（'ESRI Shapefile'、'GPKG'、'FlatGeobuf'），为None时按扩展名判断
+            attributes: 额外属性字段 {字段名: 类型}，值从网格字典中同名键读取，可选
+            batch_size: 每批写入的要素数
+            
         Returns:
             bool: 是否成功
             str: 错误消息或成功信息
@@ -43,12 +111,17 @@ class VectorUtils:
             return False, "缺少必要的矢量库（shapely, fiona）"
         
         try:
+            if driver is None:
+                extension = os.path.splitext(output_path)[1].lower()
+                if extension not in GRID_VECTOR_DRIVERS:
+                    return False, f"不支持的矢量格式: {extension}"
+                driver = GRID_VECTOR_DRIVERS[extension]
+            
             # 确保输出目录存在
             output_dir = os.path.dirname(output_path)
-            if not os.path.exists(output_dir):
+            if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir)
             
-            # 定义shapefile模式（schema）
             schema = {
                 'geometry': 'Polygon',
                 'properties': {
@@ -59,74 +132,51 @@ class VectorUtils:
                     'height': 'float'
                 }
             }
-            
-            # 添加额外属性字段
             if attributes:
-                for attr_name, attr_type in attributes.items():
-                    schema['properties'][attr_name] = attr_type
+                schema['properties'].update(attributes)
             
-            # 创建一个新的shapefile
+            # 使用栅格数据的坐标系，没有时使用默认的WGS84
             crs = None
             if raster_data.is_geotiff and raster_data.crs:
-                # 使用栅格数据的坐标系
-                if hasattr(raster_data.crs, 'to_wkt'):
-                    crs = raster_data.crs.to_wkt()
-                else:
-                    crs = raster_data.crs
-            
-            # 如果没有获取到有效的CRS，使用默认的WGS84
+                crs = raster_data.crs.to_wkt() if hasattr(raster_data.crs, 'to_wkt') else raster_data.crs
             if not crs:
-                crs = from_epsg(4326)  # WGS84
+                crs = from_epsg(4326)
             
-            with fiona.open(output_path, 'w', driver='ESRI Shapefile', crs=crs, schema=schema) as shp:
-                for i, grid in enumerate(grid_result):
-                    # 获取网格位置信息
-                    x, y, grid_width, grid_height = grid['position']
-                    row, col = grid['row'], grid['col']
-                    
-                    # 如果有地理参考信息，转换为地理坐标
-                    if raster_data.is_geotiff and raster_data.geo_transform:
-                        # 使用地理变换将像素坐标转换为地理坐标
-                        transform = raster_data.geo_transform
-                        
-                        # 计算四个角点的地理坐标
-                        geom = VectorUtils._pixel_to_geom(
-                            transform, 
-                            x, y, 
-                            grid_width, grid_height
-                        )
-                    else:
-                        # 没有地理参考信息，使用像素坐标
-                        geom = Polygon([
-                            (x, y),
-                            (x + grid_width, y),
-                            (x + grid_width, y + grid_height),
-                            (x, y + grid_height),
-                            (x, y)
-                        ])
-                    
-                    # 创建要素属性
-                    props = {
-                        'id': i + 1,
-                        'row': row,
-                        'col': col,
-                        'width': float(grid_width),
-                        'height': float(grid_height)
-                    }
-                    
-                    # 添加额外属性
-                    if attributes:
-                        for attr_name in attributes.keys():
-                            if attr_name in grid:
-                                props[attr_name] = grid[attr_name]
-                            else:
-                                props[attr_name] = None
+            # 没有地理参考信息时使用像素坐标
+            transform = raster_data.geo_transform if raster_data.is_geotiff else None
+            
+            # 已存在的文件先删除，保证覆盖写出
+            if os.path.exists(output_path):
+                fiona.remove(output_path, driver=driver)
+            
+            options = {'SPATIAL_INDEX': 'YES'} if driver in ('GPKG', 'FlatGeobuf') else {}
+            with fiona.open(output_path, 'w', driver=driver, crs=crs, schema=schema, **options) as dst:
+                for start in range(0, len(grid_result), batch_size):
+                    batch = grid_result[start:start + batch_size]
+                    rings = VectorUtils.grid_footprints(
+                        transform, [grid['position'] for grid in batch]).tolist()
                     
-                    # 添加要素到shapefile
-                    shp.write({
-                        'geometry': mapping(geom),
-                        'properties': props
-                    })
+                    features = []
+                    for i, (grid, ring) in enumerate(zip(batch, rings)):
+                        props = {
+                            'id': start + i + 1,
+                            'row': grid['row'],
+                            'col': grid['col'],
+                            'width': float(grid['position'][2]),
+                            'height': float(grid['position'][3])
+                        }
+                        if attributes:
+                            for attr_name in attributes:
+                                props[attr_name] = grid.get(attr_name)
+                        features.append({
+                            'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+                            'properties': props
+                        })
+                    dst.writerecords(features)
+            
+            # Shapefile的空间索引需要在写完后单独建立
+            if driver == 'ESRI Shapefile':
+                VectorUtils._create_shapefile_index(output_path)
             
             return True, f"成功导出矢量文件：{output_path}"
             
@@ -135,6 +185,18 @@ class VectorUtils:
             error_details = ''.join(traceback.format_exception(exc_type, exc_value, exc_traceback))
             return False, f"导出矢量文件失败: {str(e)}\n{error_details}"
     
+    @staticmethod
+    def _create_shapefile_index(shp_path):
+        """为Shapefile建立.qix空间索引，失败时不影响导出结果"""
+        try:
+            ds = ogr.Open(shp_path, 1)
+            if ds is not None:
+                layer_name = ds.GetLayer(0).GetName()
+                ds.ExecuteSQL(f'CREATE SPATIAL INDEX ON "{layer_name}"')
+                ds = None
+        except Exception:
+            pass
+    
     @staticmethod
     def _pixel_to_geom(transform, pixel_x, pixel_y, pixel_width, pixel_height):
         """
@@ -200,9 +262,10 @@ class VectorUtils:
         try:
             # 确保有GDAL数据集
             if not raster_data.gdal_dataset and raster_data.is_geotiff:
-                # 尝试创建GDAL数据集
-                raster_data.gdal_dataset = gdal.Open(raster_data.image_path, gdal.GA_ReadOnly)
-                if not raster_data.gdal_dataset:
+                # 从句柄池获取GDAL数据集，随RasterLoader.close归还
+                try:
+                    raster_data.gdal_dataset = DatasetPool.acquire(raster_data.image_path, KIND_GDAL)
+                except (IOError, OSError, RuntimeError):
                     return False, "无法创建GDAL数据集"
             
             # 如果没有GDAL数据集但有数组，则从数组创建临时文件
@@ -0,0 +1,280 @@
+"""
+虚拟瓦片导出
+不复制像素数据，只写出引用源影像窗口的GDAL VRT：每个瓦片一个VRT，
+或一个整幅影像VRT加一个瓦片索引GeoPackage；下游需要实体文件时再按窗口物化
+"""
+import os
+import time
+import threading
+from xml.sax.saxutils import escape
+
+from utils.geo.raster_loader import RASTERIO_AVAILABLE, GDAL_AVAILABLE
+from utils.geo.vector_utils import VectorUtils, VECTOR_LIBS_AVAILABLE
+from utils.geo.dataset_pool import DatasetPool, KIND_GDAL, KIND_RASTERIO
+
+if GDAL_AVAILABLE:
+    from osgeo import gdal
+
+if VECTOR_LIBS_AVAILABLE:
+    import fiona
+
+# 虚拟导出方式
+VIRTUAL_VRT = "vrt"       # 每个瓦片一个VRT
+VIRTUAL_INDEX = "index"   # 一个整幅影像VRT + 瓦片索引GeoPackage
+
+# rasterio数据类型名到GDAL数据类型名
+_GDAL_TYPE_NAMES = {
+    'uint8': 'Byte', 'int8': 'Int8', 'uint16': 'UInt16', 'int16': 'Int16',
+    'uint32': 'UInt32', 'int32': 'Int32', 'uint64': 'UInt64', 'int64': 'Int64',
+    'float32': 'Float32', 'float64': 'Float64'
+}
+
+
+class VirtualTileExporter:
+    """
+    虚拟瓦片导出器
+
+    VRT以XML文本直接生成，不经过GDAL创建数据集，导出上万个瓦片只需数秒；
+    源影像默认以相对路径引用，导出目录与源影像一起移动后仍然有效
+
+    使用示例:
+        exporter = VirtualTileExporter(source_path)
+        stats = exporter.export_vrts([{'position': (x, y, width, height), 'output_path': path}, ...])
+        stats = exporter.export_index(tiles, vrt_path, index_path)
+    """
+
+    def __init__(self, source_path, relative_paths=True, progress_callback=None, cancel_event=None):
+        """
+        初始化导出器
+
+        Args:
+            source_path: 源栅格文件路径
+            relative_paths: 是否以相对于VRT的路径引用源影像
+            progress_callback: 进度回调函数，参数为(已完成数, 总数, 统计信息字典)
+            cancel_event: threading.Event，被设置时停止写出剩余的VRT
+        """
+        self.source_path = os.path.abspath(source_path)
+        self.relative_paths = relative_paths
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event or threading.Event()
+        self.last_error = None
+        self._info = None
+
+    def _source_info(self):
+        """读取源影像的尺寸、地理参考和各波段属性（只读取一次）"""
+        if self._info is not None:
+            return self._info
+
+        if GDAL_AVAILABLE:
+            with DatasetPool.open(self.source_path, KIND_GDAL) as dataset:
+                bands = []
+                for i in range(dataset.RasterCount):
+                    band = dataset.GetRasterBand(i + 1)
+                    block_w, block_h = band.GetBlockSize()
+                    bands.append({
+                        'data_type': gdal.GetDataTypeName(band.DataType),
+                        'nodata': band.GetNoDataValue(),
+                        'color_interp': gdal.GetColorInterpretationName(band.GetColorInterpretation()),
+                        'block': (block_w, block_h)
+                    })
+                info = {
+                    'width': dataset.RasterXSize,
+                    'height': dataset.RasterYSize,
+                    'geo_transform': dataset.GetGeoTransform(),
+                    'projection': dataset.GetProjection(),
+                    'bands': bands
+                }
+        elif RASTERIO_AVAILABLE:
+            with DatasetPool.open(self.source_path, KIND_RASTERIO) as dataset:
+                bands = []
+                for i in range(dataset.count):
+                    block_h, block_w = dataset.block_shapes[i]
+                    bands.append({
+                        'data_type': _GDAL_TYPE_NAMES.get(dataset.dtypes[i], 'Float64'),
+                        'nodata': dataset.nodatavals[i],
+                        'color_interp': dataset.colorinterp[i].name.capitalize(),
+                        'block': (block_w, block_h)
+                    })
+                info = {
+                    'width': dataset.width,
+                    'height': dataset.height,
+                    'geo_transform': dataset.transform.to_gdal(),
+                    'projection': dataset.crs.to_wkt() if dataset.crs else '',
+                    'bands': bands
+                }
+        else:
+            raise RuntimeError("缺少GDAL或rasterio库，无法读取源影像信息")
+
+        self._info = info
+        return info
+
+    def _source_reference(self, vrt_path):
+        """
+        获取VRT中引用源影像的路径
+
+        Returns:
+            tuple: (路径文本, 是否相对于VRT)
+        """
+        if self.relative_paths:
+            try:
+                relative = os.path.relpath(self.source_path, os.path.dirname(os.path.abspath(vrt_path)))
+                return relative.replace(os.sep, '/'), True
+            except ValueError:
+                # Windows下源影像与输出目录不在同一盘符
+                pass
+        return self.source_path, False
+
+    def _vrt_xml(self, position, vrt_path):
+        """
+        生成引用源影像一个窗口的VRT文本
+
+        Args:
+            position: 窗口 (x, y, width, height)
+            vrt_path: VRT文件路径，用于计算源影像的相对路径
+
+        Returns:
+            str: VRT的XML文本
+        """
+        info = self._source_info()
+        x_off, y_off, width, height = position
+        source, relative = self._source_reference(vrt_path)
+
+        gt = info['geo_transform']
+        geo_transform = (gt[0] + x_off * gt[1] + y_off * gt[2], gt[1], gt[2],
+                         gt[3] + x_off * gt[4] + y_off * gt[5], gt[4], gt[5])
+
+        lines = [f'<VRTDataset rasterXSize="{width}" rasterYSize="{height}">']
+        if info['projection']:
+            lines.append(f'  <SRS>{escape(info["projection"])}</SRS>')
+        lines.append('  <GeoTransform>' + ', '.join(repr(float(v)) for v in geo_transform) + '</GeoTransform>')
+
+        for index, band in enumerate(info['bands'], start=1):
+            lines.append(f'  <VRTRasterBand dataType="{band["data_type"]}" band="{index}">')
+            if band['nodata'] is not None:
+                lines.append(f'    <NoDataValue>{band["nodata"]!r}</NoDataValue>')
+            lines.append(f'    <ColorInterp>{band["color_interp"]}</ColorInterp>')
+            lines.append('    <SimpleSource>')
+            lines.append(f'      <SourceFilename relativeToVRT="{int(relative)}">{escape(source)}</SourceFilename>')
+            lines.append(f'      <SourceBand>{index}</SourceBand>')
+            lines.append(f'      <SourceProperties RasterXSize="{info["width"]}" RasterYSize="{info["height"]}" '
+                         f'DataType="{band["data_type"]}" BlockXSize="{band["block"][0]}" '
+                         f'BlockYSize="{band["block"][1]}" />')
+            lines.append(f'      <SrcRect xOff="{x_off}" yOff="{y_off}" xSize="{width}" ySize="{height}" />')
+            lines.append(f'      <DstRect xOff="0" yOff="0" xSize="{width}" ySize="{height}" />')
+            lines.append('    </SimpleSource>')
+            lines.append('  </VRTRasterBand>')
+        lines.append('</VRTDataset>')
+        return '\n'.join(lines) + '\n'
+
+    def _write_vrt(self, vrt_path, position):
+        with open(vrt_path, 'w', encoding='utf-8') as f:
+            f.write(self._vrt_xml(position, vrt_path))
+
+    def _report(self, stats, finished, total, start_time):
+        """更新耗时和吞吐量并回调进度"""
+        elapsed = max(time.time() - start_time, 1e-6)
+        stats['elapsed'] = elapsed
+        stats['tiles_per_sec'] = finished / elapsed
+        if self.progress_callback:
+            self.progress_callback(finished, total, stats)
+
+    def export_vrts(self, tiles):
+        """
+        为每个瓦片写出一个VRT
+
+        Args:
+            tiles: 瓦片列表，每个元素包含 'position' (x, y, width, height) 和 'output_path'
+
+        Returns:
+            dict: 导出统计信息，包含成功文件、失败列表、耗时和瓦片/秒；取消时 'cancelled' 为True
+        """
+        stats = {'saved': [], 'failed': [], 'cancelled': False, 'elapsed': 0.0, 'tiles_per_sec': 0.0}
+        total = len(tiles)
+        start_time = time.time()
+        # 进度回调约每1%触发一次，避免回调本身成为瓶颈
+        report_every = max(1, total // 100)
+
+        for i, tile in enumerate(tiles, start=1):
+            if self.cancel_event.is_set():
+                stats['cancelled'] = True
+                break
+            try:
+                self._write_vrt(tile['output_path'], tile['position'])
+                stats['saved'].append(tile['output_path'])
+            except Exception as e:
+                self.last_error = f"导出虚拟瓦片失败: {tile['output_path']}, 错误: {str(e)}"
+                stats['failed'].append((tile, str(e)))
+            if i % report_every == 0 or i == total:
+                self._report(stats, i, total, start_time)
+
+        return stats
+
+    def export_index(self, tiles, vrt_path, index_path, layer='tiles'):
+        """
+        写出整幅影像的VRT和瓦片索引GeoPackage
+
+        索引中每个瓦片为一个多边形要素，记录行列号和像素窗口；location字段为
+        "vrt://<VRT文件名>?srcwin=x,y,宽,高" 形式的GDAL连接串（GDAL 3.7及以上可直接打开），
+        也可以用 gdal_translate -srcwin 按窗口物化
+
+        Args:
+            tiles: 瓦片列表，每个元素包含 'position' (x, y, width, height)、'row' 和 'col'
+            vrt_path: 输出VRT路径
+            index_path: 输出GeoPackage路径
+            layer: 索引图层名
+
+        Returns:
+            dict: 导出统计信息，包含成功文件、失败列表、耗时和瓦片/秒
+        """
+        stats = {'saved': [], 'failed': [], 'cancelled': False, 'elapsed': 0.0, 'tiles_per_sec': 0.0}
+        if not VECTOR_LIBS_AVAILABLE:
+            raise RuntimeError("缺少必要的矢量库（shapely, fiona），无法写出瓦片索引")
+
+        start_time = time.time()
+        info = self._source_info()
+        self._write_vrt(vrt_path, (0, 0, info['width'], info['height']))
+        stats['saved'].append(vrt_path)
+
+        schema = {
+            'geometry': 'Polygon',
+            'properties': {
+                'id': 'int',
+                'row': 'int',
+                'col': 'int',
+                'x_off': 'int',
+                'y_off': 'int',
+                'width': 'int',
+                'height': 'int',
+                'location': 'str'
+            }
+        }
+        vrt_name = os.path.basename(vrt_path)
+        rings = VectorUtils.grid_footprints(info['geo_transform'], [tile['position'] for tile in tiles]).tolist()
+
+        def features():
+            for i, (tile, ring) in enumerate(zip(tiles, rings), start=1):
+                x, y, width, height = tile['position']
+                yield {
+                    'geometry': {'type': 'Polygon', 'coordinates': [ring]},
+                    'properties': {
+                        'id': i,
+                        'row': tile.get('row', 0),
+                        'col': tile.get('col', 0),
+                        'x_off': x,
+                        'y_off': y,
+                        'width': width,
+                        'height': height,
+                        'location': f"vrt://{vrt_name}?srcwin={x},{y},{width},{height}"
+                    }
+                }
+
+        if os.path.exists(index_path):
+            os.remove(index_path)
+        # 一次写入所有要素，GeoPackage在单个事务中提交
+        with fiona.open(index_path, 'w', driver='GPKG', layer=layer, schema=schema,
+                        crs_wkt=info['projection'] or None) as dst:
+            dst.writerecords(features())
+        stats['saved'].append(index_path)
+
+        self._report(stats, len(tiles), len(tiles), start_time)
+        return stats